@@ -10,6 +10,9 @@ class CustomerAdmin(admin.ModelAdmin):
         'type',
         'email',
         'phone_primary',
+        'order_count',
+        'lifetime_revenue',
+        'last_order_at',
         'is_active',
         'created_at',
         'updated_at',
@@ -18,4 +21,5 @@ class CustomerAdmin(admin.ModelAdmin):
     list_filter = ('type', 'is_active', 'created_at')
     ordering = ('-created_at',)
     list_per_page = 20
+    readonly_fields = ('open_exposure', 'order_count', 'lifetime_revenue', 'last_order_at')
     date_hierarchy = 'created_at'
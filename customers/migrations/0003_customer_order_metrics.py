@@ -0,0 +1,73 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:24
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_metrics(apps, schema_editor):
+    """
+    Compute the order metrics of existing customers from their confirmed,
+    non-canceled sale orders, as sales.services.rebuild_customer_metrics does.
+    """
+    Customer = apps.get_model('customers', 'Customer')
+    SaleOrder = apps.get_model('sales', 'SaleOrder')
+
+    orders = SaleOrder.objects.filter(
+        customer=models.OuterRef('pk'),
+        deleted_at__isnull=True,
+        confirmed_at__isnull=False
+    ).order_by().values('customer')
+
+    def aggregate(expression):
+        return models.Subquery(orders.annotate(value=expression).values('value'))
+
+    Customer.objects.filter(models.Exists(orders)).update(
+        order_count=Coalesce(aggregate(models.Count('pk')), 0),
+        lifetime_revenue=Coalesce(
+            aggregate(models.Sum('total_amount')),
+            Decimal('0.00'),
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        ),
+        last_order_at=aggregate(models.Max('confirmed_at'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customer_live_idx'),
+        ('locations', '0001_initial'),
+        ('sales', '0004_saleorder_confirmed_at'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_order_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_revenue',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['tenant', '-lifetime_revenue'], name='customer_revenue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['tenant', '-last_order_at'], name='customer_last_order_idx'),
+        ),
+        migrations.RunPython(backfill_order_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_order_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='open_exposure',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+        ),
+    ]
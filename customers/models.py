@@ -3,6 +3,7 @@ from django.db import models
 from django.utils import timezone
 
 from locations.models import City
+from tenants.managers import SoftDeleteManager
 from tenants.models import Tenant
 
 
@@ -31,16 +32,27 @@ class Customer(models.Model):
     address_city = models.ForeignKey(City, on_delete=models.SET_NULL, blank=True, null=True, related_name='customers')
     birth_date = models.DateField(blank=True, null=True)
     credit_limit = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    open_exposure = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)
     notes = models.TextField(blank=True, null=True)
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    last_order_at = models.DateTimeField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = SoftDeleteManager()
+
     class Meta:
         verbose_name = 'Customer'
         verbose_name_plural = 'Customers'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name'], condition=models.Q(deleted_at__isnull=True), name='customer_live_idx'),
+            models.Index(fields=['tenant', '-lifetime_revenue'], condition=models.Q(deleted_at__isnull=True), name='customer_revenue_idx'),
+            models.Index(fields=['tenant', '-last_order_at'], condition=models.Q(deleted_at__isnull=True), name='customer_last_order_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.tenant.name})'
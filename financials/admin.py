@@ -3,7 +3,7 @@ from django.contrib.contenttypes.admin import GenericTabularInline
 
 from .models import (AccountPayable, AccountReceivable, CashFlow,
                      CompanyAccount, FinancialCategory, FinancialStatus,
-                     PaymentTransaction)
+                     PaymentTransaction, PurchaseOrderLineMatch)
 
 
 class PaymentTransactionInline(GenericTabularInline):
@@ -107,3 +107,29 @@ class CashFlowAdmin(admin.ModelAdmin):
 
     def has_delete_permission(self, request, obj=None):
         return False
+
+
+@admin.register(PurchaseOrderLineMatch)
+class PurchaseOrderLineMatchAdmin(admin.ModelAdmin):
+    list_display = (
+        'purchase_order_item',
+        'purchase_order',
+        'ordered_quantity',
+        'received_quantity',
+        'billed_quantity',
+        'billed_amount',
+        'status',
+        'updated_at',
+    )
+    list_filter = ('status', 'tenant')
+    search_fields = ('purchase_order__id', 'purchase_order__supplier__name', 'purchase_order_item__product__name')
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('purchase_order__supplier', 'purchase_order_item__product')
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from financials.services import match_purchase_orders
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Match purchase order lines against their receipts and accounts payable.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only match this tenant id.')
+        parser.add_argument('--full', action='store_true', help='Match every order, not only those changed since the last run.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            result = match_purchase_orders(tenant=tenant, full=options['full'], batch_size=options['batch_size'])
+            self.stdout.write('{}: {} lines matched, {} discrepancies, in {:.1f}s.'.format(
+                tenant, result['lines'], result['discrepancies'], time.monotonic() - started
+            ))
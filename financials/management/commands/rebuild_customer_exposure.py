@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from financials.services import rebuild_customer_exposure
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Recompute the open exposure of every customer from its receivables and uninvoiced sale orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild this tenant id.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            updated = rebuild_customer_exposure(tenant=tenant, batch_size=options['batch_size'])
+            self.stdout.write('{}: {} customers rebuilt in {:.1f}s.'.format(tenant, updated, time.monotonic() - started))
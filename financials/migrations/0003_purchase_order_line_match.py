@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financials', '0002_alter_financialstatus_options'),
+        ('purchases', '0005_purchase_order_landed_costs'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseOrderMatchRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('matched_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('tenant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_order_match_refresh', to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name': 'Purchase Order Match Refresh',
+                'verbose_name_plural': 'Purchase Order Match Refreshes',
+            },
+        ),
+        migrations.CreateModel(
+            name='PurchaseOrderLineMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ordered_quantity', models.DecimalField(decimal_places=3, max_digits=10)),
+                ('received_quantity', models.DecimalField(decimal_places=3, max_digits=10)),
+                ('billed_quantity', models.DecimalField(decimal_places=3, max_digits=10)),
+                ('ordered_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('received_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('billed_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('MA', 'Conferido'), ('PE', 'Pendente'), ('OR', 'Recebido a maior'), ('PV', 'Divergência de preço'), ('OB', 'Faturado a maior')], default='PE', max_length=2)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('purchase_order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_matches', to='purchases.purchaseorder')),
+                ('purchase_order_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='match', to='purchases.purchaseorderitem')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_order_line_matches', to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name': 'Purchase Order Line Match',
+                'verbose_name_plural': 'Purchase Order Line Matches',
+                'indexes': [models.Index(fields=['tenant', 'status'], name='po_line_match_status_idx')],
+            },
+        ),
+    ]
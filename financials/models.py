@@ -4,7 +4,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 from customers.models import Customer
-from purchases.models import PurchaseOrder
+from purchases.models import PurchaseOrder, PurchaseOrderItem
 from sales.models import SaleOrder
 from suppliers.models import Supplier
 from tenants.models import Tenant
@@ -166,3 +166,57 @@ class CashFlow(models.Model):
 
     def __str__(self):
         return f"{self.description} - {self.amount} ({self.category.label})"
+
+
+class PurchaseOrderLineMatch(models.Model):
+    """
+    Three-way match of a purchase order line: what was ordered, received
+    into stock and billed by the supplier.
+
+    Amounts include the line's share of the order's freight and taxes; the
+    billed amount is the line's share of the order's accounts payable and
+    the billed quantity its equivalent at the line's landed unit cost.
+    Maintained by financials.services.match_purchase_orders.
+    """
+
+    class MatchStatus(models.TextChoices):
+        MATCHED = 'MA', 'Conferido'
+        PENDING = 'PE', 'Pendente'
+        OVER_RECEIVED = 'OR', 'Recebido a maior'
+        PRICE_VARIANCE = 'PV', 'Divergência de preço'
+        OVER_BILLED = 'OB', 'Faturado a maior'
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='purchase_order_line_matches')
+    purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name='line_matches')
+    purchase_order_item = models.OneToOneField(PurchaseOrderItem, on_delete=models.CASCADE, related_name='match')
+    ordered_quantity = models.DecimalField(max_digits=10, decimal_places=3)
+    received_quantity = models.DecimalField(max_digits=10, decimal_places=3)
+    billed_quantity = models.DecimalField(max_digits=10, decimal_places=3)
+    ordered_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    received_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    billed_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=2, choices=MatchStatus.choices, default=MatchStatus.PENDING)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Purchase Order Line Match'
+        verbose_name_plural = 'Purchase Order Line Matches'
+        indexes = [
+            models.Index(fields=['tenant', 'status'], name='po_line_match_status_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.purchase_order_item} - {self.get_status_display()}'
+
+
+class PurchaseOrderMatchRefresh(models.Model):
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='purchase_order_match_refresh')
+    matched_until = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Purchase Order Match Refresh'
+        verbose_name_plural = 'Purchase Order Match Refreshes'
+
+    def __str__(self):
+        return f'{self.tenant.name} - {self.matched_until}'
@@ -0,0 +1,407 @@
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from customers.models import Customer
+from inventory.models import StockEntry, StockEntryItem
+from purchases.models import PurchaseOrder, PurchaseOrderItem
+from purchases.services import allocate_landed_costs
+from sales.models import SaleOrder
+from tenants.models import Tenant
+from users.models import User
+
+from .models import (AccountPayable, AccountReceivable, CashFlow,
+                     CompanyAccount, FinancialCategory, FinancialStatus,
+                     PaymentTransaction, PurchaseOrderLineMatch,
+                     PurchaseOrderMatchRefresh)
+
+EXPOSURE_FIELD = models.DecimalField(max_digits=14, decimal_places=2)
+
+# Documents changed this close to the previous run are matched again, so
+# rows committed by transactions that started before it are not missed.
+MATCH_REFRESH_OVERLAP = timedelta(minutes=5)
+
+# Rounding slack when comparing billed and received amounts and quantities.
+MATCH_AMOUNT_TOLERANCE = Decimal('0.01')
+MATCH_QUANTITY_TOLERANCE = Decimal('0.001')
+
+PURCHASE_ORDER_DISCREPANCIES = (
+    PurchaseOrderLineMatch.MatchStatus.OVER_RECEIVED,
+    PurchaseOrderLineMatch.MatchStatus.PRICE_VARIANCE,
+    PurchaseOrderLineMatch.MatchStatus.OVER_BILLED,
+)
+
+
+class FinancialError(Exception):
+    """Custom exception for financial-related errors."""
+    pass
+
+
+def adjust_customer_exposure(deltas: Dict[int, Decimal]) -> None:
+    """
+    Add amounts to the open exposure of customers with a single UPDATE.
+
+    The open exposure of a customer is the unpaid balance of its receivables
+    plus the total of its live sale orders not yet invoiced (without
+    receivables). Services keep it up to date in the same transaction as the
+    documents they change.
+
+    Args:
+        deltas (Dict[int, Decimal]): Amount to add (or subtract, if negative) by customer id.
+    """
+    deltas = {customer_id: amount for customer_id, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    Customer.objects.filter(pk__in=list(deltas)).update(
+        open_exposure=models.F('open_exposure') + models.Case(
+            *[models.When(pk=customer_id, then=models.Value(amount)) for customer_id, amount in deltas.items()],
+            output_field=EXPOSURE_FIELD
+        )
+    )
+
+
+def check_customer_credit(*, customer: Customer, amount: Decimal = Decimal('0.00')) -> bool:
+    """
+    Tell whether a customer can take on an amount without exceeding its credit limit.
+
+    The check reads the maintained open exposure, so it costs nothing beyond
+    the customer row; callers that act on the answer must hold a lock on that
+    row (see lock_customer_credit). A credit limit of zero means no limit.
+
+    Args:
+        customer (Customer): The customer to check.
+        amount (Decimal, optional): New exposure not yet recorded on the customer. Defaults to 0.
+
+    Returns:
+        bool: True if the exposure stays within the credit limit.
+    """
+    if not customer.credit_limit:
+        return True
+    return customer.open_exposure + amount <= customer.credit_limit
+
+
+def lock_customer_credit(*, customer_id: int) -> Customer:
+    """
+    Lock a customer row and return it with its current credit figures.
+
+    Holding this lock serialises credit decisions for the customer, so two
+    concurrent confirmations cannot both pass the check on the same headroom.
+    """
+    return Customer.objects.select_for_update().only('id', 'name', 'credit_limit', 'open_exposure').get(pk=customer_id)
+
+
+@transaction.atomic
+def create_account_receivable(
+    *,
+    tenant: Tenant,
+    customer: Customer,
+    category: FinancialCategory,
+    status: FinancialStatus,
+    due_date: date,
+    total_amount: Decimal,
+    sale_order: SaleOrder = None,
+    description: str = None
+) -> AccountReceivable:
+    """
+    Create an account receivable and add it to the customer's open exposure.
+
+    The first receivable of a sale order invoices it: the order total leaves
+    the exposure as the receivable enters it.
+
+    Args:
+        tenant (Tenant): The tenant associated with the receivable.
+        customer (Customer): The customer who owes the amount.
+        category (FinancialCategory): The income category.
+        status (FinancialStatus): The initial status.
+        due_date (date): The due date.
+        total_amount (Decimal): The amount receivable.
+        sale_order (SaleOrder, optional): The sale order being invoiced. Defaults to None.
+        description (str, optional): Description of the receivable. Defaults to None.
+
+    Returns:
+        AccountReceivable: The created receivable.
+    """
+    if customer.tenant_id != tenant.id:
+        raise FinancialError("Customer does not belong to this tenant.")
+    if total_amount <= 0:
+        raise FinancialError("Amount must be greater than zero.")
+
+    delta = total_amount
+    if sale_order is not None:
+        sale_order = SaleOrder.objects.select_for_update().get(pk=sale_order.pk, tenant=tenant)
+        if sale_order.customer_id != customer.id:
+            raise FinancialError("Sale order #{} belongs to another customer.".format(sale_order.id))
+        if sale_order.deleted_at is None and not sale_order.accounts_receivable.exists():
+            delta -= sale_order.total_amount
+
+    receivable = AccountReceivable.objects.create(
+        tenant=tenant,
+        customer=customer,
+        sale_order=sale_order,
+        status=status,
+        category=category,
+        description=description,
+        due_date=due_date,
+        total_amount=total_amount
+    )
+    adjust_customer_exposure({customer.id: delta})
+    return receivable
+
+
+@transaction.atomic
+def register_receivable_payment(
+    *,
+    tenant: Tenant,
+    receivable: AccountReceivable,
+    amount: Decimal,
+    company_account: CompanyAccount,
+    user: User = None,
+    payment_method: str = PaymentTransaction.PaymentMethod.CASH,
+    transaction_id: str = None,
+    status: FinancialStatus = None
+) -> PaymentTransaction:
+    """
+    Register a payment received against an account receivable.
+
+    The payment is recorded with its cash flow, credited to the company
+    account and deducted from the customer's open exposure.
+
+    Args:
+        tenant (Tenant): The tenant associated with the receivable.
+        receivable (AccountReceivable): The receivable being paid.
+        amount (Decimal): The amount received.
+        company_account (CompanyAccount): The account receiving the money.
+        user (User, optional): The user registering the payment. Defaults to None.
+        payment_method (str, optional): Payment method. Defaults to PaymentMethod.CASH.
+        transaction_id (str, optional): External transaction identifier. Defaults to None.
+        status (FinancialStatus, optional): Status to set on the receivable. Defaults to None (unchanged).
+
+    Returns:
+        PaymentTransaction: The recorded payment.
+    """
+    receivable = AccountReceivable.objects.select_for_update().select_related('category').get(pk=receivable.pk, tenant=tenant)
+    if company_account.tenant_id != tenant.id:
+        raise FinancialError("Company account does not belong to this tenant.")
+    outstanding = receivable.total_amount - receivable.amount_paid
+    if amount <= 0:
+        raise FinancialError("Amount must be greater than zero.")
+    if amount > outstanding:
+        raise FinancialError("Payment of {} exceeds the outstanding balance of {}.".format(amount, outstanding))
+
+    payment = PaymentTransaction.objects.create(
+        tenant=tenant,
+        amount_paid=amount,
+        payment_method=payment_method,
+        company_account=company_account,
+        transaction_id=transaction_id,
+        document_content_type=ContentType.objects.get_for_model(AccountReceivable),
+        document_object_id=receivable.id
+    )
+    CashFlow.objects.create(
+        tenant=tenant,
+        category=receivable.category,
+        amount=amount,
+        description=f"Recebimento da conta a receber #{receivable.id}",
+        payment=payment,
+        user=user
+    )
+    CompanyAccount.objects.filter(pk=company_account.pk).update(current_balance=models.F('current_balance') + amount)
+
+    receivable.amount_paid += amount
+    update_fields = ['amount_paid', 'updated_at']
+    if receivable.amount_paid == receivable.total_amount:
+        receivable.payment_date = timezone.localdate()
+        update_fields.append('payment_date')
+    if status is not None:
+        receivable.status = status
+        update_fields.append('status')
+    receivable.save(update_fields=update_fields)
+
+    adjust_customer_exposure({receivable.customer_id: -amount})
+    return payment
+
+
+def rebuild_customer_exposure(*, tenant: Tenant, batch_size: int = 1000) -> int:
+    """
+    Recompute the open exposure of every customer of a tenant from its documents.
+
+    Args:
+        tenant (Tenant): The tenant whose customers are rebuilt.
+        batch_size (int, optional): Number of customers updated per statement. Defaults to 1000.
+
+    Returns:
+        int: The number of customers updated.
+    """
+    open_receivables = AccountReceivable.objects.filter(
+        customer=models.OuterRef('pk'),
+        total_amount__gt=models.F('amount_paid')
+    ).order_by().values('customer').annotate(
+        balance=models.Sum(models.F('total_amount') - models.F('amount_paid'))
+    ).values('balance')
+    uninvoiced_orders = SaleOrder.objects.live().filter(
+        customer=models.OuterRef('pk'),
+        accounts_receivable__isnull=True
+    ).order_by().values('customer').annotate(total=models.Sum('total_amount')).values('total')
+    exposure = Coalesce(models.Subquery(open_receivables), Decimal('0.00'), output_field=EXPOSURE_FIELD) + Coalesce(models.Subquery(uninvoiced_orders), Decimal('0.00'), output_field=EXPOSURE_FIELD)
+
+    updated = 0
+    last_id = 0
+    while True:
+        customer_ids = list(
+            Customer.objects.filter(tenant=tenant, pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not customer_ids:
+            return updated
+        with transaction.atomic():
+            updated += Customer.objects.filter(pk__in=customer_ids).update(open_exposure=exposure)
+        last_id = customer_ids[-1]
+
+
+def _match_status(*, ordered: Decimal, received: Decimal, billed: Decimal, received_amount: Decimal, billed_amount: Decimal, price_variance: bool) -> str:
+    MatchStatus = PurchaseOrderLineMatch.MatchStatus
+    if received > ordered:
+        return MatchStatus.OVER_RECEIVED
+    if price_variance:
+        return MatchStatus.PRICE_VARIANCE
+    if billed_amount > received_amount + MATCH_AMOUNT_TOLERANCE:
+        return MatchStatus.OVER_BILLED
+    if received == ordered and abs(billed - received) <= MATCH_QUANTITY_TOLERANCE:
+        return MatchStatus.MATCHED
+    return MatchStatus.PENDING
+
+
+@transaction.atomic
+def match_purchase_order_batch(*, purchase_order_ids: List[int]) -> int:
+    """
+    Match the lines of a batch of purchase orders against their receipts and bills.
+
+    The batch reads the order lines, the received quantities and prices by
+    line, and the billed totals by order with one grouped query each, then
+    upserts every line's match with a single statement.
+
+    Returns:
+        int: The number of lines matched.
+    """
+    cent = Decimal('0.01')
+    lines_by_order: Dict[int, list] = {}
+    landed_costs = {}
+    tenants = {}
+    for line_id, order_id, tenant_id, quantity, unit_price, freight, taxes in PurchaseOrderItem.objects.filter(
+        purchase_order_id__in=purchase_order_ids
+    ).values_list(
+        'pk', 'purchase_order_id', 'purchase_order__tenant_id', 'quantity', 'unit_price',
+        'purchase_order__freight_amount', 'purchase_order__taxes_amount'
+    ).order_by('pk'):
+        lines_by_order.setdefault(order_id, []).append(PurchaseOrderItem(id=line_id, quantity=quantity, unit_price=unit_price or Decimal('0.00')))
+        landed_costs[order_id] = freight + taxes
+        tenants[order_id] = tenant_id
+
+    receipts = {
+        line_id: (quantity, lowest_price, highest_price)
+        for line_id, quantity, lowest_price, highest_price in StockEntryItem.objects.filter(
+            purchase_order_item__purchase_order_id__in=purchase_order_ids,
+            stock_entry__status=StockEntry.StockEntryStatus.COMPLETED
+        ).values('purchase_order_item').annotate(
+            quantity=models.Sum('quantity'),
+            lowest_price=models.Min('unit_price'),
+            highest_price=models.Max('unit_price')
+        ).values_list('purchase_order_item', 'quantity', 'lowest_price', 'highest_price').order_by()
+    }
+    billed = dict(
+        AccountPayable.objects.filter(purchase_order_id__in=purchase_order_ids).values('purchase_order').annotate(
+            total=models.Sum('total_amount')
+        ).values_list('purchase_order', 'total').order_by()
+    )
+
+    matches = []
+    for order_id, lines in lines_by_order.items():
+        landed = allocate_landed_costs(lines=lines, amount=landed_costs[order_id], method='value')
+        billed_amounts = allocate_landed_costs(lines=lines, amount=billed.get(order_id, Decimal('0.00')), method='value')
+        for line in lines:
+            ordered_amount = (line.quantity * line.unit_price).quantize(cent, rounding=ROUND_HALF_UP) + landed[line.id]
+            unit_cost = ordered_amount / line.quantity if line.quantity else Decimal('0')
+            received, lowest_price, highest_price = receipts.get(line.id, (Decimal('0'), line.unit_price, line.unit_price))
+            received_amount = (received * unit_cost).quantize(cent, rounding=ROUND_HALF_UP)
+            billed_amount = billed_amounts[line.id]
+            billed_quantity = (billed_amount / unit_cost).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP) if unit_cost else Decimal('0')
+            matches.append(PurchaseOrderLineMatch(
+                tenant_id=tenants[order_id],
+                purchase_order_id=order_id,
+                purchase_order_item_id=line.id,
+                ordered_quantity=line.quantity,
+                received_quantity=received,
+                billed_quantity=billed_quantity,
+                ordered_amount=ordered_amount,
+                received_amount=received_amount,
+                billed_amount=billed_amount,
+                status=_match_status(
+                    ordered=line.quantity,
+                    received=received,
+                    billed=billed_quantity,
+                    received_amount=received_amount,
+                    billed_amount=billed_amount,
+                    price_variance=lowest_price != line.unit_price or highest_price != line.unit_price
+                )
+            ))
+
+    PurchaseOrderLineMatch.objects.bulk_create(
+        matches,
+        update_conflicts=True,
+        unique_fields=['purchase_order_item'],
+        update_fields=[
+            'ordered_quantity', 'received_quantity', 'billed_quantity',
+            'ordered_amount', 'received_amount', 'billed_amount', 'status', 'updated_at',
+        ]
+    )
+    return len(matches)
+
+
+def match_purchase_orders(*, tenant: Tenant, full: bool = False, batch_size: int = 500) -> Dict[str, int]:
+    """
+    Bring the three-way match of a tenant's purchase order lines up to date.
+
+    Only orders whose lines, receipts or bills changed since the previous
+    run (the watermark) are matched again; `full` matches every live order.
+    Orders are processed in batches of constant query count, one
+    transaction per batch, and deleted orders lose their matches.
+
+    Args:
+        tenant (Tenant): The tenant whose purchase orders are matched.
+        full (bool, optional): Ignore the watermark. Defaults to False.
+        batch_size (int, optional): Number of purchase orders matched per batch. Defaults to 500.
+
+    Returns:
+        Dict[str, int]: Number of 'lines' matched and of 'discrepancies' left for the tenant.
+    """
+    state, _ = PurchaseOrderMatchRefresh.objects.get_or_create(tenant=tenant)
+    started_at = timezone.now()
+
+    orders = PurchaseOrder.objects.filter(tenant=tenant)
+    if state.matched_until is not None and not full:
+        since = state.matched_until - MATCH_REFRESH_OVERLAP
+        changed = models.Q(updated_at__gte=since)
+        changed |= models.Q(pk__in=PurchaseOrderItem.objects.filter(updated_at__gte=since).values('purchase_order_id'))
+        changed |= models.Q(pk__in=StockEntry.objects.filter(updated_at__gte=since, purchase__isnull=False).values('purchase_id'))
+        changed |= models.Q(pk__in=StockEntryItem.objects.filter(updated_at__gte=since, purchase_order_item__isnull=False).values('purchase_order_item__purchase_order_id'))
+        changed |= models.Q(pk__in=AccountPayable.objects.filter(updated_at__gte=since, purchase_order__isnull=False).values('purchase_order_id'))
+        orders = orders.filter(changed)
+    PurchaseOrderLineMatch.objects.filter(tenant=tenant, purchase_order__deleted_at__isnull=False).delete()
+
+    matched = 0
+    last_id = 0
+    while True:
+        order_ids = list(orders.live().filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not order_ids:
+            break
+        matched += match_purchase_order_batch(purchase_order_ids=order_ids)
+        last_id = order_ids[-1]
+
+    state.matched_until = started_at
+    state.save(update_fields=['matched_until', 'updated_at'])
+    discrepancies = PurchaseOrderLineMatch.objects.filter(tenant=tenant, status__in=PURCHASE_ORDER_DISCREPANCIES).count()
+    return {'lines': matched, 'discrepancies': discrepancies}
@@ -0,0 +1,135 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from customers.models import Customer
+from financials.models import (AccountPayable, CashFlow, CompanyAccount,
+                               FinancialCategory, FinancialStatus,
+                               PurchaseOrderLineMatch,
+                               PurchaseOrderMatchRefresh)
+from financials.services import (MATCH_REFRESH_OVERLAP, FinancialError,
+                                 create_account_receivable,
+                                 match_purchase_orders,
+                                 rebuild_customer_exposure,
+                                 register_receivable_payment)
+from inventory.services import receive_purchase_order
+from products.models import Product
+from purchases.models import (PurchaseOrder, PurchaseOrderItem,
+                              PurchaseOrderStatus)
+from sales.models import SaleOrderStatus
+from sales.services import (SaleOrderError, cancel_sale_order,
+                            confirm_sale_order, create_sale_order)
+from suppliers.models import Supplier
+from tenants.models import Tenant
+from users.models import User
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(email="user@test.com", password="123456", name="User Test")
+
+
+@pytest.fixture
+def customer(db, tenant):
+    return Customer.objects.create(tenant=tenant, name="Cliente Teste", credit_limit=Decimal("150.00"))
+
+
+@pytest.fixture
+def product(db, tenant):
+    return Product.objects.create(tenant=tenant, name="Produto Teste", sku="SKU001", stock_quantity=100, price=Decimal("10.00"))
+
+
+@pytest.fixture
+def confirmed_status(db, tenant):
+    return SaleOrderStatus.objects.create(tenant=tenant, name="CONFIRMED", label="Confirmado", sequence_order=2)
+
+
+@pytest.fixture
+def canceled_status(db, tenant):
+    return SaleOrderStatus.objects.create(tenant=tenant, name="CANCELED", label="Cancelado", sequence_order=9)
+
+
+@pytest.fixture
+def receivable_data(db, tenant):
+    return {
+        "category": FinancialCategory.objects.create(tenant=tenant, name="SALES", label="Vendas", type=FinancialCategory.CategoryType.INCOME),
+        "status": FinancialStatus.objects.create(tenant=tenant, name="OPEN", label="Em aberto"),
+        "due_date": date(2026, 1, 31),
+    }
+
+
+def test_open_exposure_follows_orders_receivables_and_payments(
+    tenant, user, customer, product, confirmed_status, canceled_status, receivable_data
+):
+    first_order = create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 10}])
+    second_order = create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 6}])
+    customer.refresh_from_db()
+    assert customer.open_exposure == Decimal("160.00")
+
+    with pytest.raises(SaleOrderError, match="Credit limit exceeded"):
+        confirm_sale_order(tenant=tenant, sale_order=first_order, user=user)
+
+    cancel_sale_order(tenant=tenant, sale_order=second_order, user=user)
+    confirm_sale_order(tenant=tenant, sale_order=first_order, user=user)
+    receivable = create_account_receivable(
+        tenant=tenant, customer=customer, sale_order=first_order, total_amount=Decimal("100.00"), **receivable_data
+    )
+    customer.refresh_from_db()
+    assert customer.open_exposure == Decimal("100.00")
+
+    account = CompanyAccount.objects.create(tenant=tenant, account_name="Caixa")
+    register_receivable_payment(tenant=tenant, receivable=receivable, amount=Decimal("40.00"), company_account=account, user=user)
+    with pytest.raises(FinancialError, match="exceeds the outstanding balance"):
+        register_receivable_payment(tenant=tenant, receivable=receivable, amount=Decimal("70.00"), company_account=account)
+
+    customer.refresh_from_db()
+    account.refresh_from_db()
+    receivable.refresh_from_db()
+    assert customer.open_exposure == Decimal("60.00")
+    assert account.current_balance == Decimal("40.00")
+    assert receivable.amount_paid == Decimal("40.00") and receivable.payment_date is None
+    assert CashFlow.objects.get().amount == Decimal("40.00")
+
+    Customer.objects.update(open_exposure=0)
+    assert rebuild_customer_exposure(tenant=tenant) == 1
+    customer.refresh_from_db()
+    assert customer.open_exposure == Decimal("60.00")
+
+
+def test_match_purchase_orders_flags_discrepancies_incrementally(tenant, user, receivable_data, django_assert_max_num_queries):
+    supplier = Supplier.objects.create(tenant=tenant, name="Fornecedor Teste")
+    status = PurchaseOrderStatus.objects.create(tenant=tenant, name="OPEN", label="Aberto", sequence_order=1)
+    received_order = PurchaseOrder.objects.create(tenant=tenant, supplier=supplier, status=status)
+    pending_order = PurchaseOrder.objects.create(tenant=tenant, supplier=supplier, status=status)
+    for order in (received_order, pending_order):
+        for index, (quantity, unit_price) in enumerate([(10, Decimal("2.00")), (5, Decimal("4.00"))]):
+            product = Product.objects.create(tenant=tenant, name="Produto {}-{}".format(order.id, index), sku="SKU-{}-{}".format(order.id, index))
+            PurchaseOrderItem.objects.create(purchase_order=order, product=product, quantity=quantity, unit_price=unit_price)
+    receive_purchase_order(tenant=tenant, purchase_order=received_order, user=user)
+    payable_data = {
+        "tenant": tenant, "supplier": supplier, "purchase_order": received_order, "due_date": receivable_data["due_date"],
+        "status": receivable_data["status"], "category": receivable_data["category"],
+    }
+    AccountPayable.objects.create(total_amount=Decimal("40.00"), **payable_data)
+
+    with django_assert_max_num_queries(15):
+        assert match_purchase_orders(tenant=tenant) == {"lines": 4, "discrepancies": 0}
+    statuses = dict(PurchaseOrderLineMatch.objects.values_list("purchase_order_id", "status").distinct())
+    assert statuses == {received_order.id: "MA", pending_order.id: "PE"}
+
+    # A later run only matches the orders changed since the previous one.
+    PurchaseOrderMatchRefresh.objects.update(matched_until=timezone.now() + MATCH_REFRESH_OVERLAP)
+    assert match_purchase_orders(tenant=tenant) == {"lines": 0, "discrepancies": 0}
+    PurchaseOrderMatchRefresh.objects.update(matched_until=timezone.now() + MATCH_REFRESH_OVERLAP)
+
+    AccountPayable.objects.create(total_amount=Decimal("10.00"), **payable_data)
+    assert match_purchase_orders(tenant=tenant) == {"lines": 2, "discrepancies": 2}
+    match = PurchaseOrderLineMatch.objects.get(purchase_order=received_order, ordered_quantity=10)
+    assert (match.billed_amount, match.billed_quantity, match.status) == (Decimal("25.00"), Decimal("12.500"), "OB")
@@ -1,14 +1,15 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
 from .models import (StockAdjustment, StockAdjustmentItem, StockAdjustmentType,
                      StockEntry, StockEntryItem, StockMovement)
+from .services import InventoryError, complete_stock_entry
 
 
 class StockEntryItemInline(admin.TabularInline):
     model = StockEntryItem
     extra = 1
     autocomplete_fields = ['product']
-    fields = ('product', 'quantity', 'unit_price', 'expiration_date')
+    fields = ('product', 'quantity', 'unit_price', 'landed_cost_amount', 'expiration_date')
 
 
 class StockAdjustmentItemInline(admin.TabularInline):
@@ -25,7 +26,10 @@ class StockEntryAdmin(admin.ModelAdmin):
     search_fields = ('id', 'supplier__name', 'purchase__id', 'notes')
     autocomplete_fields = ['tenant', 'purchase', 'supplier', 'user']
     inlines = [StockEntryItemInline]
-    readonly_fields = ('created_at', 'updated_at')
+    # Entries are completed through the action, which posts their stock
+    # movements and advances the received quantities of their purchase order.
+    readonly_fields = ('status', 'created_at', 'updated_at')
+    actions = ['complete_entries']
     fieldsets = (
         ('Informações Principais', {
             'fields': ('tenant', 'status', 'supplier', 'purchase', 'user')
@@ -38,6 +42,18 @@ class StockEntryAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Concluir entradas selecionadas')
+    def complete_entries(self, request, queryset):
+        completed = 0
+        for stock_entry in queryset.filter(status=StockEntry.StockEntryStatus.DRAFT).select_related('tenant'):
+            try:
+                complete_stock_entry(tenant=stock_entry.tenant, stock_entry=stock_entry, user=request.user)
+            except InventoryError as error:
+                self.message_user(request, 'Entrada #{}: {}'.format(stock_entry.id, error), messages.ERROR)
+            else:
+                completed += 1
+        self.message_user(request, '{} entradas concluídas.'.format(completed))
+
 
 @admin.register(StockEntryItem)
 class StockEntryItemAdmin(admin.ModelAdmin):
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.services import (FORECAST_METHODS,
+                                update_minimum_stock_quantities)
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Set the minimum stock quantity of every product from its forecast outbound demand.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only forecast this tenant id.')
+        parser.add_argument('--days', type=int, default=90, help='Days of demand history used.')
+        parser.add_argument('--method', choices=FORECAST_METHODS, default='exponential_smoothing')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            updated = update_minimum_stock_quantities(
+                tenant=tenant,
+                history_days=options['days'],
+                method=options['method'],
+                batch_size=options['batch_size']
+            )
+            self.stdout.write('{}: {} minimum stock quantities updated in {:.1f}s.'.format(tenant, updated, time.monotonic() - started))
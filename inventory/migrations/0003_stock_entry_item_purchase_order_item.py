@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_received_quantities(apps, schema_editor):
+    """
+    Spread the quantities already received through completed stock entries
+    over the lines of their purchase orders, in line order.
+    """
+    StockEntryItem = apps.get_model('inventory', 'StockEntryItem')
+    PurchaseOrderItem = apps.get_model('purchases', 'PurchaseOrderItem')
+
+    received = {
+        (row['stock_entry__purchase_id'], row['product_id']): row['total']
+        for row in StockEntryItem.objects.filter(
+            stock_entry__status='CO',
+            stock_entry__purchase__isnull=False
+        ).values('stock_entry__purchase_id', 'product_id').annotate(total=models.Sum('quantity')).order_by()
+    }
+    if not received:
+        return
+
+    updated = []
+    for item in PurchaseOrderItem.objects.filter(purchase_order_id__in={key[0] for key in received}).order_by('id').iterator():
+        remaining = received.get((item.purchase_order_id, item.product_id))
+        if not remaining:
+            continue
+        item.received_quantity = min(item.quantity, remaining)
+        received[(item.purchase_order_id, item.product_id)] = remaining - item.received_quantity
+        updated.append(item)
+    PurchaseOrderItem.objects.bulk_update(updated, ['received_quantity'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stockentryitem_tenant'),
+        ('purchases', '0004_purchase_order_item_received_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockentryitem',
+            name='purchase_order_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_entry_items', to='purchases.purchaseorderitem'),
+        ),
+        migrations.RunPython(backfill_received_quantities, migrations.RunPython.noop),
+    ]
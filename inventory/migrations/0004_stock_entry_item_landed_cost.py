@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_stock_entry_item_purchase_order_item'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockentryitem',
+            name='landed_cost_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+    ]
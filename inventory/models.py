@@ -4,7 +4,7 @@ from django.contrib.contenttypes.models import ContentType
 from django.db import models
 
 from products.models import Product
-from purchases.models import PurchaseOrder
+from purchases.models import PurchaseOrder, PurchaseOrderItem
 from suppliers.models import Supplier
 from tenants.models import Tenant
 
@@ -36,9 +36,11 @@ class StockEntry(models.Model):
 class StockEntryItem(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='stock_entry_items')
     stock_entry = models.ForeignKey(StockEntry, on_delete=models.CASCADE, related_name='items')
+    purchase_order_item = models.ForeignKey(PurchaseOrderItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='stock_entry_items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_entry_items')
     quantity = models.DecimalField(max_digits=10, decimal_places=3, default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    landed_cost_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     expiration_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -1,12 +1,22 @@
-from decimal import Decimal
-from typing import Any, Dict, List
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+import numpy as np
 from django.contrib.contenttypes.models import ContentType
 from django.db import models, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 
+from productions.models import ProductionOrder
 from products.models import Product
-from purchases.models import PurchaseOrder
-from suppliers.models import Supplier
+from purchases.models import PurchaseOrder, PurchaseOrderItem
+from purchases.services import (PurchaseOrderError, allocate_landed_costs,
+                                closed_purchase_orders_filter)
+from sales.models import SaleOrderItem
+from suppliers.models import Supplier, SupplierProduct
 from tenants.models import Tenant
 from users.models import User
 
@@ -19,6 +29,98 @@ class InventoryError(Exception):
     pass
 
 
+def _weighted_average_cost(product: Product, quantity: Decimal, unit_price: Decimal) -> Decimal:
+    """
+    Return the average cost of a product after receiving a quantity at a unit price.
+
+    The stock on hand keeps its average cost; stock below zero is not
+    valued, so receiving into it restarts the average at the new price.
+    """
+    on_hand = max(product.stock_quantity, Decimal('0'))
+    total = on_hand + quantity
+    if total <= 0:
+        return product.avg_cost_price
+    value = on_hand * product.avg_cost_price + quantity * unit_price
+    return (value / total).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+@transaction.atomic
+def _create_stock_movements(
+    *,
+    tenant: Tenant,
+    user: User,
+    movements_data: List[Dict[str, Any]]
+) -> List[StockMovement]:
+    """
+    Create a batch of stock movement records.
+
+    All the products involved are locked with a single query and every
+    movement is validated before anything is written; product balances are
+    then updated with one bulk UPDATE and the movements inserted in bulk.
+    Inbound movements flagged with 'update_cost' (receipts and production
+    output, whose unit price is a cost) also move the product's average
+    cost (see _weighted_average_cost); other unit prices, such as the
+    selling price of returned goods, are only recorded.
+
+    Args:
+        tenant (Tenant): The tenant associated with the stock movements.
+        user (User): The user performing the action.
+        movements_data (List[Dict[str, Any]]): List of dictionaries containing movement data ('product', 'direction', 'quantity', 'source_document', 'unit_price', 'update_cost', 'notes').
+
+    Returns:
+        List[StockMovement]: The created stock movement records, in the given order.
+    """
+    for data in movements_data:
+        if data['quantity'] <= 0:
+            raise InventoryError("Quantity must be greater than zero.")
+        if data['direction'] not in StockMovement.MovementDirection.values:
+            raise InventoryError("Invalid movement direction: {}".format(data['direction']))
+
+    product_ids = {data['product'].id for data in movements_data}
+    products = {
+        product.id: product
+        for product in Product.objects.select_for_update().filter(tenant=tenant, id__in=product_ids).order_by('id')
+    }
+    if len(products) != len(product_ids):
+        raise InventoryError("Products do not belong to this tenant.")
+
+    content_types = ContentType.objects.get_for_models(*{type(data['source_document']) for data in movements_data})
+
+    movements = []
+    shortages = []
+    for data in movements_data:
+        product = products[data['product'].id]
+        if data['direction'] == StockMovement.MovementDirection.IN:
+            if data.get('update_cost') and data.get('unit_price') is not None:
+                product.avg_cost_price = _weighted_average_cost(product, data['quantity'], data['unit_price'])
+            product.stock_quantity += data['quantity']
+        else:
+            if product.stock_quantity < data['quantity'] and product.name not in shortages:
+                shortages.append(product.name)
+            product.stock_quantity -= data['quantity']
+
+        source_document = data['source_document']
+        movements.append(StockMovement(
+            tenant=tenant,
+            product=product,
+            direction=data['direction'],
+            quantity=data['quantity'],
+            new_stock=product.stock_quantity,
+            unit_price=data.get('unit_price', None),
+            source_content_type=content_types[type(source_document)],
+            source_object_id=source_document.id,
+            user=user,
+            notes=data.get('notes', None)
+        ))
+
+    if shortages:
+        raise InventoryError("Insufficient stock for product {}".format(', '.join(shortages)))
+
+    Product.objects.bulk_update(products.values(), ['stock_quantity', 'avg_cost_price'])
+    schedule_supply_projections_invalidation(tenant.id, products.keys())
+    return StockMovement.objects.bulk_create(movements)
+
+
 @transaction.atomic
 def _create_stock_movement(
     *,
@@ -47,38 +149,19 @@ def _create_stock_movement(
     Returns:
         StockMovement: The created stock movement record.
     """
-    if quantity <= 0:
-        raise InventoryError("Quantity must be greater than zero.")
-
-    product = Product.objects.select_for_update().get(pk=product.id, tenant=tenant)
-
-    if direction == StockMovement.MovementDirection.IN:
-        new_stock = product.stock_quantity + quantity
-    elif direction == StockMovement.MovementDirection.OUT:
-        if product.stock_quantity < quantity:
-            raise InventoryError("Insufficient stock for product {}".format(product.name))
-        new_stock = product.stock_quantity - quantity
-    else:
-        raise InventoryError("Invalid movement direction: {}".format(direction))
-
-    product.stock_quantity = new_stock
-    product.save(update_fields=['stock_quantity'])
-
-    content_type = ContentType.objects.get_for_model(source_document)
-    movement = StockMovement.objects.create(
+    movements = _create_stock_movements(
         tenant=tenant,
-        product=product,
-        direction=direction,
-        quantity=quantity,
-        new_stock=new_stock,
-        unit_price=unit_price,
-        source_content_type=content_type,
-        source_object_id=source_document.id,
         user=user,
-        notes=notes
+        movements_data=[{
+            'product': product,
+            'direction': direction,
+            'quantity': quantity,
+            'source_document': source_document,
+            'unit_price': unit_price,
+            'notes': notes
+        }]
     )
-
-    return movement
+    return movements[0]
 
 
 @transaction.atomic
@@ -99,7 +182,7 @@ def create_stock_entry(
     Args:
         tenant (Tenant): The tenant associated with the stock entry.
         user (User): The user creating the stock entry.
-        items_data (List[Dict[str, Any]]): List of dictionaries containing item data ('product', 'quantity', 'unit_price', 'expiration_date').
+        items_data (List[Dict[str, Any]]): List of dictionaries containing item data ('product', 'quantity', 'unit_price', 'expiration_date', 'purchase_order_item', 'landed_cost_amount').
         purchase (PurchaseOrder, optional): Associated purchase order. Defaults to None.
         supplier (Supplier, optional): Associated supplier. Defaults to None.
         status (str, optional): Status of the stock entry. Defaults to StockEntryStatus.DRAFT.
@@ -117,26 +200,90 @@ def create_stock_entry(
         notes=notes
     )
 
-    for item_data in items_data:
-        StockEntryItem.objects.create(
+    StockEntryItem.objects.bulk_create([
+        StockEntryItem(
             tenant=tenant,
             stock_entry=stock_entry,
             product=item_data['product'],
+            purchase_order_item=item_data.get('purchase_order_item', None),
             quantity=item_data['quantity'],
             unit_price=item_data['unit_price'],
+            landed_cost_amount=item_data.get('landed_cost_amount', Decimal('0.00')),
             expiration_date=item_data.get('expiration_date', None)
         )
+        for item_data in items_data
+    ])
 
-        if status == StockEntry.StockEntryStatus.COMPLETED:
-            stock_entry = complete_stock_entry(
-                tenant=tenant,
-                stock_entry=stock_entry,
-                user=user
-            )
+    if status == StockEntry.StockEntryStatus.COMPLETED:
+        stock_entry = complete_stock_entry(
+            tenant=tenant,
+            stock_entry=stock_entry,
+            user=user
+        )
 
     return stock_entry
 
 
+def _landed_unit_price(item: StockEntryItem) -> Decimal:
+    if not item.landed_cost_amount or not item.quantity:
+        return item.unit_price
+    return (item.unit_price + item.landed_cost_amount / item.quantity).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _advance_received_quantities(*, stock_entry: StockEntry, items: List[StockEntryItem]) -> None:
+    """
+    Add the quantities of a completed entry's items to the received quantity
+    of their purchase order lines, with one locking read and one bulk UPDATE.
+
+    Items without a line, on an entry of a purchase order, are spread over
+    the order's lines of the same product in line order (as the received
+    quantity backfill does) and linked to the first of them.
+    """
+    line_ids = {item.purchase_order_item_id for item in items if item.purchase_order_item_id is not None}
+    unlinked = []
+    if stock_entry.purchase_id is not None:
+        unlinked = [item for item in items if item.purchase_order_item_id is None]
+    if not line_ids and not unlinked:
+        return
+
+    lines_filter = models.Q(pk__in=line_ids)
+    if unlinked:
+        lines_filter |= models.Q(purchase_order_id=stock_entry.purchase_id, product_id__in={item.product_id for item in unlinked})
+    lines = {line.pk: line for line in PurchaseOrderItem.objects.select_for_update().filter(lines_filter).order_by('pk')}
+    if not lines:
+        return
+
+    now = timezone.now()
+    changed = {}
+    for item in items:
+        if item.purchase_order_item_id in lines:
+            line = lines[item.purchase_order_item_id]
+            line.received_quantity += item.quantity
+            line.updated_at = now
+            changed[line.pk] = line
+
+    linked = []
+    for item in unlinked:
+        remaining = item.quantity
+        candidates = [line for line in lines.values() if line.purchase_order_id == stock_entry.purchase_id and line.product_id == item.product_id]
+        for line in candidates:
+            quantity = min(remaining, max(line.quantity - line.received_quantity, Decimal('0')))
+            if quantity <= 0:
+                continue
+            if item.purchase_order_item_id is None:
+                item.purchase_order_item_id = line.pk
+                linked.append(item)
+            line.received_quantity += quantity
+            line.updated_at = now
+            changed[line.pk] = line
+            remaining -= quantity
+            if remaining <= 0:
+                break
+
+    PurchaseOrderItem.objects.bulk_update(changed.values(), ['received_quantity', 'updated_at'])
+    StockEntryItem.objects.bulk_update(linked, ['purchase_order_item'])
+
+
 @transaction.atomic
 def complete_stock_entry(
     *,
@@ -146,27 +293,138 @@ def complete_stock_entry(
 ) -> StockEntry:
     """
     Complete a stock entry, changing its status to COMPLETED and creating stock movements.
+
+    Items are valued at their unit price plus their share of landed costs,
+    which is what their inbound movements feed into the average cost. The
+    received quantity of the purchase order lines they fulfil is advanced
+    (see _advance_received_quantities), whichever way the entry was created.
     """
     if stock_entry.status != StockEntry.StockEntryStatus.DRAFT:
         raise InventoryError("Only draft stock entries can be completed.")
 
-    for item in stock_entry.items.all():
-        _create_stock_movement(
-            tenant=tenant,
-            product=item.product,
-            direction=StockMovement.MovementDirection.IN,
-            quantity=item.quantity,
-            source_document=item,
-            user=user,
-            unit_price=item.unit_price,
-            notes=f"Entrada de estoque #{stock_entry.id} - {item.product.name}"
-        )
+    items = list(stock_entry.items.select_related('product'))
+    _create_stock_movements(
+        tenant=tenant,
+        user=user,
+        movements_data=[
+            {
+                'product': item.product,
+                'direction': StockMovement.MovementDirection.IN,
+                'quantity': item.quantity,
+                'source_document': item,
+                'unit_price': _landed_unit_price(item),
+                'update_cost': True,
+                'notes': f"Entrada de estoque #{stock_entry.id} - {item.product.name}"
+            }
+            for item in items
+        ]
+    )
+    _advance_received_quantities(stock_entry=stock_entry, items=items)
 
     stock_entry.status = StockEntry.StockEntryStatus.COMPLETED
-    stock_entry.save(update_fields=['status'])
+    stock_entry.save(update_fields=['status', 'updated_at'])
     return stock_entry
 
 
+@transaction.atomic
+def receive_purchase_order(
+    *,
+    tenant: Tenant,
+    purchase_order: PurchaseOrder,
+    user: User,
+    quantities: Dict[int, Decimal] = None,
+    landed_cost_method: str = 'value',
+    notes: str = None
+) -> StockEntry:
+    """
+    Receive the goods of a purchase order into stock.
+
+    A completed stock entry is created from the order lines, each entry item
+    linked to its line, and completing it advances every line's received
+    quantity (see complete_stock_entry). The order lines are read and locked
+    with one query, the entry items inserted and the counters updated in
+    bulk, and all movements posted in one batch, whatever the number of lines.
+
+    The order's freight and taxes are allocated across all its lines (see
+    purchases.services.allocate_landed_costs) and each receipt carries the
+    share of the quantity it receives, the last receipt of a line taking
+    whatever its earlier receipts left, so the line's receipts add up to
+    exactly its allocation. The landed cost is part of the unit price the
+    inbound movements feed into the products' average cost.
+
+    Args:
+        tenant (Tenant): The tenant associated with the purchase order.
+        purchase_order (PurchaseOrder): The purchase order being received.
+        user (User): The user receiving the goods.
+        quantities (Dict[int, Decimal], optional): Quantity received by purchase order item id, for a partial receipt. Defaults to the outstanding quantity of every line.
+        landed_cost_method (str, optional): Basis of the landed cost allocation: 'value', 'weight' or 'quantity'. Defaults to 'value'.
+        notes (str, optional): Notes for the stock entry. Defaults to None.
+
+    Returns:
+        StockEntry: The completed stock entry.
+    """
+    purchase_order = PurchaseOrder.objects.select_for_update().get(pk=purchase_order.pk, tenant=tenant)
+    if purchase_order.deleted_at is not None:
+        raise InventoryError("Deleted purchase orders cannot be received.")
+
+    all_lines = list(purchase_order.items.select_for_update().select_related('product').order_by('pk'))
+    lines = all_lines
+    if quantities is not None:
+        lines = [line for line in all_lines if line.pk in quantities]
+        if len(lines) != len(quantities):
+            raise InventoryError("Items do not belong to purchase order #{}.".format(purchase_order.id))
+
+    landed_cost = purchase_order.freight_amount + purchase_order.taxes_amount
+    try:
+        allocations = allocate_landed_costs(lines=all_lines, amount=landed_cost, method=landed_cost_method)
+    except PurchaseOrderError as error:
+        raise InventoryError(str(error))
+    already_landed: Dict[int, Decimal] = {}
+    if landed_cost:
+        already_landed = dict(
+            StockEntryItem.objects.filter(purchase_order_item__in=lines).values('purchase_order_item').annotate(
+                total=models.Sum('landed_cost_amount')
+            ).values_list('purchase_order_item', 'total').order_by()
+        )
+
+    items_data = []
+    for line in lines:
+        outstanding = line.quantity - line.received_quantity
+        quantity = outstanding if quantities is None else Decimal(str(quantities[line.pk]))
+        if quantities is None and quantity <= 0:
+            continue
+        if quantity <= 0:
+            raise InventoryError("Quantity must be greater than zero.")
+        if quantity > outstanding:
+            raise InventoryError("Received quantity of {} exceeds the outstanding quantity of {}.".format(line.product.name, outstanding))
+
+        allocation = allocations[line.pk]
+        if quantity == outstanding:
+            landed_cost_amount = allocation - already_landed.get(line.pk, Decimal('0.00'))
+        else:
+            landed_cost_amount = (allocation * quantity / line.quantity).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+        items_data.append({
+            'product': line.product,
+            'purchase_order_item': line,
+            'quantity': quantity,
+            'unit_price': line.unit_price or Decimal('0.00'),
+            'landed_cost_amount': landed_cost_amount
+        })
+    if not items_data:
+        raise InventoryError("Purchase order #{} has nothing left to receive.".format(purchase_order.id))
+
+    return create_stock_entry(
+        tenant=tenant,
+        user=user,
+        items_data=items_data,
+        purchase=purchase_order,
+        supplier=purchase_order.supplier,
+        status=StockEntry.StockEntryStatus.COMPLETED,
+        notes=notes
+    )
+
+
 @transaction.atomic
 def create_stock_adjustment(
     *,
@@ -235,17 +493,383 @@ def complete_stock_adjustment(
     if stock_adjustment.status != StockAdjustment.StockAdjustmentStatus.DRAFT:
         raise InventoryError("Only draft stock adjustments can be completed.")
 
-    for item in stock_adjustment.items.all():
-        _create_stock_movement(
-            tenant=tenant,
-            product=item.product,
-            direction=item.adjustment_type.direction,
-            quantity=item.quantity,
-            source_document=item,
-            user=user,
-            notes=f"Ajuste de estoque #{stock_adjustment.id} - {item.product.name}"
-        )
+    _create_stock_movements(
+        tenant=tenant,
+        user=user,
+        movements_data=[
+            {
+                'product': item.product,
+                'direction': item.adjustment_type.direction,
+                'quantity': item.quantity,
+                'source_document': item,
+                'notes': f"Ajuste de estoque #{stock_adjustment.id} - {item.product.name}"
+            }
+            for item in stock_adjustment.items.select_related('product', 'adjustment_type')
+        ]
+    )
 
     stock_adjustment.status = StockAdjustment.StockAdjustmentStatus.COMPLETED
     stock_adjustment.save(update_fields=['status'])
     return stock_adjustment
+
+
+# Projections are also invalidated by the documents that feed them; the TTL
+# bounds how long another process may serve a projection it did not see change.
+SUPPLY_PROJECTION_TTL = 300
+
+
+class SupplyProjection:
+    """
+    Time-phased availability of a product.
+
+    `available` is the stock on hand minus the quantities reserved by sale
+    orders not yet confirmed; `receipts` are the dated quantities still
+    expected from open purchase and production orders, in date order.
+    """
+
+    def __init__(self, available: Decimal, receipts: List[Tuple[date, Decimal]]):
+        self.available = available
+        self.receipts = receipts
+        self.built_at = time.monotonic()
+
+    def available_on(self, day: date) -> Decimal:
+        """
+        Return the quantity available to promise on a given day.
+        """
+        return self.available + sum((quantity for receipt_date, quantity in self.receipts if receipt_date <= day), Decimal('0'))
+
+    def promise_date(self, quantity: Decimal, today: date) -> Optional[date]:
+        """
+        Return the first day, from today on, on which the quantity is available.
+
+        Overdue receipts are assumed to arrive today. Returns None when the
+        projected supply never covers the quantity.
+        """
+        cumulative = self.available
+        if cumulative >= quantity:
+            return today
+        for receipt_date, receipt_quantity in self.receipts:
+            cumulative += receipt_quantity
+            if cumulative >= quantity:
+                return max(receipt_date, today)
+        return None
+
+
+_supply_projections: Dict[Tuple[int, int], SupplyProjection] = {}
+_supply_projections_lock = threading.Lock()
+
+
+def _build_supply_projections(*, tenant: Tenant, product_ids: List[int]) -> Dict[int, SupplyProjection]:
+    """
+    Build the projections of a set of products with one aggregate query per source.
+    """
+    on_hand = dict(Product.objects.filter(tenant=tenant, pk__in=product_ids).values_list('pk', 'stock_quantity'))
+
+    reserved = dict(
+        SaleOrderItem.objects.filter(
+            sale_order__tenant=tenant,
+            sale_order__deleted_at__isnull=True,
+            sale_order__confirmed_at__isnull=True,
+            product_id__in=product_ids
+        ).values('product_id').annotate(total=models.Sum('quantity')).values_list('product_id', 'total').order_by()
+    )
+
+    receipts: Dict[int, Dict[date, Decimal]] = {}
+    for product_id, expected_date, outstanding in PurchaseOrderItem.objects.filter(
+        purchase_order__tenant=tenant,
+        purchase_order__deleted_at__isnull=True,
+        purchase_order__expected_delivery_date__isnull=False,
+        product_id__in=product_ids,
+        quantity__gt=models.F('received_quantity')
+    ).exclude(
+        closed_purchase_orders_filter('purchase_order__')
+    ).values('product_id', 'purchase_order__expected_delivery_date').annotate(
+        total=models.Sum(models.F('quantity') - models.F('received_quantity'))
+    ).values_list('product_id', 'purchase_order__expected_delivery_date', 'total').order_by():
+        product_receipts = receipts.setdefault(product_id, {})
+        product_receipts[expected_date] = product_receipts.get(expected_date, Decimal('0')) + outstanding
+
+    for product_id, due_date, total in ProductionOrder.objects.filter(
+        tenant=tenant,
+        completed_at__isnull=True,
+        due_date__isnull=False,
+        product_id__in=product_ids
+    ).values('product_id', 'due_date').annotate(total=models.Sum('quantity')).values_list('product_id', 'due_date', 'total').order_by():
+        product_receipts = receipts.setdefault(product_id, {})
+        product_receipts[due_date] = product_receipts.get(due_date, Decimal('0')) + total
+
+    return {
+        product_id: SupplyProjection(
+            stock_quantity - reserved.get(product_id, Decimal('0')),
+            sorted(receipts.get(product_id, {}).items())
+        )
+        for product_id, stock_quantity in on_hand.items()
+    }
+
+
+def get_supply_projections(*, tenant: Tenant, product_ids: Iterable[int]) -> Dict[int, SupplyProjection]:
+    """
+    Return the supply projections of a tenant's products, building the missing ones.
+
+    Args:
+        tenant (Tenant): The tenant owning the products.
+        product_ids (Iterable[int]): The products to project.
+
+    Returns:
+        Dict[int, SupplyProjection]: Projection by product id; products of other tenants are left out.
+    """
+    product_ids = set(product_ids)
+    now = time.monotonic()
+    projections = {}
+    with _supply_projections_lock:
+        for product_id in product_ids:
+            projection = _supply_projections.get((tenant.id, product_id))
+            if projection is not None and now - projection.built_at < SUPPLY_PROJECTION_TTL:
+                projections[product_id] = projection
+
+    missing = sorted(product_ids - projections.keys())
+    if missing:
+        built = _build_supply_projections(tenant=tenant, product_ids=missing)
+        with _supply_projections_lock:
+            for product_id, projection in built.items():
+                _supply_projections[(tenant.id, product_id)] = projection
+        projections.update(built)
+    return projections
+
+
+def invalidate_supply_projections(tenant_id: int, product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Drop the cached projections of a tenant, of the given products or of all of them.
+    """
+    with _supply_projections_lock:
+        if product_ids is None:
+            keys = [key for key in _supply_projections if key[0] == tenant_id]
+        else:
+            keys = [(tenant_id, product_id) for product_id in product_ids]
+        for key in keys:
+            _supply_projections.pop(key, None)
+
+
+def schedule_supply_projections_invalidation(tenant_id: int, product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Invalidate cached projections once the current transaction commits.
+    """
+    if not _supply_projections:
+        return
+    if product_ids is not None:
+        product_ids = list(product_ids)
+    transaction.on_commit(lambda: invalidate_supply_projections(tenant_id, product_ids))
+
+
+def get_available_to_promise(
+    *,
+    tenant: Tenant,
+    items_data: List[Dict[str, Any]],
+    sale_order=None,
+    today: date = None
+) -> Dict[str, Any]:
+    """
+    Answer when a whole order can ship.
+
+    Lines of the same product are added up and each product is checked
+    against its time-phased projection; the order ships when its last
+    product is available.
+
+    Args:
+        tenant (Tenant): The tenant quoting the order.
+        items_data (List[Dict[str, Any]]): List of dictionaries containing item data ('product', 'quantity').
+        sale_order (SaleOrder, optional): The pending order being quoted, whose own reservation is not counted against it. Defaults to None.
+        today (date, optional): The first promisable day. Defaults to the current date.
+
+    Returns:
+        Dict[str, Any]: 'date', the promise date of the order (None when it cannot be fully supplied), and 'lines', the promise date by product id.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    required: Dict[int, Decimal] = {}
+    for item_data in items_data:
+        quantity = Decimal(str(item_data['quantity']))
+        if quantity <= 0:
+            raise InventoryError("Quantity must be greater than zero.")
+        product_id = item_data['product'].id
+        required[product_id] = required.get(product_id, Decimal('0')) + quantity
+
+    projections = get_supply_projections(tenant=tenant, product_ids=required)
+    if len(projections) != len(required):
+        raise InventoryError("Products do not belong to this tenant.")
+
+    if sale_order is not None and sale_order.confirmed_at is None and sale_order.deleted_at is None:
+        own = sale_order.items.filter(product_id__in=required).values('product_id').annotate(total=models.Sum('quantity')).values_list('product_id', 'total').order_by()
+        for product_id, total in own:
+            required[product_id] -= total
+
+    lines = {product_id: projections[product_id].promise_date(quantity, today) for product_id, quantity in required.items()}
+    promise_date = None if None in lines.values() else max(lines.values(), default=today)
+    return {'date': promise_date, 'lines': lines}
+
+
+# Lead time assumed for products without an active supplier declaring one.
+DEFAULT_LEAD_TIME_DAYS = 7
+
+FORECAST_METHODS = ('moving_average', 'exponential_smoothing')
+
+
+def forecast_reorder_points(
+    demand: np.ndarray,
+    lead_times: np.ndarray,
+    *,
+    method: str = 'exponential_smoothing',
+    window: int = 28,
+    alpha: float = 0.3,
+    service_factor: float = 1.65
+) -> np.ndarray:
+    """
+    Compute reorder points for a matrix of daily demand, one row per product.
+
+    The daily demand is forecast with a moving average over the last
+    `window` days or with simple exponential smoothing (seeded with the
+    first day), both computed as one weighted sum over all rows. The reorder
+    point covers the forecast demand over the lead time plus a safety stock
+    of `service_factor` standard deviations of the daily demand, scaled to
+    the lead time (1.65 is a 95% service level).
+
+    Args:
+        demand (np.ndarray): Daily demand, shape (products, days), oldest day first.
+        lead_times (np.ndarray): Lead time in days of each product, shape (products,).
+        method (str, optional): 'moving_average' or 'exponential_smoothing'. Defaults to 'exponential_smoothing'.
+        window (int, optional): Days averaged by the moving average. Defaults to 28.
+        alpha (float, optional): Smoothing factor of the exponential smoothing. Defaults to 0.3.
+        service_factor (float, optional): Safety stock in standard deviations. Defaults to 1.65.
+
+    Returns:
+        np.ndarray: The reorder point of each product.
+    """
+    days = demand.shape[1]
+    if method == 'moving_average':
+        window = min(window, days)
+        weights = np.zeros(days)
+        weights[-window:] = 1.0 / window
+    elif method == 'exponential_smoothing':
+        weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=float)
+        weights[0] = (1 - alpha) ** (days - 1)
+    else:
+        raise InventoryError("Unknown forecast method: {}".format(method))
+
+    forecast = demand @ weights
+    deviation = demand.std(axis=1, ddof=1) if days > 1 else np.zeros(len(demand))
+    return forecast * lead_times + service_factor * deviation * np.sqrt(lead_times)
+
+
+def update_minimum_stock_quantities(
+    *,
+    tenant: Tenant,
+    history_days: int = 90,
+    method: str = 'exponential_smoothing',
+    batch_size: int = 1000,
+    today: date = None,
+    **forecast_options
+) -> int:
+    """
+    Set the minimum stock quantity of a tenant's products from their forecast demand.
+
+    The stock consumed by sale orders (net of cancellations) and by
+    production orders is summed per product and day with one aggregate query
+    per batch of products, the reorder points of the whole batch are computed
+    at once by forecast_reorder_points, and the changed products are written
+    back with bulk_update. Stock adjustments are not demand. The lead time of a product is
+    the shortest lead time of its active suppliers. Products without demand
+    in the period keep their current minimum.
+
+    Args:
+        tenant (Tenant): The tenant whose products are updated.
+        history_days (int, optional): Days of demand history used, up to yesterday. Defaults to 90.
+        method (str, optional): Forecast method, see FORECAST_METHODS. Defaults to 'exponential_smoothing'.
+        batch_size (int, optional): Number of products forecast per batch. Defaults to 1000.
+        today (date, optional): The day of the forecast. Defaults to the current date.
+        **forecast_options: Passed on to forecast_reorder_points.
+
+    Returns:
+        int: The number of products whose minimum stock quantity changed.
+    """
+    if method not in FORECAST_METHODS:
+        raise InventoryError("Unknown forecast method: {}".format(method))
+    if today is None:
+        today = timezone.localdate()
+    start = today - timedelta(days=history_days)
+    # Bounds in local time, so the days match those of TruncDate.
+    period = (
+        timezone.make_aware(datetime.combine(start, datetime.min.time())),
+        timezone.make_aware(datetime.combine(today, datetime.min.time())),
+    )
+
+    # Demand is what sale orders and production orders consumed; sale order
+    # lines whose stock was returned by a cancellation do not count.
+    content_types = ContentType.objects.get_for_models(SaleOrderItem, ProductionOrder)
+    sale_item_type, production_type = content_types[SaleOrderItem], content_types[ProductionOrder]
+    returned_items = StockMovement.objects.filter(
+        tenant=tenant,
+        source_content_type=sale_item_type,
+        direction=StockMovement.MovementDirection.IN
+    ).values('source_object_id')
+    demand = models.Q(source_content_type=production_type) | (
+        models.Q(source_content_type=sale_item_type) & ~models.Q(source_object_id__in=returned_items)
+    )
+
+    updated = 0
+    last_id = 0
+    while True:
+        product_ids = list(
+            Product.objects.live().filter(tenant=tenant, pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not product_ids:
+            return updated
+        last_id = product_ids[-1]
+
+        rows = list(
+            StockMovement.objects.filter(
+                demand,
+                tenant=tenant,
+                product_id__in=product_ids,
+                direction=StockMovement.MovementDirection.OUT,
+                created_at__gte=period[0],
+                created_at__lt=period[1]
+            ).annotate(day=TruncDate('created_at')).values('product_id', 'day').annotate(
+                total=models.Sum('quantity')
+            ).values_list('product_id', 'day', 'total').order_by()
+        )
+        if not rows:
+            continue
+
+        forecast_ids = sorted({product_id for product_id, _, _ in rows})
+        position = {product_id: index for index, product_id in enumerate(forecast_ids)}
+        demand = np.zeros((len(forecast_ids), history_days))
+        np.add.at(
+            demand,
+            (np.array([position[product_id] for product_id, _, _ in rows]), np.array([(day - start).days for _, day, _ in rows])),
+            np.array([float(total) for _, _, total in rows])
+        )
+
+        supplier_lead_times = dict(
+            SupplierProduct.objects.filter(
+                product_id__in=forecast_ids,
+                supplier__deleted_at__isnull=True,
+                supplier__is_active=True,
+                supplier__lead_time_days__isnull=False
+            ).values('product_id').annotate(lead_time=models.Min('supplier__lead_time_days')).values_list('product_id', 'lead_time').order_by()
+        )
+        lead_times = np.array([supplier_lead_times.get(product_id, DEFAULT_LEAD_TIME_DAYS) for product_id in forecast_ids], dtype=float)
+
+        reorder_points = np.ceil(forecast_reorder_points(demand, lead_times, method=method, **forecast_options) * 1000) / 1000
+        suggested = {product_id: Decimal(str(value)).quantize(Decimal('0.001')) for product_id, value in zip(forecast_ids, reorder_points.tolist())}
+
+        now = timezone.now()
+        products = []
+        for product in Product.objects.filter(pk__in=forecast_ids).only('id', 'minimum_stock_quantity'):
+            if product.minimum_stock_quantity != suggested[product.id]:
+                product.minimum_stock_quantity = suggested[product.id]
+                product.updated_at = now
+                products.append(product)
+        with transaction.atomic():
+            Product.objects.bulk_update(products, ['minimum_stock_quantity', 'updated_at'])
+        updated += len(products)
@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from productions.models import ProductionOrder
+from purchases.models import PurchaseOrder, PurchaseOrderItem
+from sales.models import SaleOrderItem
+
+from .services import schedule_supply_projections_invalidation
+
+
+@receiver(post_save, sender=SaleOrderItem)
+@receiver(post_delete, sender=SaleOrderItem)
+def invalidate_projection_on_sale_order_item_change(sender, instance, **kwargs):
+    schedule_supply_projections_invalidation(instance.sale_order.tenant_id, [instance.product_id])
+
+
+@receiver(post_save, sender=PurchaseOrderItem)
+@receiver(post_delete, sender=PurchaseOrderItem)
+def invalidate_projection_on_purchase_order_item_change(sender, instance, **kwargs):
+    schedule_supply_projections_invalidation(instance.purchase_order.tenant_id, [instance.product_id])
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def invalidate_projections_on_purchase_order_change(sender, instance, created=False, **kwargs):
+    if not created:
+        schedule_supply_projections_invalidation(instance.tenant_id)
+
+
+@receiver(post_save, sender=ProductionOrder)
+@receiver(post_delete, sender=ProductionOrder)
+def invalidate_projection_on_production_order_change(sender, instance, **kwargs):
+    schedule_supply_projections_invalidation(instance.tenant_id, [instance.product_id])
@@ -1,15 +1,26 @@
+from datetime import timedelta
 from decimal import Decimal
 
+import numpy as np
 import pytest
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 
+from customers.models import Customer
 from inventory.models import (StockAdjustment, StockAdjustmentType, StockEntry,
-                              StockMovement)
-from inventory.services import (InventoryError, create_stock_adjustment,
-                                create_stock_entry)
+                              StockEntryItem, StockMovement)
+from inventory.services import (InventoryError, complete_stock_entry,
+                                create_stock_adjustment, create_stock_entry,
+                                forecast_reorder_points,
+                                get_available_to_promise,
+                                receive_purchase_order,
+                                update_minimum_stock_quantities)
+from productions.models import ProductionOrder, ProductionStage
 from products.models import Product
-from purchases.models import PurchaseOrder, PurchaseOrderStatus
-from suppliers.models import Supplier
+from purchases.models import (PurchaseOrder, PurchaseOrderItem,
+                              PurchaseOrderStatus)
+from sales.services import create_sale_order
+from suppliers.models import Supplier, SupplierProduct
 from tenants.models import Tenant
 from users.models import User
 
@@ -247,3 +258,175 @@ def test_create_stock_entry_with_zero_quantity_raises_error(tenant, user, produc
             items_data=items_data,
             status=StockEntry.StockEntryStatus.COMPLETED
         )
+
+
+def test_available_to_promise_projects_stock_reservations_purchases_and_production(
+    tenant, user, product, supplier, purchase_order, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    today = timezone.localdate()
+    customer = Customer.objects.create(tenant=tenant, name="Cliente Teste")
+    pending_order = create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 4}])
+    purchase_order.expected_delivery_date = today + timedelta(days=5)
+    purchase_order.save()
+    PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=product, quantity=Decimal("20"))
+    stage = ProductionStage.objects.create(tenant=tenant, name="CUTTING", label="Corte")
+    ProductionOrder.objects.create(tenant=tenant, product=product, stage=stage, quantity=Decimal("30"), due_date=today + timedelta(days=10))
+    with django_capture_on_commit_callbacks(execute=True):
+        create_stock_entry(
+            tenant=tenant,
+            user=user,
+            items_data=[{"product": product, "quantity": Decimal("5"), "unit_price": Decimal("15.00")}],
+            purchase=purchase_order,
+            status=StockEntry.StockEntryStatus.COMPLETED
+        )
+
+    def promise(quantity, **kwargs):
+        return get_available_to_promise(tenant=tenant, items_data=[{"product": product, "quantity": quantity}], **kwargs)["date"]
+
+    assert promise(11) == today
+    assert promise(26) == today + timedelta(days=5)
+    assert promise(56) == today + timedelta(days=10)
+    assert promise(57) is None
+    assert promise(15, sale_order=pending_order) == today
+
+    with django_assert_num_queries(0):
+        result = get_available_to_promise(
+            tenant=tenant, items_data=[{"product": product, "quantity": 6}, {"product": product, "quantity": 6}]
+        )
+    assert result == {"date": today + timedelta(days=5), "lines": {product.id: today + timedelta(days=5)}}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 11}])
+    assert promise(1) == today + timedelta(days=5)
+
+
+def test_receive_purchase_order_tracks_partial_receipts_with_constant_queries(
+    tenant, user, supplier, purchase_order, django_assert_max_num_queries
+):
+    products = Product.objects.bulk_create([
+        Product(tenant=tenant, name=f"Produto {index}", sku=f"SKU-{index}", stock_quantity=0) for index in range(60)
+    ])
+    lines = PurchaseOrderItem.objects.bulk_create([
+        PurchaseOrderItem(purchase_order=purchase_order, product=product, quantity=Decimal("10"), unit_price=Decimal("2.50"))
+        for product in products
+    ])
+
+    with django_assert_max_num_queries(20):
+        stock_entry = receive_purchase_order(
+            tenant=tenant, purchase_order=purchase_order, user=user, quantities={line.id: Decimal("4") for line in lines}
+        )
+
+    assert stock_entry.status == StockEntry.StockEntryStatus.COMPLETED
+    assert stock_entry.purchase == purchase_order and stock_entry.supplier == supplier
+    assert stock_entry.items.filter(purchase_order_item__isnull=False).count() == 60
+    assert set(PurchaseOrderItem.objects.values_list("received_quantity", flat=True)) == {Decimal("4")}
+    assert set(Product.objects.filter(pk__in=[p.pk for p in products]).values_list("stock_quantity", flat=True)) == {Decimal("4")}
+
+    with pytest.raises(InventoryError, match="exceeds the outstanding quantity"):
+        receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user, quantities={lines[0].id: Decimal("7")})
+
+    receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user)
+    assert set(PurchaseOrderItem.objects.values_list("received_quantity", flat=True)) == {Decimal("10")}
+    with pytest.raises(InventoryError, match="nothing left to receive"):
+        receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user)
+
+
+def test_complete_stock_entry_advances_received_quantities_of_its_purchase_order(tenant, user, product, purchase_order):
+    first, second = PurchaseOrderItem.objects.bulk_create([
+        PurchaseOrderItem(purchase_order=purchase_order, product=product, quantity=Decimal("4")),
+        PurchaseOrderItem(purchase_order=purchase_order, product=product, quantity=Decimal("6")),
+    ])
+    stock_entry = create_stock_entry(
+        tenant=tenant,
+        user=user,
+        items_data=[{"product": product, "quantity": Decimal("7"), "unit_price": Decimal("15.00")}],
+        purchase=purchase_order
+    )
+    first.refresh_from_db()
+    assert first.received_quantity == Decimal("0")
+
+    complete_stock_entry(tenant=tenant, stock_entry=stock_entry, user=user)
+
+    assert list(PurchaseOrderItem.objects.order_by("pk").values_list("received_quantity", flat=True)) == [Decimal("4"), Decimal("3")]
+    assert stock_entry.items.get().purchase_order_item == first
+    receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user)
+    assert set(PurchaseOrderItem.objects.values_list("received_quantity", flat=True)) == {Decimal("4"), Decimal("6")}
+
+
+def test_forecast_reorder_points_is_vectorized_over_products():
+    demand = np.array([[2.0] * 10, [0.0, 4.0] * 5])
+    lead_times = np.array([5.0, 4.0])
+
+    moving_average = forecast_reorder_points(demand, lead_times, method="moving_average", window=10, service_factor=0)
+    assert moving_average.tolist() == [10.0, 8.0]
+
+    smoothed = forecast_reorder_points(demand, lead_times, service_factor=1.0)
+    assert smoothed[0] == pytest.approx(10.0)
+    assert smoothed[1] > moving_average[1]
+
+    with pytest.raises(InventoryError, match="Unknown forecast method"):
+        forecast_reorder_points(demand, lead_times, method="naive")
+
+
+def test_update_minimum_stock_quantities_from_outbound_movements(
+    tenant, user, supplier, product, django_assert_max_num_queries
+):
+    supplier.lead_time_days = 5
+    supplier.save()
+    SupplierProduct.objects.create(tenant=tenant, supplier=supplier, product=product, cost_price=Decimal("8.00"))
+    idle = Product.objects.create(tenant=tenant, name="Sem giro", sku="SKU002", minimum_stock_quantity=3)
+    customer = Customer.objects.create(tenant=tenant, name="Cliente Teste")
+    sold, canceled = [
+        create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 1}]).items.get()
+        for _ in range(2)
+    ]
+
+    def move(source, direction, quantity, days_ago):
+        movement = StockMovement.objects.create(
+            tenant=tenant, product=product, direction=direction, quantity=Decimal(quantity), new_stock=Decimal("10"),
+            source_content_type=ContentType.objects.get_for_model(source), source_object_id=source.id
+        )
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=movement.created_at - timedelta(days=days_ago))
+
+    today = timezone.localdate()
+    for days_ago in range(1, 29):
+        move(sold, StockMovement.MovementDirection.OUT, "2", days_ago)
+        # Adjustments are not demand.
+        move(product, StockMovement.MovementDirection.OUT, "2", days_ago)
+        move(product, StockMovement.MovementDirection.IN, "2", days_ago)
+    # Neither is a sale whose stock came back when it was canceled.
+    move(canceled, StockMovement.MovementDirection.OUT, "50", 3)
+    move(canceled, StockMovement.MovementDirection.IN, "50", 2)
+
+    with django_assert_max_num_queries(9):
+        updated = update_minimum_stock_quantities(tenant=tenant, history_days=28, today=today)
+
+    assert updated == 1
+    product.refresh_from_db()
+    idle.refresh_from_db()
+    assert product.minimum_stock_quantity == Decimal("10.000")
+    assert idle.minimum_stock_quantity == Decimal("3.000")
+    assert update_minimum_stock_quantities(tenant=tenant, history_days=28, method="moving_average", today=today) == 0
+
+
+def test_receive_purchase_order_allocates_landed_costs_into_average_cost(tenant, user, product, purchase_order):
+    product.avg_cost_price = Decimal("10.00")
+    product.save()
+    other = Product.objects.create(tenant=tenant, name="Outro", sku="SKU002", stock_quantity=0)
+    line = PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=product, quantity=Decimal("3"), unit_price=Decimal("13.00"))
+    other_line = PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=other, quantity=Decimal("1"), unit_price=Decimal("1.00"))
+    purchase_order.freight_amount = Decimal("10.00")
+    purchase_order.save()
+
+    first = receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user, quantities={line.id: Decimal("1")})
+    second = receive_purchase_order(tenant=tenant, purchase_order=purchase_order, user=user)
+
+    landed = StockEntryItem.objects.filter(purchase_order_item=line).values_list("landed_cost_amount", flat=True)
+    assert sorted(landed) == [Decimal("3.25"), Decimal("6.50")]
+    assert second.items.get(purchase_order_item=other_line).landed_cost_amount == Decimal("0.25")
+    assert first.items.get().landed_cost_amount == Decimal("3.25")
+
+    product.refresh_from_db()
+    assert product.stock_quantity == Decimal("13")
+    # 10 units at 10.00, then 1 and 2 more at 16.25.
+    assert product.avg_cost_price == Decimal("11.44")
@@ -1,18 +1,11 @@
 from django.contrib import admin
 
-from .models import ProductionOrder, ProductionStage, ProductionStageHistory
+from tenants.history import render_history
 
-
-class ProductionStageHistoryInline(admin.TabularInline):
-    model = ProductionStageHistory
-    extra = 0
-    readonly_fields = ('stage', 'changed_by', 'notes', 'created_at')
-    can_delete = False
-    verbose_name = "Histórico de Etapa"
-    verbose_name_plural = "Históricos de Etapa"
-
-    def has_add_permission(self, request, obj=None):
-        return False
+from .models import (ProductionDailyLeadTimeSummary,
+                     ProductionDailyStageSummary, ProductionOrder,
+                     ProductionStage, ProductionStageCounter)
+from .services import get_production_order_history
 
 
 @admin.register(ProductionStage)
@@ -22,13 +15,25 @@ class ProductionStageAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
+@admin.register(ProductionStageCounter)
+class ProductionStageCounterAdmin(admin.ModelAdmin):
+    list_display = ('stage', 'order_count', 'quantity', 'tenant', 'updated_at')
+    list_filter = ('tenant',)
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ProductionOrder)
 class ProductionOrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'product', 'quantity', 'stage', 'created_at', 'tenant')
+    list_display = ('id', 'product', 'quantity', 'stage', 'due_date', 'created_at', 'tenant')
     list_filter = ('stage', 'tenant', 'created_at')
     search_fields = ('id', 'product__name', 'sale_order__id')
     autocomplete_fields = ['product', 'sale_order', 'stage', 'tenant']
-    inlines = [ProductionStageHistoryInline]
 
     fieldsets = (
         ('Informações Principais', {
@@ -39,11 +44,50 @@ class ProductionOrderAdmin(admin.ModelAdmin):
             'fields': ('sale_order',)
         }),
         ('Datas', {
-            'fields': ('created_at', 'updated_at')
+            'fields': ('due_date', 'completed_at', 'created_at', 'updated_at')
+        }),
+        ('Histórico de Etapas', {
+            'fields': ('history_display',)
         }),
     )
 
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('completed_at', 'created_at', 'updated_at', 'history_display')
+
+    @admin.display(description='Histórico de Etapas')
+    def history_display(self, obj):
+        if obj.pk is None:
+            return '-'
+        return render_history(get_production_order_history(production_order=obj), 'stage')
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('product', 'stage', 'tenant', 'sale_order')
+
+
+class ProductionDailySummaryAdmin(admin.ModelAdmin):
+    list_filter = ('tenant',)
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ProductionDailyStageSummary)
+class ProductionDailyStageSummaryAdmin(ProductionDailySummaryAdmin):
+    list_display = ('date', 'stage', 'product', 'transition_count', 'average_hours', 'p50_hours', 'p90_hours', 'max_hours', 'tenant')
+    list_filter = ('tenant', 'stage')
+    search_fields = ('product__name', 'product__sku')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('stage', 'product', 'tenant')
+
+
+@admin.register(ProductionDailyLeadTimeSummary)
+class ProductionDailyLeadTimeSummaryAdmin(ProductionDailySummaryAdmin):
+    list_display = ('date', 'product', 'order_count', 'average_hours', 'p50_hours', 'p90_hours', 'max_hours', 'tenant')
+    search_fields = ('product__name', 'product__sku')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'tenant')
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productions.services import plan_material_requirements
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Run material requirements planning and list the planned production and purchase orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only plan this tenant id.')
+        parser.add_argument('--period-days', type=int, default=7, help='Length of the planning periods, in days.')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            planned = plan_material_requirements(tenant=tenant, period_days=options['period_days'])
+            self.stdout.write('{}: {} orders planned in {:.1f}s.'.format(tenant, len(planned), time.monotonic() - started))
+            for order in planned:
+                self.stdout.write('  {due_date} {kind} product #{product_id}: {quantity} (release {release_date})'.format(**order))
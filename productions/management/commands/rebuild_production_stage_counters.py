@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productions.services import rebuild_production_stage_counters
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Recompute the work-in-process counters of the production stages from the open production orders.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild this tenant id.')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            stages = rebuild_production_stage_counters(tenant=tenant)
+            self.stdout.write('{}: {} stages with work in process in {:.1f}s.'.format(tenant, stages, time.monotonic() - started))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from productions.services import refresh_production_analytics
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily production stage duration and lead time summaries from the changes since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only refresh this tenant id.')
+        parser.add_argument('--full', action='store_true', help='Recompute every day instead of the changed ones.')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            days = refresh_production_analytics(tenant=tenant, full=options['full'])
+            self.stdout.write('{}: {} days refreshed in {:.1f}s.'.format(tenant, days, time.monotonic() - started))
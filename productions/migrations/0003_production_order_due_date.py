@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productions', '0002_productionstage_label_alter_productionstage_name'),
+        ('products', '0005_product_product_live_idx'),
+        ('sales', '0007_status_next_statuses'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productionorder',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productionorder',
+            name='due_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='productionorder',
+            index=models.Index(condition=models.Q(('completed_at__isnull', True)), fields=['tenant', 'product'], name='production_order_open_idx'),
+        ),
+    ]
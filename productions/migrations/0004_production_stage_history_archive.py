@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tenants.history
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productions', '0003_production_order_due_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionStageHistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.JSONField(default=list, encoder=tenants.history.HistoryEncoder)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('production_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stage_history_archive', to='productions.productionorder')),
+            ],
+            options={
+                'verbose_name': 'Production Stage History Archive',
+                'verbose_name_plural': 'Production Stage History Archives',
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_stage_counters(apps, schema_editor):
+    """
+    Count the open production orders of every tenant and stage, as
+    productions.services.rebuild_production_stage_counters does.
+    """
+    ProductionOrder = apps.get_model('productions', 'ProductionOrder')
+    ProductionStageCounter = apps.get_model('productions', 'ProductionStageCounter')
+
+    rows = ProductionOrder.objects.filter(completed_at__isnull=True).values('tenant_id', 'stage_id').annotate(
+        order_count=models.Count('pk'),
+        total=models.Sum('quantity')
+    ).values_list('tenant_id', 'stage_id', 'order_count', 'total').order_by()
+    ProductionStageCounter.objects.bulk_create([
+        ProductionStageCounter(tenant_id=tenant_id, stage_id=stage_id, order_count=order_count, quantity=total)
+        for tenant_id, stage_id, order_count, total in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productions', '0004_production_stage_history_archive'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionStageCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_count', models.IntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('stage', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters', to='productions.productionstage')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_stage_counters', to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name': 'Production Stage Counter',
+                'verbose_name_plural': 'Production Stage Counters',
+                'constraints': [models.UniqueConstraint(fields=('tenant', 'stage'), name='unique_production_stage_counter')],
+            },
+        ),
+        migrations.RunPython(backfill_stage_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productions', '0005_production_stage_counter'),
+        ('products', '0006_product_weight'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductionAnalyticsRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('refreshed_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Production Analytics Refresh',
+                'verbose_name_plural': 'Production Analytics Refreshes',
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductionDailyLeadTimeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('average_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('p50_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('p90_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('max_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Production Daily Lead Time Summary',
+                'verbose_name_plural': 'Production Daily Lead Time Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductionDailyStageSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transition_count', models.PositiveIntegerField(default=0)),
+                ('average_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('p50_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('p90_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('max_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+            ],
+            options={
+                'verbose_name': 'Production Daily Stage Summary',
+                'verbose_name_plural': 'Production Daily Stage Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='productionstagehistory',
+            index=models.Index(fields=['production_order', 'created_at'], name='production_history_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productionstagehistory',
+            index=models.Index(fields=['created_at'], name='production_history_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='productionanalyticsrefresh',
+            name='tenant',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='production_analytics_refresh', to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='productiondailyleadtimesummary',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_daily_lead_time_summaries', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='productiondailyleadtimesummary',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_daily_lead_time_summaries', to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='productiondailystagesummary',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_daily_stage_summaries', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='productiondailystagesummary',
+            name='stage',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='productions.productionstage'),
+        ),
+        migrations.AddField(
+            model_name='productiondailystagesummary',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='production_daily_stage_summaries', to='tenants.tenant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productiondailyleadtimesummary',
+            unique_together={('tenant', 'date', 'product')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='productiondailystagesummary',
+            unique_together={('tenant', 'date', 'stage', 'product')},
+        ),
+    ]
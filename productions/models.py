@@ -3,6 +3,7 @@ from django.db import models
 
 from products.models import Product
 from sales.models import SaleOrder
+from tenants.history import HistoryArchive
 from tenants.models import Tenant
 
 
@@ -31,6 +32,8 @@ class ProductionOrder(models.Model):
     sale_order = models.ForeignKey(SaleOrder, on_delete=models.SET_NULL, blank=True, null=True, related_name='production_orders')
     stage = models.ForeignKey(ProductionStage, on_delete=models.PROTECT, related_name='production_orders')
     quantity = models.DecimalField(max_digits=10, decimal_places=3, default=0)
+    due_date = models.DateField(blank=True, null=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -38,11 +41,39 @@ class ProductionOrder(models.Model):
         verbose_name = 'Production Order'
         verbose_name_plural = 'Production Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', 'product'], condition=models.Q(completed_at__isnull=True), name='production_order_open_idx'),
+        ]
 
     def __str__(self):
         return f'Production Order {self.id} - {self.product.name} ({self.quantity})'
 
 
+class ProductionStageCounter(models.Model):
+    """
+    Work in process of a tenant at one production stage: the number and the
+    total quantity of the open production orders sitting in it.
+
+    Maintained by the production services and signals, so a shop-floor
+    board reads one row per stage.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='production_stage_counters')
+    stage = models.ForeignKey(ProductionStage, on_delete=models.CASCADE, related_name='counters')
+    order_count = models.IntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Production Stage Counter'
+        verbose_name_plural = 'Production Stage Counters'
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'stage'], name='unique_production_stage_counter'),
+        ]
+
+    def __str__(self):
+        return f'{self.stage.name}: {self.order_count} orders ({self.quantity})'
+
+
 class ProductionStageHistory(models.Model):
     production_order = models.ForeignKey(ProductionOrder, on_delete=models.CASCADE, related_name='stage_histories')
     stage = models.ForeignKey(ProductionStage, on_delete=models.PROTECT, related_name='stage_histories')
@@ -55,6 +86,83 @@ class ProductionStageHistory(models.Model):
         verbose_name = 'Production Stage History'
         verbose_name_plural = 'Production Stage Histories'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['production_order', 'created_at'], name='production_history_order_idx'),
+            models.Index(fields=['created_at'], name='production_history_created_idx'),
+        ]
 
     def __str__(self):
         return f'History for Order #{self.production_order.id} - {self.stage.name} by {self.changed_by.name} on {self.created_at.strftime("%Y-%m-%d %H:%M:%S")}'
+
+
+class ProductionStageHistoryArchive(HistoryArchive):
+    production_order = models.OneToOneField(ProductionOrder, on_delete=models.CASCADE, related_name='stage_history_archive')
+
+    class Meta:
+        verbose_name = 'Production Stage History Archive'
+        verbose_name_plural = 'Production Stage History Archives'
+
+    def __str__(self):
+        return f'Archived history for Order #{self.production_order_id} ({self.entry_count} entries)'
+
+
+class ProductionDailyStageSummary(models.Model):
+    """
+    How long the orders of a product sat in a stage, over the orders that
+    left the stage on a given day. Durations are in hours.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='production_daily_stage_summaries')
+    date = models.DateField()
+    stage = models.ForeignKey(ProductionStage, on_delete=models.CASCADE, related_name='daily_summaries')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='production_daily_stage_summaries')
+    transition_count = models.PositiveIntegerField(default=0)
+    average_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    p50_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    p90_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    max_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Production Daily Stage Summary'
+        verbose_name_plural = 'Production Daily Stage Summaries'
+        unique_together = ('tenant', 'date', 'stage', 'product')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date} - {self.stage.name} / {self.product.name}: {self.p50_hours}h'
+
+
+class ProductionDailyLeadTimeSummary(models.Model):
+    """
+    Lead time, from creation to completion, of the production orders of a
+    product completed on a given day. Durations are in hours.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='production_daily_lead_time_summaries')
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='production_daily_lead_time_summaries')
+    order_count = models.PositiveIntegerField(default=0)
+    average_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    p50_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    p90_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    max_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Production Daily Lead Time Summary'
+        verbose_name_plural = 'Production Daily Lead Time Summaries'
+        unique_together = ('tenant', 'date', 'product')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date} - {self.product.name}: {self.p50_hours}h'
+
+
+class ProductionAnalyticsRefresh(models.Model):
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='production_analytics_refresh')
+    refreshed_until = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Production Analytics Refresh'
+        verbose_name_plural = 'Production Analytics Refreshes'
+
+    def __str__(self):
+        return f'{self.tenant.name} - {self.refreshed_until}'
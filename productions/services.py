@@ -0,0 +1,629 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+from django.db import models, transaction
+from django.db.models.functions import Lag, TruncDate
+from django.utils import timezone
+
+from inventory.models import StockMovement
+from inventory.services import _create_stock_movements, get_supply_projections
+from products.models import Product, ProductComposition
+from sales.models import SaleOrderItem
+from suppliers.models import ProductBestOffer
+from tenants.history import compact_history, read_history
+from tenants.models import Tenant
+from users.models import User
+
+from .models import (ProductionAnalyticsRefresh,
+                     ProductionDailyLeadTimeSummary,
+                     ProductionDailyStageSummary, ProductionOrder,
+                     ProductionStage, ProductionStageCounter,
+                     ProductionStageHistory, ProductionStageHistoryArchive)
+
+COUNTER_QUANTITY_FIELD = models.DecimalField(max_digits=14, decimal_places=3)
+ANALYTICS_REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+class ProductionError(Exception):
+    """Custom exception for production-related errors."""
+    pass
+
+
+def get_final_production_stage(*, tenant: Tenant) -> ProductionStage:
+    """
+    Return the last production stage of a tenant (the highest sequence order),
+    preferring the tenant's own stages over global ones.
+
+    Raises:
+        ProductionError: If no stage is configured.
+    """
+    stage = ProductionStage.objects.filter(
+        models.Q(tenant=tenant) | models.Q(tenant__isnull=True)
+    ).order_by('-sequence_order', models.F('tenant').asc(nulls_last=True)).first()
+    if stage is None:
+        raise ProductionError("No production stage is configured.")
+    return stage
+
+
+def compact_production_stage_history(*, tenant: Tenant, older_than_days: int = 180, batch_size: int = 500) -> int:
+    """
+    Move the stage history of completed production orders out of the hot history table.
+
+    Args:
+        tenant (Tenant): The tenant whose orders are compacted.
+        older_than_days (int, optional): Minimum age, in days since the last update, of the orders compacted. Defaults to 180.
+        batch_size (int, optional): Number of orders compacted per transaction. Defaults to 500.
+
+    Returns:
+        int: The number of history rows archived.
+    """
+    completed = ProductionOrder.objects.filter(
+        tenant=tenant,
+        completed_at__isnull=False,
+        updated_at__lt=timezone.now() - timedelta(days=older_than_days)
+    )
+    return compact_history(
+        owners=completed,
+        history_model=ProductionStageHistory,
+        archive_model=ProductionStageHistoryArchive,
+        owner_field='production_order',
+        batch_size=batch_size
+    )
+
+
+def get_production_order_history(*, production_order: ProductionOrder) -> List[ProductionStageHistory]:
+    """
+    Return the full stage history of a production order, newest first, whether archived or not.
+    """
+    return read_history(
+        owner=production_order,
+        history_model=ProductionStageHistory,
+        archive_model=ProductionStageHistoryArchive,
+        owner_field='production_order'
+    )
+
+
+def _low_level_codes(bill_of_materials: Dict[int, List[Tuple[int, Decimal]]]) -> Dict[int, int]:
+    """
+    Return the low-level code of every product in the bills of materials.
+
+    The code of a product is the deepest level at which it appears in any
+    bill (finished goods are level 0), so planning products in code order
+    nets each of them exactly once, after all of its parents. Computed in
+    one topological pass over the composition graph.
+
+    Raises:
+        ProductionError: If the compositions contain a cycle.
+    """
+    parent_count: Dict[int, int] = defaultdict(int)
+    for components in bill_of_materials.values():
+        for component_id, _ in components:
+            parent_count[component_id] += 1
+
+    codes = {product_id: 0 for product_id in bill_of_materials if not parent_count[product_id]}
+    ready = list(codes)
+    while ready:
+        product_id = ready.pop()
+        for component_id, _ in bill_of_materials.get(product_id, ()):
+            codes[component_id] = max(codes.get(component_id, 0), codes[product_id] + 1)
+            parent_count[component_id] -= 1
+            if not parent_count[component_id]:
+                ready.append(component_id)
+
+    if any(parent_count[product_id] for product_id in parent_count):
+        raise ProductionError("Product compositions contain a cycle.")
+    return codes
+
+
+def plan_material_requirements(*, tenant: Tenant, period_days: int = 7, today: date = None) -> List[Dict[str, Any]]:
+    """
+    Run material requirements planning over a tenant's open production and sales demand.
+
+    Pending sale orders and open production orders are netted, period by
+    period, against the stock on hand and the receipts expected from open
+    purchase and production orders (the supply projections used for
+    available-to-promise). Shortages become planned orders, lot for lot:
+    production orders for products with a bill of materials, whose
+    components then need the planned quantity, and purchase orders for the
+    rest, released the best supplier's lead time ahead. Products are
+    planned in low-level code order, so each one is netted once against the
+    summed demand of all its parents instead of exploding sub-assemblies
+    again for every order. The run reads the compositions, the open
+    production orders, the pending sale order products, the projections and
+    the lead times with a constant number of queries.
+
+    Args:
+        tenant (Tenant): The tenant being planned.
+        period_days (int, optional): Length of the planning periods, in days. Defaults to 7.
+        today (date, optional): Start of the first period; earlier dates fall into it. Defaults to the current date.
+
+    Returns:
+        List[Dict[str, Any]]: The planned orders, by due date, each with 'product_id', 'kind' ('production' or 'purchase'), 'quantity', 'due_date' (start of its period) and 'release_date'.
+    """
+    if today is None:
+        today = timezone.localdate()
+
+    def period_of(day):
+        return max((day - today).days // period_days, 0) if day is not None else 0
+
+    bill_of_materials: Dict[int, List[Tuple[int, Decimal]]] = defaultdict(list)
+    for product_id, component_id, quantity in ProductComposition.objects.filter(
+        product__tenant=tenant,
+        product__deleted_at__isnull=True
+    ).values_list('product_id', 'component_id', 'quantity'):
+        bill_of_materials[product_id].append((component_id, quantity))
+    codes = _low_level_codes(bill_of_materials)
+
+    requirements: Dict[int, Dict[int, Decimal]] = defaultdict(lambda: defaultdict(Decimal))
+    for product_id, quantity, due_date in ProductionOrder.objects.filter(
+        tenant=tenant,
+        completed_at__isnull=True
+    ).values_list('product_id', 'quantity', 'due_date'):
+        for component_id, component_quantity in bill_of_materials.get(product_id, ()):
+            requirements[component_id][period_of(due_date)] += quantity * component_quantity
+
+    # Pending sale orders are already deducted from the projected availability.
+    demanded = set(SaleOrderItem.objects.filter(
+        sale_order__tenant=tenant,
+        sale_order__deleted_at__isnull=True,
+        sale_order__confirmed_at__isnull=True
+    ).values_list('product_id', flat=True).distinct().order_by())
+    demanded.update(requirements)
+    product_ids = set()
+    while demanded:
+        product_id = demanded.pop()
+        if product_id not in product_ids:
+            product_ids.add(product_id)
+            demanded.update(component_id for component_id, _ in bill_of_materials.get(product_id, ()))
+
+    projections = get_supply_projections(tenant=tenant, product_ids=product_ids)
+    lead_times = dict(
+        ProductBestOffer.objects.filter(product_id__in=[product_id for product_id in projections if product_id not in bill_of_materials])
+        .values_list('product_id', 'lead_time_days')
+    )
+
+    planned = []
+    for product_id in sorted(projections, key=lambda product_id: (codes.get(product_id, 0), product_id)):
+        projection = projections[product_id]
+        receipts: Dict[int, Decimal] = defaultdict(Decimal)
+        for receipt_date, quantity in projection.receipts:
+            receipts[period_of(receipt_date)] += quantity
+        gross = requirements.get(product_id, {})
+
+        on_hand = projection.available
+        for period in sorted({0, *gross, *receipts}):
+            on_hand += receipts.get(period, Decimal('0')) - gross.get(period, Decimal('0'))
+            if on_hand >= 0:
+                continue
+            quantity, on_hand = -on_hand, Decimal('0')
+            due_date = today + timedelta(days=period * period_days)
+            if product_id in bill_of_materials:
+                kind, release_date = 'production', due_date
+                for component_id, component_quantity in bill_of_materials[product_id]:
+                    requirements[component_id][period] += quantity * component_quantity
+            else:
+                kind, release_date = 'purchase', due_date - timedelta(days=lead_times.get(product_id) or 0)
+            planned.append({
+                'product_id': product_id,
+                'kind': kind,
+                'quantity': quantity,
+                'due_date': due_date,
+                'release_date': release_date,
+            })
+
+    planned.sort(key=lambda order: (order['due_date'], order['product_id']))
+    return planned
+
+
+def adjust_production_stage_counters(*, tenant_id: int, deltas: Dict[int, Tuple[int, Decimal]]) -> None:
+    """
+    Add order counts and quantities to the work-in-process counters of a tenant's stages.
+
+    Missing counters are created, then all of them are updated with a
+    single UPDATE.
+
+    Args:
+        tenant_id (int): The tenant owning the counters.
+        deltas (Dict[int, Tuple[int, Decimal]]): (orders, quantity) to add, or subtract if negative, by stage id.
+    """
+    deltas = {stage_id: delta for stage_id, delta in deltas.items() if delta[0] or delta[1]}
+    if not deltas:
+        return
+    ProductionStageCounter.objects.bulk_create(
+        [ProductionStageCounter(tenant_id=tenant_id, stage_id=stage_id) for stage_id in deltas],
+        ignore_conflicts=True
+    )
+    ProductionStageCounter.objects.filter(tenant_id=tenant_id, stage_id__in=list(deltas)).update(
+        order_count=models.F('order_count') + models.Case(
+            *[models.When(stage_id=stage_id, then=models.Value(count)) for stage_id, (count, _) in deltas.items()],
+            output_field=models.IntegerField()
+        ),
+        quantity=models.F('quantity') + models.Case(
+            *[models.When(stage_id=stage_id, then=models.Value(quantity)) for stage_id, (_, quantity) in deltas.items()],
+            output_field=COUNTER_QUANTITY_FIELD
+        ),
+        updated_at=timezone.now()
+    )
+
+
+@transaction.atomic
+def rebuild_production_stage_counters(*, tenant: Tenant) -> int:
+    """
+    Recompute the work-in-process counters of a tenant from its open production orders.
+
+    Returns:
+        int: The number of stages with work in process.
+    """
+    counters = [
+        ProductionStageCounter(tenant=tenant, stage_id=stage_id, order_count=order_count, quantity=quantity)
+        for stage_id, order_count, quantity in ProductionOrder.objects.filter(
+            tenant=tenant,
+            completed_at__isnull=True
+        ).values('stage_id').annotate(
+            order_count=models.Count('pk'),
+            total=models.Sum('quantity')
+        ).values_list('stage_id', 'order_count', 'total').order_by()
+    ]
+    ProductionStageCounter.objects.filter(tenant=tenant).exclude(stage_id__in=[counter.stage_id for counter in counters]).update(
+        order_count=0, quantity=0, updated_at=timezone.now()
+    )
+    ProductionStageCounter.objects.bulk_create(
+        counters,
+        update_conflicts=True,
+        unique_fields=['tenant', 'stage'],
+        update_fields=['order_count', 'quantity', 'updated_at']
+    )
+    return len(counters)
+
+
+def get_production_board(*, tenant: Tenant) -> List[Dict[str, Any]]:
+    """
+    Return the work in process of every production stage of a tenant, in sequence order.
+
+    Reads the maintained counters with one query, one row per stage.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per stage with 'stage_id', 'name', 'label', 'color_code', 'order_count' and 'quantity'.
+    """
+    stages = ProductionStage.objects.filter(
+        models.Q(tenant=tenant) | models.Q(tenant__isnull=True)
+    ).annotate(
+        tenant_counter=models.FilteredRelation('counters', condition=models.Q(counters__tenant=tenant))
+    ).order_by('sequence_order', 'name').values_list(
+        'pk', 'name', 'label', 'color_code', 'tenant_counter__order_count', 'tenant_counter__quantity'
+    )
+    return [
+        {
+            'stage_id': stage_id,
+            'name': name,
+            'label': label,
+            'color_code': color_code,
+            'order_count': order_count or 0,
+            'quantity': quantity or Decimal('0'),
+        }
+        for stage_id, name, label, color_code, order_count, quantity in stages
+    ]
+
+
+def _lock_open_production_orders(*, tenant: Tenant, production_orders: Iterable[ProductionOrder]) -> List[ProductionOrder]:
+    order_ids = {getattr(production_order, 'pk', production_order) for production_order in production_orders}
+    orders = list(ProductionOrder.objects.select_for_update().filter(tenant=tenant, pk__in=order_ids).order_by('pk'))
+    if len(orders) != len(order_ids):
+        raise ProductionError("Production orders do not belong to this tenant.")
+    completed = [production_order.id for production_order in orders if production_order.completed_at is not None]
+    if completed:
+        raise ProductionError("Production orders already completed: {}".format(', '.join('#{}'.format(pk) for pk in completed)))
+    return orders
+
+
+def _move_production_orders(
+    *,
+    tenant: Tenant,
+    orders: List[ProductionOrder],
+    stage: ProductionStage,
+    user: User,
+    notes: str = None,
+    completed_at=None
+) -> None:
+    """
+    Move locked orders to a stage with one UPDATE, one bulk INSERT of stage
+    history and one counters adjustment. Completed orders leave the work in
+    process instead of entering the stage's counter.
+    """
+    now = timezone.now()
+    deltas: Dict[int, Tuple[int, Decimal]] = {}
+    for production_order in orders:
+        count, quantity = deltas.get(production_order.stage_id, (0, Decimal('0')))
+        deltas[production_order.stage_id] = (count - 1, quantity - production_order.quantity)
+        if completed_at is None:
+            count, quantity = deltas.get(stage.pk, (0, Decimal('0')))
+            deltas[stage.pk] = (count + 1, quantity + production_order.quantity)
+
+    changes = {'stage': stage, 'updated_at': now}
+    if completed_at is not None:
+        changes['completed_at'] = completed_at
+    ProductionOrder.objects.filter(pk__in=[production_order.pk for production_order in orders]).update(**changes)
+    ProductionStageHistory.objects.bulk_create([
+        ProductionStageHistory(production_order=production_order, stage=stage, notes=notes, changed_by=user)
+        for production_order in orders
+    ])
+    adjust_production_stage_counters(tenant_id=tenant.id, deltas=deltas)
+
+
+@transaction.atomic
+def move_production_orders(
+    *,
+    tenant: Tenant,
+    production_orders: Iterable[ProductionOrder],
+    stage: ProductionStage,
+    user: User,
+    notes: str = None
+) -> int:
+    """
+    Move open production orders to another stage in bulk.
+
+    Orders already in the stage are left alone. Moving orders to the final
+    stage completes them, backflushing their components (see
+    complete_production_orders).
+
+    Args:
+        tenant (Tenant): The tenant associated with the production orders.
+        production_orders (Iterable[ProductionOrder]): The orders to move.
+        stage (ProductionStage): The target stage.
+        user (User): The user moving the orders.
+        notes (str, optional): Notes recorded in the stage history. Defaults to None.
+
+    Returns:
+        int: The number of production orders moved.
+    """
+    if stage.tenant_id not in (None, tenant.id):
+        raise ProductionError("Production stage {} is not available to this tenant.".format(stage.name))
+    if stage.pk == get_final_production_stage(tenant=tenant).pk:
+        return complete_production_orders(tenant=tenant, production_orders=production_orders, user=user, notes=notes)
+
+    orders = [
+        production_order for production_order in _lock_open_production_orders(tenant=tenant, production_orders=production_orders)
+        if production_order.stage_id != stage.pk
+    ]
+    if orders:
+        _move_production_orders(tenant=tenant, orders=orders, stage=stage, user=user, notes=notes)
+    return len(orders)
+
+
+@transaction.atomic
+def complete_production_orders(
+    *,
+    tenant: Tenant,
+    production_orders: Iterable[ProductionOrder],
+    user: User,
+    notes: str = None
+) -> int:
+    """
+    Complete production orders, backflushing their components.
+
+    Every order posts OUT movements for the components of its product's
+    bill of materials, scaled by the order quantity, and an IN movement for
+    the product valued at the components' average cost, all with the order
+    as source document and in one locked batch (see _create_stock_movements).
+    The orders then move to the final stage, are marked completed and get
+    their stage history. The cost does not depend on the number of orders:
+    one query locks the orders, one reads the bills of materials, then one
+    batch of movements and the stage move (see move_production_orders).
+
+    Args:
+        tenant (Tenant): The tenant associated with the production orders.
+        production_orders (Iterable[ProductionOrder]): The orders to complete.
+        user (User): The user completing the orders.
+        notes (str, optional): Notes recorded in the stage history. Defaults to None.
+
+    Returns:
+        int: The number of production orders completed.
+    """
+    stage = get_final_production_stage(tenant=tenant)
+    orders = _lock_open_production_orders(tenant=tenant, production_orders=production_orders)
+    if not orders:
+        return 0
+
+    bill_of_materials: Dict[int, List[Tuple[int, Decimal, Decimal]]] = defaultdict(list)
+    for product_id, component_id, quantity, avg_cost_price in ProductComposition.objects.filter(
+        product_id__in={production_order.product_id for production_order in orders}
+    ).values_list('product_id', 'component_id', 'quantity', 'component__avg_cost_price'):
+        bill_of_materials[product_id].append((component_id, quantity, avg_cost_price))
+
+    movements_data = []
+    for production_order in orders:
+        if production_order.quantity <= 0:
+            raise ProductionError("Production order #{} has no quantity to produce.".format(production_order.id))
+        unit_cost = Decimal('0.00')
+        for component_id, component_quantity, avg_cost_price in bill_of_materials.get(production_order.product_id, ()):
+            movements_data.append({
+                'product': Product(id=component_id),
+                'direction': StockMovement.MovementDirection.OUT,
+                'quantity': (production_order.quantity * component_quantity).quantize(Decimal('0.001'), rounding=ROUND_HALF_UP),
+                'source_document': production_order,
+                'notes': f"Consumo da ordem de produção #{production_order.id}"
+            })
+            unit_cost += component_quantity * avg_cost_price
+        movements_data.append({
+            'product': Product(id=production_order.product_id),
+            'direction': StockMovement.MovementDirection.IN,
+            'quantity': production_order.quantity,
+            'source_document': production_order,
+            'unit_price': unit_cost.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if production_order.product_id in bill_of_materials else None,
+            'update_cost': True,
+            'notes': f"Produção da ordem #{production_order.id}"
+        })
+    _create_stock_movements(tenant=tenant, user=user, movements_data=movements_data)
+
+    _move_production_orders(tenant=tenant, orders=orders, stage=stage, user=user, notes=notes, completed_at=timezone.now())
+    return len(orders)
+
+
+def complete_production_order(
+    *,
+    tenant: Tenant,
+    production_order: ProductionOrder,
+    user: User,
+    notes: str = None
+) -> ProductionOrder:
+    """
+    Complete a single production order; see complete_production_orders.
+    """
+    complete_production_orders(tenant=tenant, production_orders=[production_order], user=user, notes=notes)
+    production_order.refresh_from_db()
+    return production_order
+
+
+def _duration_summary(durations: List[timedelta]) -> Dict[str, Decimal]:
+    hours = np.array([duration.total_seconds() for duration in durations]) / 3600
+    average, p50, p90, maximum = hours.mean(), *np.percentile(hours, [50, 90]), hours.max()
+    return {
+        field: Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        for field, value in (('average_hours', average), ('p50_hours', p50), ('p90_hours', p90), ('max_hours', maximum))
+    }
+
+
+@transaction.atomic
+def refresh_production_analytics_days(*, tenant: Tenant, days: Iterable[date]) -> None:
+    """
+    Recompute the daily stage duration and lead time summaries of a tenant for the given days.
+
+    A stage duration runs from an order entering a stage to its next stage
+    change, and counts on the day the order left the stage. The database
+    pairs consecutive history rows of each order with LAG over created_at,
+    reading only the orders that changed stage on those days; Python then
+    takes the percentiles per stage and product. Orders whose history was
+    compacted (see compact_production_stage_history) are paired in Python
+    from their archived and hot entries. Lead times run from order creation
+    to completion and count on the completion day.
+
+    Args:
+        tenant (Tenant): The tenant whose summaries are refreshed.
+        days (Iterable[date]): The days to recompute.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+
+    window = {
+        'partition_by': [models.F('production_order_id')],
+        'order_by': [models.F('created_at').asc(), models.F('pk').asc()],
+    }
+    transitions = ProductionStageHistory.objects.filter(
+        production_order_id__in=ProductionStageHistory.objects.filter(
+            production_order__tenant=tenant,
+            created_at__date__in=days
+        ).values('production_order_id'),
+        production_order__stage_history_archive__isnull=True,
+        created_at__date__lte=days[-1]
+    ).annotate(
+        date=TruncDate('created_at'),
+        previous_stage_id=models.Window(Lag('stage_id'), **window),
+        duration=models.ExpressionWrapper(
+            models.F('created_at') - models.Window(Lag('created_at'), **window),
+            output_field=models.DurationField()
+        )
+    ).filter(previous_stage_id__isnull=False).order_by().values_list(
+        'date', 'previous_stage_id', 'production_order__product_id', 'duration'
+    )
+    stage_durations: Dict[Tuple[date, int, int], List[timedelta]] = defaultdict(list)
+    day_set = set(days)
+    for day, stage_id, product_id, duration in transitions:
+        if day in day_set:
+            stage_durations[day, stage_id, product_id].append(duration)
+
+    archives = ProductionStageHistoryArchive.objects.filter(
+        production_order__tenant=tenant,
+        production_order__created_at__date__lte=days[-1]
+    ).exclude(
+        production_order__completed_at__date__lt=days[0]
+    ).values_list('production_order_id', 'production_order__product_id', 'entries')
+    created_at_field = ProductionStageHistory._meta.get_field('created_at')
+    archived_entries: Dict[int, List[Tuple[datetime, int]]] = {}
+    archived_products = {}
+    for production_order_id, product_id, entries in archives:
+        archived_entries[production_order_id] = [
+            (created_at_field.to_python(entry['created_at']), entry['stage_id']) for entry in entries
+        ]
+        archived_products[production_order_id] = product_id
+    if archived_entries:
+        for production_order_id, created_at, stage_id in ProductionStageHistory.objects.filter(
+            production_order_id__in=list(archived_entries)
+        ).order_by('created_at', 'pk').values_list('production_order_id', 'created_at', 'stage_id'):
+            archived_entries[production_order_id].append((created_at, stage_id))
+    for production_order_id, entries in archived_entries.items():
+        entries.sort(key=lambda entry: entry[0])
+        for (previous_at, stage_id), (created_at, _) in zip(entries, entries[1:]):
+            day = timezone.localdate(created_at)
+            if day in day_set:
+                stage_durations[day, stage_id, archived_products[production_order_id]].append(created_at - previous_at)
+
+    lead_times: Dict[Tuple[date, int], List[timedelta]] = defaultdict(list)
+    for day, product_id, lead_time in ProductionOrder.objects.filter(
+        tenant=tenant,
+        completed_at__isnull=False,
+        completed_at__date__in=days
+    ).annotate(
+        date=TruncDate('completed_at'),
+        lead_time=models.ExpressionWrapper(models.F('completed_at') - models.F('created_at'), output_field=models.DurationField())
+    ).order_by().values_list('date', 'product_id', 'lead_time'):
+        lead_times[day, product_id].append(lead_time)
+
+    for summary_model, summaries in (
+        (ProductionDailyStageSummary, [
+            ProductionDailyStageSummary(
+                tenant=tenant, date=day, stage_id=stage_id, product_id=product_id,
+                transition_count=len(durations), **_duration_summary(durations)
+            )
+            for (day, stage_id, product_id), durations in stage_durations.items()
+        ]),
+        (ProductionDailyLeadTimeSummary, [
+            ProductionDailyLeadTimeSummary(
+                tenant=tenant, date=day, product_id=product_id,
+                order_count=len(durations), **_duration_summary(durations)
+            )
+            for (day, product_id), durations in lead_times.items()
+        ]),
+    ):
+        summary_model.objects.filter(tenant=tenant, date__in=days).delete()
+        summary_model.objects.bulk_create(summaries, batch_size=1000)
+
+
+def refresh_production_analytics(*, tenant: Tenant, full: bool = False, days_per_pass: int = 31) -> int:
+    """
+    Bring the daily stage duration and lead time summaries of a tenant up to date.
+
+    Only the days with stage changes or completions since the previous run
+    (the watermark) are recomputed; `full` recomputes every day with
+    production history.
+
+    Args:
+        tenant (Tenant): The tenant whose summaries are refreshed.
+        full (bool, optional): Ignore the watermark. Defaults to False.
+        days_per_pass (int, optional): Number of days recomputed per transaction. Defaults to 31.
+
+    Returns:
+        int: The number of days recomputed.
+    """
+    state, _ = ProductionAnalyticsRefresh.objects.get_or_create(tenant=tenant)
+    started_at = timezone.now()
+
+    history = ProductionStageHistory.objects.filter(production_order__tenant=tenant)
+    completed = ProductionOrder.objects.filter(tenant=tenant, completed_at__isnull=False)
+    if state.refreshed_until is not None and not full:
+        since = state.refreshed_until - ANALYTICS_REFRESH_OVERLAP
+        history = history.filter(created_at__gte=since)
+        completed = completed.filter(updated_at__gte=since)
+    days = set(history.annotate(date=TruncDate('created_at')).values_list('date', flat=True).order_by())
+    days.update(completed.annotate(date=TruncDate('completed_at')).values_list('date', flat=True).order_by())
+    days = sorted(days)
+
+    for start in range(0, len(days), days_per_pass):
+        refresh_production_analytics_days(tenant=tenant, days=days[start:start + days_per_pass])
+
+    state.refreshed_until = started_at
+    state.save(update_fields=['refreshed_until', 'updated_at'])
+    return len(days)
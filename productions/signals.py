@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import ProductionOrder
+from .services import adjust_production_stage_counters
+
+COUNTER_RELEVANT_FIELDS = {'tenant', 'stage', 'quantity', 'completed_at'}
+
+
+def _add_counter_delta(deltas, tenant_id, stage_id, quantity, sign):
+    count, total = deltas.get((tenant_id, stage_id), (0, Decimal('0')))
+    deltas[(tenant_id, stage_id)] = (count + sign, total + sign * quantity)
+
+
+@receiver(pre_save, sender=ProductionOrder)
+def remember_counted_state_before_production_order_change(sender, instance, update_fields=None, **kwargs):
+    instance._counted_state = None
+    if instance.pk is None or (update_fields is not None and not COUNTER_RELEVANT_FIELDS.intersection(update_fields)):
+        return
+    instance._counted_state = ProductionOrder.objects.filter(
+        pk=instance.pk,
+        completed_at__isnull=True
+    ).values_list('tenant_id', 'stage_id', 'quantity').first()
+
+
+@receiver(post_save, sender=ProductionOrder)
+def update_counters_on_production_order_change(sender, instance, created=False, update_fields=None, **kwargs):
+    if not created and update_fields is not None and not COUNTER_RELEVANT_FIELDS.intersection(update_fields):
+        return
+    # Take the order out of the stage it was counted in, then count it where it is now.
+    deltas = {}
+    previous = getattr(instance, '_counted_state', None)
+    if previous is not None:
+        _add_counter_delta(deltas, *previous, -1)
+    if instance.completed_at is None:
+        _add_counter_delta(deltas, instance.tenant_id, instance.stage_id, instance.quantity, 1)
+    for tenant_id in {tenant_id for tenant_id, _ in deltas}:
+        adjust_production_stage_counters(
+            tenant_id=tenant_id,
+            deltas={stage_id: delta for (owner, stage_id), delta in deltas.items() if owner == tenant_id}
+        )
+
+
+@receiver(post_delete, sender=ProductionOrder)
+def update_counters_on_production_order_delete(sender, instance, **kwargs):
+    if instance.completed_at is None:
+        adjust_production_stage_counters(tenant_id=instance.tenant_id, deltas={instance.stage_id: (-1, -instance.quantity)})
@@ -0,0 +1,219 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from customers.models import Customer
+from inventory.models import StockMovement
+from inventory.services import invalidate_supply_projections
+from productions.models import (ProductionDailyLeadTimeSummary,
+                                ProductionDailyStageSummary, ProductionOrder,
+                                ProductionStage, ProductionStageHistory)
+from productions.services import (ProductionError,
+                                  compact_production_stage_history,
+                                  complete_production_orders,
+                                  get_production_board, move_production_orders,
+                                  plan_material_requirements,
+                                  rebuild_production_stage_counters,
+                                  refresh_production_analytics)
+from products.models import Product, ProductComposition
+from purchases.models import (PurchaseOrder, PurchaseOrderItem,
+                              PurchaseOrderStatus)
+from sales.services import create_sale_order
+from suppliers.models import Supplier, SupplierProduct
+from tenants.models import Tenant
+from users.models import User
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(email="user@test.com", password="123456", name="User Test")
+
+
+@pytest.fixture
+def stage(db, tenant):
+    return ProductionStage.objects.create(tenant=tenant, name="CUTTING", label="Corte", sequence_order=1)
+
+
+@pytest.fixture
+def bill_of_materials(db, tenant):
+    """
+    A finished product made of two sub-assemblies and one raw material, the
+    sub-assembly itself made of three raw materials.
+    """
+    finished = Product.objects.create(tenant=tenant, name="Mesa", sku="SKU001", is_composite=True, price=Decimal("100.00"))
+    assembly = Product.objects.create(tenant=tenant, name="Tampo", sku="SKU002", is_composite=True, stock_quantity=4)
+    material = Product.objects.create(tenant=tenant, name="Parafuso", sku="SKU003", stock_quantity=10)
+    ProductComposition.objects.create(product=finished, component=assembly, quantity=2)
+    ProductComposition.objects.create(product=finished, component=material, quantity=1)
+    ProductComposition.objects.create(product=assembly, component=material, quantity=3)
+    invalidate_supply_projections(tenant.id)
+    return finished, assembly, material
+
+
+def test_plan_material_requirements_nets_multi_level_demand(
+    tenant, user, stage, bill_of_materials, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    finished, assembly, material = bill_of_materials
+    today = timezone.localdate()
+    supplier = Supplier.objects.create(tenant=tenant, name="Fornecedor", lead_time_days=4)
+    with django_capture_on_commit_callbacks(execute=True):
+        SupplierProduct.objects.create(tenant=tenant, supplier=supplier, product=material, cost_price=Decimal("0.10"))
+    status = PurchaseOrderStatus.objects.create(tenant=tenant, name="OPEN", label="Aberto", sequence_order=1)
+    purchase_order = PurchaseOrder.objects.create(tenant=tenant, supplier=supplier, status=status, expected_delivery_date=today + timedelta(days=3))
+    PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=material, quantity=5)
+    ProductionOrder.objects.create(tenant=tenant, product=finished, stage=stage, quantity=5, due_date=today + timedelta(days=10))
+    customer = Customer.objects.create(tenant=tenant, name="Cliente")
+    create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": finished, "quantity": 2}])
+    invalidate_supply_projections(tenant.id)
+
+    with django_assert_max_num_queries(9):
+        planned = plan_material_requirements(tenant=tenant, today=today)
+
+    next_week = today + timedelta(days=7)
+    assert [(order["product_id"], order["kind"], order["quantity"], order["due_date"]) for order in planned] == [
+        (finished.id, "production", Decimal("2"), today),
+        (assembly.id, "production", Decimal("10"), next_week),
+        (material.id, "purchase", Decimal("22"), next_week),
+    ]
+    assert planned[-1]["release_date"] == next_week - timedelta(days=4)
+
+
+def test_plan_material_requirements_rejects_cyclic_compositions(tenant, bill_of_materials):
+    finished, assembly, _ = bill_of_materials
+    ProductComposition.objects.create(product=assembly, component=finished, quantity=1)
+
+    with pytest.raises(ProductionError, match="cycle"):
+        plan_material_requirements(tenant=tenant)
+
+
+def test_complete_production_orders_backflushes_components_in_constant_queries(
+    tenant, user, stage, bill_of_materials, django_assert_max_num_queries
+):
+    finished, assembly, material = bill_of_materials
+    final_stage = ProductionStage.objects.create(tenant=tenant, name="DONE", label="Concluído", sequence_order=9)
+    Product.objects.filter(pk=assembly.pk).update(stock_quantity=400, avg_cost_price=Decimal("5.00"))
+    Product.objects.filter(pk=material.pk).update(stock_quantity=200, avg_cost_price=Decimal("0.50"))
+    orders = ProductionOrder.objects.bulk_create([
+        ProductionOrder(tenant=tenant, product=finished, stage=stage, quantity=1) for _ in range(200)
+    ])
+    rebuild_production_stage_counters(tenant=tenant)
+
+    # SQLite splits the 600 movements and 200 history rows into several INSERTs.
+    with django_assert_max_num_queries(23):
+        assert complete_production_orders(tenant=tenant, production_orders=orders, user=user) == 200
+
+    stock = dict(Product.objects.values_list("pk", "stock_quantity"))
+    assert stock == {finished.id: Decimal("200"), assembly.id: Decimal("0"), material.id: Decimal("0")}
+    finished.refresh_from_db()
+    assert finished.avg_cost_price == Decimal("10.50")
+    assert StockMovement.objects.filter(source_object_id=orders[0].id).count() == 3
+    assert ProductionOrder.objects.filter(stage=final_stage, completed_at__isnull=False).count() == 200
+    assert ProductionStageHistory.objects.filter(stage=final_stage).count() == 200
+    assert [row["order_count"] for row in get_production_board(tenant=tenant)] == [0, 0]
+
+    with pytest.raises(ProductionError, match="already completed"):
+        complete_production_orders(tenant=tenant, production_orders=orders[:1], user=user)
+
+
+def test_move_production_orders_in_bulk_keeps_board_counters(
+    tenant, user, stage, bill_of_materials, django_assert_max_num_queries
+):
+    finished, _, _ = bill_of_materials
+    assembly_stage = ProductionStage.objects.create(tenant=tenant, name="ASSEMBLY", label="Montagem", sequence_order=2)
+    ProductionStage.objects.create(tenant=tenant, name="DONE", label="Concluído", sequence_order=9)
+    orders = [ProductionOrder.objects.create(tenant=tenant, product=finished, stage=stage, quantity=2) for _ in range(3)]
+
+    with django_assert_max_num_queries(8):
+        moved = move_production_orders(tenant=tenant, production_orders=orders[:2], stage=assembly_stage, user=user, notes="Lote")
+    assert moved == 2
+    assert move_production_orders(tenant=tenant, production_orders=orders[:1], stage=assembly_stage, user=user) == 0
+    assert ProductionStageHistory.objects.filter(stage=assembly_stage, notes="Lote").count() == 2
+
+    board = [(row["name"], row["order_count"], row["quantity"]) for row in get_production_board(tenant=tenant)]
+    assert board == [("CUTTING", 1, Decimal("2")), ("ASSEMBLY", 2, Decimal("4")), ("DONE", 0, Decimal("0"))]
+
+    orders[2].delete()
+    assert get_production_board(tenant=tenant)[0]["order_count"] == 0
+    rebuild_production_stage_counters(tenant=tenant)
+    assert [(row["order_count"], row["quantity"]) for row in get_production_board(tenant=tenant)] == [
+        (0, Decimal("0")), (2, Decimal("4")), (0, Decimal("0"))
+    ]
+
+
+def test_production_order_saves_adjust_board_counters(tenant, stage, bill_of_materials, django_assert_max_num_queries):
+    finished, _, _ = bill_of_materials
+    assembly_stage = ProductionStage.objects.create(tenant=tenant, name="ASSEMBLY", label="Montagem", sequence_order=2)
+    order = ProductionOrder.objects.create(tenant=tenant, product=finished, stage=stage, quantity=2)
+    ProductionOrder.objects.create(tenant=tenant, product=finished, stage=stage, quantity=1)
+
+    order.stage = assembly_stage
+    order.quantity = Decimal("5")
+    with django_assert_max_num_queries(7):
+        order.save()
+    order.save(update_fields=["updated_at"])
+    assert [(row["order_count"], row["quantity"]) for row in get_production_board(tenant=tenant)] == [
+        (1, Decimal("1")), (1, Decimal("5"))
+    ]
+
+    order.completed_at = timezone.now()
+    order.save()
+    order.delete()
+    assert [(row["order_count"], row["quantity"]) for row in get_production_board(tenant=tenant)] == [
+        (1, Decimal("1")), (0, Decimal("0"))
+    ]
+
+
+def test_refresh_production_analytics_summarizes_stage_durations(
+    tenant, user, stage, bill_of_materials, django_assert_max_num_queries
+):
+    finished, _, _ = bill_of_materials
+    assembly_stage = ProductionStage.objects.create(tenant=tenant, name="ASSEMBLY", label="Montagem", sequence_order=2)
+    done_stage = ProductionStage.objects.create(tenant=tenant, name="DONE", label="Concluído", sequence_order=9)
+    started = timezone.make_aware(datetime(2026, 3, 2, 8, 0))
+    completed, open_order = [
+        ProductionOrder.objects.create(tenant=tenant, product=finished, stage=stage, quantity=1) for _ in range(2)
+    ]
+    ProductionOrder.objects.filter(pk__in=[completed.pk, open_order.pk]).update(created_at=started, updated_at=started)
+    ProductionOrder.objects.filter(pk=completed.pk).update(completed_at=started + timedelta(hours=6))
+    for production_order, stage_changes in (
+        (completed, [(stage, 0), (assembly_stage, 2), (done_stage, 6)]),
+        (open_order, [(stage, 0), (assembly_stage, 4)]),
+    ):
+        for changed_stage, hours in stage_changes:
+            entry = ProductionStageHistory.objects.create(production_order=production_order, stage=changed_stage, changed_by=user)
+            ProductionStageHistory.objects.filter(pk=entry.pk).update(created_at=started + timedelta(hours=hours))
+
+    with django_assert_max_num_queries(16):
+        assert refresh_production_analytics(tenant=tenant) == 1
+
+    summaries = {
+        summary.stage_id: (summary.transition_count, summary.average_hours, summary.p50_hours, summary.p90_hours, summary.max_hours)
+        for summary in ProductionDailyStageSummary.objects.filter(tenant=tenant, date=started.date(), product=finished)
+    }
+    assert summaries == {
+        stage.id: (2, Decimal("3.00"), Decimal("3.00"), Decimal("3.80"), Decimal("4.00")),
+        assembly_stage.id: (1, Decimal("4.00"), Decimal("4.00"), Decimal("4.00"), Decimal("4.00")),
+    }
+    lead_time = ProductionDailyLeadTimeSummary.objects.get(tenant=tenant, date=started.date(), product=finished)
+    assert (lead_time.order_count, lead_time.p50_hours) == (1, Decimal("6.00"))
+
+    # Recomputing the day after the completed order's history was compacted
+    # reads its archived entries.
+    assert compact_production_stage_history(tenant=tenant) == 3
+    assert refresh_production_analytics(tenant=tenant, full=True) == 1
+    assert summaries == {
+        summary.stage_id: (summary.transition_count, summary.average_hours, summary.p50_hours, summary.p90_hours, summary.max_hours)
+        for summary in ProductionDailyStageSummary.objects.filter(tenant=tenant, date=started.date(), product=finished)
+    }
+
+    assert refresh_production_analytics(tenant=tenant) == 0
+    move_production_orders(tenant=tenant, production_orders=[open_order], stage=done_stage, user=user)
+    assert refresh_production_analytics(tenant=tenant) == 1
+    assert ProductionDailyStageSummary.objects.filter(tenant=tenant, date=timezone.localdate(), stage=assembly_stage).exists()
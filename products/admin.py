@@ -1,7 +1,9 @@
 from django.contrib import admin
 
-from .models import (Attribute, AttributeValue, Product, ProductAttributeValue,
-                     ProductBrand, ProductCategory, ProductComposition)
+from .models import (Attribute, AttributeValue, PriceUpdate, PriceUpdateItem,
+                     Product, ProductAttributeValue, ProductBrand,
+                     ProductCategory, ProductComposition)
+from .services import filter_products_by_search
 
 
 class ProductCompositionInline(admin.TabularInline):
@@ -48,7 +50,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('parent', 'category', 'brand', 'is_variant', 'is_composite', 'is_active')
         }),
         ('Pricing & Stock', {
-            'fields': ('price', 'avg_cost_price', 'stock_quantity', 'minimum_stock_quantity', 'unit_of_measure')
+            'fields': ('price', 'avg_cost_price', 'stock_quantity', 'minimum_stock_quantity', 'unit_of_measure', 'weight')
         }),
     )
 
@@ -66,6 +68,11 @@ class ProductAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('parent', 'category', 'brand', 'tenant')
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return filter_products_by_search(queryset, search_term), False
+
 
 @admin.register(ProductCategory)
 class ProductCategoryAdmin(admin.ModelAdmin):
@@ -105,3 +112,29 @@ class AttributeValueAdmin(admin.ModelAdmin):
     ordering = ('attribute__name', 'value')
     date_hierarchy = 'created_at'
     list_per_page = 20
+
+
+class PriceUpdateItemInline(admin.TabularInline):
+    model = PriceUpdateItem
+    extra = 0
+    fields = ('product', 'old_price', 'new_price')
+    readonly_fields = ('product', 'old_price', 'new_price')
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(PriceUpdate)
+class PriceUpdateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'method', 'value', 'rounding', 'brand', 'category', 'product_count', 'created_at', 'tenant')
+    list_filter = ('method', 'tenant', 'created_at')
+    search_fields = ('id', 'notes')
+    inlines = [PriceUpdateItemInline]
+    readonly_fields = [f.name for f in PriceUpdate._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('brand', 'category', 'tenant')
@@ -0,0 +1,41 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services import export_products
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Export the live products of a tenant to CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', type=int, help='Tenant id whose products are exported.')
+        parser.add_argument('path', help='Destination file, or "-" for standard output.')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(pk=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError('Tenant {} does not exist.'.format(options['tenant']))
+
+        started = time.monotonic()
+        if options['path'] == '-':
+            written = export_products(
+                tenant=tenant, stream=sys.stdout, file_format=options['file_format'], chunk_size=options['chunk_size']
+            )
+        else:
+            with open(options['path'], 'w', newline='', encoding='utf-8') as stream:
+                written = export_products(
+                    tenant=tenant, stream=stream, file_format=options['file_format'], chunk_size=options['chunk_size']
+                )
+        elapsed = time.monotonic() - started
+
+        self.stderr.write(self.style.SUCCESS(
+            'Exported {} products in {:.1f}s ({:.0f} rows/s).'.format(
+                written, elapsed, written / elapsed if elapsed else written
+            )
+        ))
@@ -0,0 +1,49 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services import ProductImportError, import_products
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Import products from a CSV or JSON Lines file, creating or updating them by SKU.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', type=int, help='Tenant id receiving the products.')
+        parser.add_argument('path', help='Path of the file to import.')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], default=None,
+                            help='File format. Guessed from the extension when omitted.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            tenant = Tenant.objects.get(pk=options['tenant'])
+        except Tenant.DoesNotExist:
+            raise CommandError('Tenant {} does not exist.'.format(options['tenant']))
+
+        path = options['path']
+        file_format = options['file_format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as stream:
+            if file_format == 'csv':
+                rows = csv.DictReader(stream)
+            else:
+                rows = (json.loads(line) for line in stream if line.strip())
+            try:
+                stats = import_products(tenant=tenant, rows=rows, batch_size=options['batch_size'])
+            except ProductImportError as error:
+                raise CommandError(str(error))
+        elapsed = time.monotonic() - started
+
+        for number, message in sorted(stats['errors'].items()):
+            self.stderr.write('Row {}: {}'.format(number, message))
+        total = stats['created'] + stats['updated']
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} products ({} created, {} updated) in {:.1f}s ({:.0f} rows/s).'.format(
+                total, stats['created'], stats['updated'], elapsed, total / elapsed if elapsed else total
+            )
+        ))
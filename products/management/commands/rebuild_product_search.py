@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.services import rebuild_product_search_documents
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search documents of products.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild the products of this tenant id.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant'] is not None:
+            try:
+                tenant = Tenant.objects.get(pk=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError('Tenant {} does not exist.'.format(options['tenant']))
+
+        processed = rebuild_product_search_documents(tenant=tenant, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt search documents for {} products.'.format(processed)))
@@ -0,0 +1,103 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE products_productsearchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(sku, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(brand, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX products_productsearch_vector_gin ON products_productsearchdocument USING GIN (search_vector)",
+]
+
+POSTGRESQL_REVERSE = [
+    "DROP INDEX IF EXISTS products_productsearch_vector_gin",
+    "ALTER TABLE products_productsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE products_productsearch_fts USING fts5(
+        name, sku, brand, category, description,
+        content='products_productsearchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER products_productsearch_fts_ai AFTER INSERT ON products_productsearchdocument BEGIN
+        INSERT INTO products_productsearch_fts(rowid, name, sku, brand, category, description)
+        VALUES (new.id, new.name, new.sku, new.brand, new.category, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_productsearch_fts_ad AFTER DELETE ON products_productsearchdocument BEGIN
+        INSERT INTO products_productsearch_fts(products_productsearch_fts, rowid, name, sku, brand, category, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.brand, old.category, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER products_productsearch_fts_au AFTER UPDATE ON products_productsearchdocument BEGIN
+        INSERT INTO products_productsearch_fts(products_productsearch_fts, rowid, name, sku, brand, category, description)
+        VALUES ('delete', old.id, old.name, old.sku, old.brand, old.category, old.description);
+        INSERT INTO products_productsearch_fts(rowid, name, sku, brand, category, description)
+        VALUES (new.id, new.name, new.sku, new.brand, new.category, new.description);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS products_productsearch_fts_au",
+    "DROP TRIGGER IF EXISTS products_productsearch_fts_ad",
+    "DROP TRIGGER IF EXISTS products_productsearch_fts_ai",
+    "DROP TABLE IF EXISTS products_productsearch_fts",
+]
+
+
+def _run_vendor_statements(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    _run_vendor_statements(schema_editor, {'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run_vendor_statements(schema_editor, {'postgresql': POSTGRESQL_REVERSE, 'sqlite': SQLITE_REVERSE})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_product_cannot_be_its_own_parent'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('sku', models.CharField(blank=True, max_length=100, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('brand', models.CharField(blank=True, max_length=255, null=True)),
+                ('category', models.CharField(blank=True, max_length=255, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='products.product')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_search_documents', to='tenants.tenant')),
+            ],
+            options={
+                'verbose_name': 'Product Search Document',
+                'verbose_name_plural': 'Product Search Documents',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
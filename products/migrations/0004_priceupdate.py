@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_productsearchdocument'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('PCT', 'Percentual sobre o preço'), ('FIX', 'Valor fixo sobre o preço'), ('CPA', 'Custo médio + margem'), ('CPS', 'Custo do fornecedor + margem')], max_length=3)),
+                ('value', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('rounding', models.CharField(choices=[('NONE', 'Sem arredondamento'), ('INT', 'Valor inteiro'), ('E90', 'Terminado em ,90'), ('E99', 'Terminado em ,99')], default='NONE', max_length=4)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('brand', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_updates', to='products.productbrand')),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_updates', to='products.productcategory')),
+                ('tenant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_updates', to='tenants.tenant')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_updates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Price Update',
+                'verbose_name_plural': 'Price Updates',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PriceUpdateItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('price_update', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='products.priceupdate')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'Price Update Item',
+                'verbose_name_plural': 'Price Update Items',
+                'unique_together': {('price_update', 'product')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_product_live_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='weight',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True),
+        ),
+    ]
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils import timezone
 
+from tenants.managers import SoftDeleteQuerySet
 from tenants.models import Tenant
 
 
@@ -72,6 +74,34 @@ class AttributeValue(models.Model):
         return f"{self.attribute.name}: {self.value}"
 
 
+class ProductQuerySet(SoftDeleteQuerySet):
+    """
+    Bulk soft deletes and restores skip post_save, so they refresh the search
+    documents and facet indexes of the products they change themselves.
+    """
+
+    def _schedule_refresh(self, rows) -> None:
+        # Imported here: products.services imports this module.
+        from .services import schedule_products_refresh
+        schedule_products_refresh(product_ids=[pk for pk, _ in rows], tenant_ids=[tenant_id for _, tenant_id in rows])
+
+    def soft_delete(self) -> int:
+        rows = list(self.live().values_list('pk', 'tenant_id'))
+        if not rows:
+            return 0
+        count = super().soft_delete()
+        self._schedule_refresh(rows)
+        return count
+
+    def restore(self) -> int:
+        rows = list(self.deleted().values_list('pk', 'tenant_id'))
+        if not rows:
+            return 0
+        count = super().restore()
+        self._schedule_refresh(rows)
+        return count
+
+
 class Product(models.Model):
 
     class UnitOfMeasure(models.TextChoices):
@@ -114,17 +144,23 @@ class Product(models.Model):
     stock_quantity = models.DecimalField(max_digits=10, decimal_places=3, default=0.0)
     minimum_stock_quantity = models.DecimalField(max_digits=10, decimal_places=3, default=0.0)
     unit_of_measure = models.CharField(max_length=10, choices=UnitOfMeasure.choices, default=UnitOfMeasure.UNIT)
+    weight = models.DecimalField(max_digits=10, decimal_places=3, blank=True, null=True)
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     avg_cost_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         unique_together = ('tenant', 'sku')
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name'], condition=models.Q(deleted_at__isnull=True), name='product_live_idx'),
+        ]
         constraints = [
             models.CheckConstraint(
                 condition=~models.Q(id=models.F('parent_id')),
@@ -191,3 +227,70 @@ class ProductAttributeValue(models.Model):
         verbose_name = 'Product Attribute Value'
         verbose_name_plural = 'Product Attribute Values'
         unique_together = ('product', 'attribute_value')
+
+
+class ProductSearchDocument(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='product_search_documents')
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='search_document')
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=100, blank=True, null=True)
+    description = models.TextField(blank=True, null=True)
+    brand = models.CharField(max_length=255, blank=True, null=True)
+    category = models.CharField(max_length=255, blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Product Search Document'
+        verbose_name_plural = 'Product Search Documents'
+
+    def __str__(self):
+        return self.name
+
+
+class PriceUpdate(models.Model):
+
+    class Method(models.TextChoices):
+        PERCENTAGE = 'PCT', 'Percentual sobre o preço'
+        FIXED_AMOUNT = 'FIX', 'Valor fixo sobre o preço'
+        COST_PLUS_AVERAGE = 'CPA', 'Custo médio + margem'
+        COST_PLUS_SUPPLIER = 'CPS', 'Custo do fornecedor + margem'
+
+    class Rounding(models.TextChoices):
+        NONE = 'NONE', 'Sem arredondamento'
+        INTEGER = 'INT', 'Valor inteiro'
+        ENDING_90 = 'E90', 'Terminado em ,90'
+        ENDING_99 = 'E99', 'Terminado em ,99'
+
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='price_updates')
+    method = models.CharField(max_length=3, choices=Method.choices)
+    value = models.DecimalField(max_digits=10, decimal_places=2)
+    rounding = models.CharField(max_length=4, choices=Rounding.choices, default=Rounding.NONE)
+    brand = models.ForeignKey(ProductBrand, on_delete=models.SET_NULL, blank=True, null=True, related_name='price_updates')
+    category = models.ForeignKey(ProductCategory, on_delete=models.SET_NULL, blank=True, null=True, related_name='price_updates')
+    product_count = models.PositiveIntegerField(default=0)
+    notes = models.TextField(blank=True, null=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='price_updates')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Price Update'
+        verbose_name_plural = 'Price Updates'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'Price Update {self.id} - {self.get_method_display()} {self.value}'
+
+
+class PriceUpdateItem(models.Model):
+    price_update = models.ForeignKey(PriceUpdate, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
+    old_price = models.DecimalField(max_digits=10, decimal_places=2)
+    new_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Price Update Item'
+        verbose_name_plural = 'Price Update Items'
+        unique_together = ('price_update', 'product')
+
+    def __str__(self):
+        return f'{self.product.name}: {self.old_price} -> {self.new_price}'
@@ -0,0 +1,951 @@
+import csv
+import json
+import re
+import threading
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from django.db import connection, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Ceil, Round
+
+from suppliers.models import SupplierProduct
+from tenants.models import Tenant
+from tenants.stamps import bump_cache_stamp, get_cache_stamps
+from users.models import User
+
+from .models import (Attribute, AttributeValue, PriceUpdate, PriceUpdateItem,
+                     Product, ProductAttributeValue, ProductBrand,
+                     ProductCategory, ProductSearchDocument)
+
+
+class PricingError(Exception):
+    """Custom exception for pricing-related errors."""
+    pass
+
+
+class ProductImportError(Exception):
+    """Custom exception for product import errors."""
+    pass
+
+
+_NON_ZERO_BYTE = re.compile(rb'[^\x00]')
+_SEARCH_TERM = re.compile(r'\w+')
+
+SEARCH_DOCUMENT_FIELDS = ('name', 'sku', 'description', 'brand', 'category')
+
+
+def _bitmap_from_ids(ids: Iterable[int]) -> int:
+    """
+    Build an integer bitmap with one bit set per id.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    bits = bytearray((max(ids) >> 3) + 1)
+    for value in ids:
+        bits[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _ids_from_bitmap(bitmap: int) -> List[int]:
+    """
+    Return the ids whose bits are set in the bitmap, in ascending order.
+    """
+    if not bitmap:
+        return []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) >> 3, 'little')
+    ids = []
+    for match in _NON_ZERO_BYTE.finditer(data):
+        offset = match.start()
+        byte = data[offset]
+        for bit in range(8):
+            if byte & (1 << bit):
+                ids.append((offset << 3) + bit)
+    return ids
+
+
+class ProductFacetIndex:
+    """
+    In-memory inverted index of the attribute values of a tenant's live products.
+
+    Every attribute value maps to a bitmap whose set bits are the ids of the
+    products carrying it, so facet filters are resolved with bitwise operations
+    and facet counts with popcounts, without touching the database.
+    """
+
+    def __init__(self, tenant_id: int, stamp: int = 0):
+        self.tenant_id = tenant_id
+        self.stamp = stamp
+        self._postings: Dict[int, int] = {}
+        self._value_attributes: Dict[int, int] = {}
+        self._lock = threading.RLock()
+
+    def build(self) -> None:
+        """
+        Load the whole index for the tenant with a single query.
+        """
+        rows = ProductAttributeValue.objects.filter(
+            product__tenant_id=self.tenant_id,
+            product__is_active=True,
+            product__deleted_at__isnull=True
+        ).values_list('attribute_value_id', 'attribute_value__attribute_id', 'product_id')
+
+        product_ids: Dict[int, List[int]] = {}
+        value_attributes: Dict[int, int] = {}
+        for value_id, attribute_id, product_id in rows.iterator(chunk_size=5000):
+            product_ids.setdefault(value_id, []).append(product_id)
+            value_attributes[value_id] = attribute_id
+
+        postings = {value_id: _bitmap_from_ids(ids) for value_id, ids in product_ids.items()}
+        with self._lock:
+            self._postings = postings
+            self._value_attributes = value_attributes
+
+    def set_product_values(self, product_id: int, values: Dict[int, int]) -> None:
+        """
+        Replace the attribute values indexed for a product.
+
+        Args:
+            product_id (int): The product being re-indexed.
+            values (Dict[int, int]): Mapping of attribute value id to attribute id.
+                An empty mapping removes the product from the index.
+        """
+        bit = 1 << product_id
+        with self._lock:
+            for value_id, bitmap in list(self._postings.items()):
+                if bitmap & bit and value_id not in values:
+                    if bitmap == bit:
+                        del self._postings[value_id]
+                        del self._value_attributes[value_id]
+                    else:
+                        self._postings[value_id] = bitmap & ~bit
+            for value_id, attribute_id in values.items():
+                self._postings[value_id] = self._postings.get(value_id, 0) | bit
+                self._value_attributes[value_id] = attribute_id
+
+    def _match(self, facets: Dict[int, Iterable[int]], exclude_attribute: Optional[int] = None) -> Optional[int]:
+        """
+        Return the bitmap of products matching the facets, OR-ing values of the
+        same attribute and AND-ing across attributes. None means unconstrained.
+        """
+        result = None
+        for attribute_id, value_ids in facets.items():
+            if attribute_id == exclude_attribute:
+                continue
+            selected = 0
+            for value_id in value_ids:
+                selected |= self._postings.get(value_id, 0)
+            result = selected if result is None else result & selected
+        return result
+
+    def search(self, facets: Dict[int, Iterable[int]]) -> List[int]:
+        """
+        Return the ids of the products matching all the given facets.
+
+        Args:
+            facets (Dict[int, Iterable[int]]): Mapping of attribute id to the selected attribute value ids.
+
+        Returns:
+            List[int]: Matching product ids in ascending order.
+        """
+        facets = {attribute_id: list(value_ids) for attribute_id, value_ids in facets.items()}
+        with self._lock:
+            matched = self._match(facets)
+            if matched is None:
+                matched = 0
+                for bitmap in self._postings.values():
+                    matched |= bitmap
+        return _ids_from_bitmap(matched)
+
+    def facet_counts(self, facets: Dict[int, Iterable[int]]) -> Dict[int, Dict[int, int]]:
+        """
+        Count the products for every attribute value under the current selection.
+
+        The counts of an attribute ignore the selection made on that same
+        attribute, so the values of a facet remain selectable alternatives.
+
+        Args:
+            facets (Dict[int, Iterable[int]]): Mapping of attribute id to the selected attribute value ids.
+
+        Returns:
+            Dict[int, Dict[int, int]]: Mapping of attribute id to {attribute value id: product count}.
+        """
+        facets = {attribute_id: list(value_ids) for attribute_id, value_ids in facets.items()}
+        counts: Dict[int, Dict[int, int]] = {}
+        bases: Dict[int, Optional[int]] = {}
+        with self._lock:
+            for value_id, bitmap in self._postings.items():
+                attribute_id = self._value_attributes[value_id]
+                if attribute_id not in bases:
+                    bases[attribute_id] = self._match(facets, exclude_attribute=attribute_id)
+                base = bases[attribute_id]
+                count = (bitmap if base is None else bitmap & base).bit_count()
+                if count:
+                    counts.setdefault(attribute_id, {})[value_id] = count
+        return counts
+
+
+_facet_indexes: Dict[int, ProductFacetIndex] = {}
+_facet_indexes_lock = threading.Lock()
+
+
+def _facet_stamp_key(tenant_id: int) -> str:
+    return 'product_facets:{}'.format(tenant_id)
+
+
+def get_product_facet_index(tenant: Tenant) -> ProductFacetIndex:
+    """
+    Return the facet index of a tenant, building it on first use.
+
+    One query reads the tenant's facet stamp (see tenants.stamps); an index
+    built at another stamp missed changes saved by another process and is
+    rebuilt.
+    """
+    key = _facet_stamp_key(tenant.id)
+    stamp = get_cache_stamps([key])[key]
+    with _facet_indexes_lock:
+        index = _facet_indexes.get(tenant.id)
+        if index is None or index.stamp != stamp:
+            index = ProductFacetIndex(tenant.id, stamp)
+            index.build()
+            _facet_indexes[tenant.id] = index
+    return index
+
+
+def invalidate_product_facet_index(tenant_id: int) -> None:
+    """
+    Drop the facet index of a tenant, in every process, so that it is rebuilt on next use.
+    """
+    bump_cache_stamp(_facet_stamp_key(tenant_id))
+    with _facet_indexes_lock:
+        _facet_indexes.pop(tenant_id, None)
+
+
+def refresh_product_facets(*, product_id: int, tenant_id: int) -> None:
+    """
+    Re-index a single product in its tenant's facet index, if the index is loaded.
+
+    Called after the change's stamp bump: when the stamp moved by exactly one
+    since the index was built, no other change happened in between and the
+    index takes the new stamp; otherwise it is left to be rebuilt on next use.
+    """
+    index = _facet_indexes.get(tenant_id)
+    if index is None:
+        return
+    key = _facet_stamp_key(tenant_id)
+    stamp = get_cache_stamps([key])[key]
+
+    is_live = Product.objects.live().filter(pk=product_id, tenant_id=tenant_id, is_active=True).exists()
+    values = {}
+    if is_live:
+        values = dict(
+            ProductAttributeValue.objects.filter(product_id=product_id)
+            .values_list('attribute_value_id', 'attribute_value__attribute_id')
+        )
+    index.set_product_values(product_id, values)
+    if stamp == index.stamp + 1:
+        index.stamp = stamp
+
+
+def schedule_product_facets_refresh(*, product_id: int, tenant_id: Optional[int] = None) -> None:
+    """
+    Mark a product's tenant facets as changed and re-index the product once the current transaction commits.
+
+    The tenant's facet stamp is bumped on commit, so the indexes of the
+    other processes are rebuilt on their next use, while this process's
+    index is updated in place.
+
+    Args:
+        product_id (int): The product to re-index.
+        tenant_id (int, optional): The product's tenant. Looked up when omitted.
+    """
+    if tenant_id is None:
+        tenant_id = Product.objects.filter(pk=product_id).values_list('tenant_id', flat=True).first()
+        if tenant_id is None:
+            return
+    bump_cache_stamp(_facet_stamp_key(tenant_id))
+    if tenant_id not in _facet_indexes:
+        return
+    transaction.on_commit(lambda: refresh_product_facets(product_id=product_id, tenant_id=tenant_id))
+
+
+def search_products_by_facets(*, tenant: Tenant, facets: Dict[int, Iterable[int]]) -> List[int]:
+    """
+    Return the ids of the tenant's live products matching all the given facets.
+
+    Values of the same attribute are alternatives (OR) while different attributes
+    must all match (AND). The caller is expected to fetch only the page of
+    products it displays.
+
+    Args:
+        tenant (Tenant): The tenant whose catalog is searched.
+        facets (Dict[int, Iterable[int]]): Mapping of attribute id to the selected attribute value ids.
+
+    Returns:
+        List[int]: Matching product ids in ascending order.
+    """
+    return get_product_facet_index(tenant).search(facets)
+
+
+def get_product_facet_counts(*, tenant: Tenant, facets: Dict[int, Iterable[int]]) -> Dict[int, Dict[int, int]]:
+    """
+    Return the product count of every attribute value under the given selection.
+
+    Args:
+        tenant (Tenant): The tenant whose catalog is searched.
+        facets (Dict[int, Iterable[int]]): Mapping of attribute id to the selected attribute value ids.
+
+    Returns:
+        Dict[int, Dict[int, int]]: Mapping of attribute id to {attribute value id: product count}.
+    """
+    return get_product_facet_index(tenant).facet_counts(facets)
+
+
+def refresh_product_search_documents(*, product_ids: Iterable[int], batch_size: int = 1000) -> None:
+    """
+    Rebuild the search documents of the given products.
+
+    Documents are upserted in batches; soft-deleted products lose their document
+    so that they no longer show up in search results.
+
+    Args:
+        product_ids (Iterable[int]): Ids of the products to refresh.
+        batch_size (int, optional): Number of products handled per statement. Defaults to 1000.
+    """
+    product_ids = list(set(product_ids))
+    for start in range(0, len(product_ids), batch_size):
+        chunk = product_ids[start:start + batch_size]
+        rows = Product.objects.filter(id__in=chunk).values_list(
+            'id', 'tenant_id', 'deleted_at', 'name', 'sku', 'description', 'brand__name', 'category__name'
+        )
+
+        documents = []
+        deleted_ids = []
+        for product_id, tenant_id, deleted_at, name, sku, description, brand, category in rows:
+            if deleted_at is not None:
+                deleted_ids.append(product_id)
+                continue
+            documents.append(ProductSearchDocument(
+                tenant_id=tenant_id,
+                product_id=product_id,
+                name=name,
+                sku=sku,
+                description=description,
+                brand=brand,
+                category=category
+            ))
+
+        if deleted_ids:
+            ProductSearchDocument.objects.filter(product_id__in=deleted_ids).delete()
+        ProductSearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['tenant', *SEARCH_DOCUMENT_FIELDS, 'updated_at']
+        )
+
+
+def rebuild_product_search_documents(*, tenant: Tenant = None, batch_size: int = 1000) -> int:
+    """
+    Rebuild the search documents of every product, optionally for a single tenant.
+
+    Returns:
+        int: The number of products processed.
+    """
+    products = Product.objects.all()
+    if tenant is not None:
+        products = products.filter(tenant=tenant)
+
+    processed = 0
+    chunk = []
+    for product_id in products.values_list('id', flat=True).iterator(chunk_size=batch_size):
+        chunk.append(product_id)
+        if len(chunk) == batch_size:
+            refresh_product_search_documents(product_ids=chunk, batch_size=batch_size)
+            processed += len(chunk)
+            chunk = []
+    if chunk:
+        refresh_product_search_documents(product_ids=chunk, batch_size=batch_size)
+        processed += len(chunk)
+    return processed
+
+
+def schedule_product_search_refresh(product_ids: Iterable[int]) -> None:
+    """
+    Refresh the search documents of the given products once the current transaction commits.
+    """
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_search_documents(product_ids=product_ids))
+
+
+def schedule_products_refresh(*, product_ids: Iterable[int], tenant_ids: Iterable[int]) -> None:
+    """
+    Refresh the search documents and facet indexes of products changed in bulk, without their signals.
+
+    The search documents are refreshed once the current transaction commits
+    and the facet indexes of the products' tenants are invalidated.
+    """
+    schedule_product_search_refresh(product_ids)
+    for tenant_id in set(tenant_ids):
+        invalidate_product_facet_index(tenant_id)
+
+
+def _full_text_match_sql(terms: List[str]) -> Tuple[str, List]:
+    """
+    Return the SQL selecting (product_id, tenant_id, rank) for the documents
+    matching every term as a prefix, using the database's full-text index.
+    """
+    if connection.vendor == 'postgresql':
+        ts_query = ' & '.join('{}:*'.format(term) for term in terms)
+        sql = (
+            "SELECT d.product_id, d.tenant_id, ts_rank(d.search_vector, to_tsquery('simple', %s)) AS rank "
+            "FROM products_productsearchdocument d "
+            "WHERE d.search_vector @@ to_tsquery('simple', %s)"
+        )
+        return sql, [ts_query, ts_query]
+
+    fts_query = ' '.join('"{}"*'.format(term) for term in terms)
+    sql = (
+        "SELECT d.product_id, d.tenant_id, -bm25(products_productsearch_fts, 10.0, 10.0, 4.0, 4.0, 1.0) AS rank "
+        "FROM products_productsearch_fts "
+        "JOIN products_productsearchdocument d ON d.id = products_productsearch_fts.rowid "
+        "WHERE products_productsearch_fts MATCH %s"
+    )
+    return sql, [fts_query]
+
+
+def _fallback_documents(terms: List[str]) -> models.QuerySet:
+    """
+    Return the documents containing every term, for databases without a full-text index.
+    """
+    documents = ProductSearchDocument.objects.all()
+    for term in terms:
+        condition = models.Q()
+        for field in SEARCH_DOCUMENT_FIELDS:
+            condition |= models.Q(**{'{}__icontains'.format(field): term})
+        documents = documents.filter(condition)
+    return documents
+
+
+def _has_full_text_index() -> bool:
+    return connection.vendor in ('postgresql', 'sqlite')
+
+
+def search_products(*, tenant: Tenant, query: str, limit: int = 50) -> List[int]:
+    """
+    Search the tenant's products by name, SKU, description, brand and category.
+
+    Every word of the query must match the beginning of a word in the product's
+    search document. Results are ranked with name and SKU matches weighted
+    above brand and category, and those above the description.
+
+    Args:
+        tenant (Tenant): The tenant whose catalog is searched.
+        query (str): The text typed by the user.
+        limit (int, optional): Maximum number of results. Defaults to 50.
+
+    Returns:
+        List[int]: Matching product ids, best match first.
+    """
+    terms = [term.lower() for term in _SEARCH_TERM.findall(query)]
+    if not terms:
+        return []
+
+    if not _has_full_text_index():
+        documents = _fallback_documents(terms).filter(tenant=tenant).order_by('name')
+        return list(documents.values_list('product_id', flat=True)[:limit])
+
+    sql, params = _full_text_match_sql(terms)
+    sql = "SELECT product_id FROM ({}) AS matches WHERE tenant_id = %s ORDER BY rank DESC LIMIT %s".format(sql)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, tenant.id, limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_products_by_search(queryset: models.QuerySet, query: str) -> models.QuerySet:
+    """
+    Restrict a product queryset to the products matching a search query.
+
+    Unlike search_products, matches are not ranked nor limited, which suits
+    listings that apply their own ordering and pagination such as the admin.
+    """
+    terms = [term.lower() for term in _SEARCH_TERM.findall(query)]
+    if not terms:
+        return queryset
+
+    if not _has_full_text_index():
+        return queryset.filter(id__in=_fallback_documents(terms).values('product_id'))
+
+    sql, params = _full_text_match_sql(terms)
+    return queryset.filter(id__in=RawSQL("SELECT product_id FROM ({}) AS matches".format(sql), params))
+
+
+PRICE_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
+ROUNDING_ENDINGS = {
+    PriceUpdate.Rounding.ENDING_90: Decimal('0.90'),
+    PriceUpdate.Rounding.ENDING_99: Decimal('0.99'),
+}
+
+
+def _new_price_expression(*, tenant: Tenant, method: str, value: Decimal, rounding: str) -> models.Expression:
+    """
+    Build the SQL expression computing a product's new price for a repricing rule.
+    """
+    factor = models.Value(1 + value / 100, output_field=PRICE_FIELD)
+
+    if method == PriceUpdate.Method.PERCENTAGE:
+        price = models.F('price') * factor
+    elif method == PriceUpdate.Method.FIXED_AMOUNT:
+        price = models.F('price') + models.Value(value, output_field=PRICE_FIELD)
+    elif method == PriceUpdate.Method.COST_PLUS_AVERAGE:
+        price = models.F('avg_cost_price') * factor
+    elif method == PriceUpdate.Method.COST_PLUS_SUPPLIER:
+        supplier_cost = SupplierProduct.objects.filter(
+            tenant=tenant,
+            product=models.OuterRef('pk'),
+            cost_price__gt=0
+        ).order_by('cost_price').values('cost_price')[:1]
+        price = models.Subquery(supplier_cost, output_field=PRICE_FIELD) * factor
+    else:
+        raise PricingError("Invalid repricing method: {}".format(method))
+
+    if rounding == PriceUpdate.Rounding.NONE:
+        rounded = Round(price, 2)
+    elif rounding == PriceUpdate.Rounding.INTEGER:
+        rounded = Round(price, 0)
+    elif rounding in ROUNDING_ENDINGS:
+        ending = models.Value(ROUNDING_ENDINGS[rounding], output_field=PRICE_FIELD)
+        rounded = Ceil(Round(price - ending, 2)) + ending
+    else:
+        raise PricingError("Invalid rounding strategy: {}".format(rounding))
+
+    return models.ExpressionWrapper(rounded, output_field=PRICE_FIELD)
+
+
+def preview_repricing(
+    *,
+    tenant: Tenant,
+    method: str,
+    value: Decimal,
+    rounding: str = PriceUpdate.Rounding.NONE,
+    brand: ProductBrand = None,
+    category: ProductCategory = None
+) -> models.QuerySet:
+    """
+    Return the products whose price a repricing rule would change, annotated
+    with the resulting price as `new_price`. Nothing is written, so this is
+    the dry run of reprice_products.
+
+    Args:
+        tenant (Tenant): The tenant whose products are repriced.
+        method (str): One of PriceUpdate.Method.
+        value (Decimal): Percentage (or fixed amount for FIXED_AMOUNT) applied by the rule.
+        rounding (str, optional): One of PriceUpdate.Rounding. Defaults to NONE.
+        brand (ProductBrand, optional): Restrict the rule to a brand. Defaults to None.
+        category (ProductCategory, optional): Restrict the rule to a category. Defaults to None.
+
+    Returns:
+        QuerySet: Products annotated with `new_price`, excluding unchanged and non-positive prices.
+    """
+    products = Product.objects.live().filter(tenant=tenant)
+    if brand is not None:
+        products = products.filter(brand=brand)
+    if category is not None:
+        products = products.filter(category=category)
+
+    new_price = _new_price_expression(tenant=tenant, method=method, value=value, rounding=rounding)
+    return products.annotate(new_price=new_price).filter(new_price__gt=0).exclude(new_price=models.F('price'))
+
+
+@transaction.atomic
+def reprice_products(
+    *,
+    tenant: Tenant,
+    user: User,
+    method: str,
+    value: Decimal,
+    rounding: str = PriceUpdate.Rounding.NONE,
+    brand: ProductBrand = None,
+    category: ProductCategory = None,
+    notes: str = None,
+    batch_size: int = 5000
+) -> PriceUpdate:
+    """
+    Apply a repricing rule to a tenant's products with set-based statements.
+
+    New prices are computed by the database, streamed into the price history
+    in batches and then written back with a single UPDATE reading from that
+    history, so the recorded and applied prices always agree.
+
+    Args:
+        tenant (Tenant): The tenant whose products are repriced.
+        user (User): The user applying the rule.
+        method (str): One of PriceUpdate.Method.
+        value (Decimal): Percentage (or fixed amount for FIXED_AMOUNT) applied by the rule.
+        rounding (str, optional): One of PriceUpdate.Rounding. Defaults to NONE.
+        brand (ProductBrand, optional): Restrict the rule to a brand. Defaults to None.
+        category (ProductCategory, optional): Restrict the rule to a category. Defaults to None.
+        notes (str, optional): Additional notes for the price update. Defaults to None.
+        batch_size (int, optional): Number of history rows inserted per statement. Defaults to 5000.
+
+    Returns:
+        PriceUpdate: The recorded price update, with its product count.
+    """
+    changes = preview_repricing(
+        tenant=tenant,
+        method=method,
+        value=value,
+        rounding=rounding,
+        brand=brand,
+        category=category
+    )
+
+    price_update = PriceUpdate.objects.create(
+        tenant=tenant,
+        method=method,
+        value=value,
+        rounding=rounding,
+        brand=brand,
+        category=category,
+        notes=notes,
+        user=user
+    )
+
+    product_count = 0
+    batch = []
+    for product_id, old_price, new_price in changes.values_list('id', 'price', 'new_price').iterator(chunk_size=batch_size):
+        batch.append(PriceUpdateItem(
+            price_update=price_update,
+            product_id=product_id,
+            old_price=old_price,
+            new_price=Decimal(new_price).quantize(Decimal('0.01'))
+        ))
+        if len(batch) == batch_size:
+            PriceUpdateItem.objects.bulk_create(batch)
+            product_count += len(batch)
+            batch = []
+    if batch:
+        PriceUpdateItem.objects.bulk_create(batch)
+        product_count += len(batch)
+
+    history = PriceUpdateItem.objects.filter(price_update=price_update, product=models.OuterRef('pk'))
+    Product.objects.filter(
+        id__in=PriceUpdateItem.objects.filter(price_update=price_update).values('product_id')
+    ).update(price=models.Subquery(history.values('new_price')[:1]))
+
+    price_update.product_count = product_count
+    price_update.save(update_fields=['product_count'])
+    return price_update
+
+
+PRODUCT_TRANSFER_FIELDS = [
+    'sku', 'name', 'description', 'parent_sku', 'category', 'brand', 'unit_of_measure',
+    'price', 'minimum_stock_quantity', 'is_active', 'attributes',
+]
+
+# Product fields written by each import column when updating an existing
+# product; columns missing from a row leave their fields untouched. The
+# average cost follows the stock movements and is neither imported nor
+# exported.
+PRODUCT_IMPORT_COLUMNS = {
+    'name': ['name'],
+    'description': ['description'],
+    'parent_sku': ['parent', 'is_variant'],
+    'category': ['category'],
+    'brand': ['brand'],
+    'unit_of_measure': ['unit_of_measure'],
+    'price': ['price'],
+    'minimum_stock_quantity': ['minimum_stock_quantity'],
+    'is_active': ['is_active'],
+}
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_product_attributes(value: str) -> Dict[str, str]:
+    """
+    Parse the flat "Name=Value|Name=Value" attribute notation used in CSV files.
+    """
+    attributes = {}
+    for pair in (value or '').split('|'):
+        if '=' in pair:
+            name, attribute_value = pair.split('=', 1)
+            attributes[name.strip()] = attribute_value.strip()
+    return attributes
+
+
+def format_product_attributes(attributes: Dict[str, str]) -> str:
+    """
+    Format attributes in the flat "Name=Value|Name=Value" notation used in CSV files.
+    """
+    return '|'.join('{}={}'.format(name, value) for name, value in sorted(attributes.items()))
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 't', 'yes', 'sim', 's')
+    return bool(value)
+
+
+def _to_decimal(value: Any, *, column: str, row_number: int) -> Decimal:
+    try:
+        number = Decimal(str(value or 0))
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ProductImportError("Row {}: invalid {} {!r}.".format(row_number, column, value))
+    return number
+
+
+def _resolve_named(model, *, tenant: Tenant, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Get or create, in batch, the tenant-scoped rows of a model identified by `name`.
+
+    Returns:
+        Dict[str, int]: Mapping of name to primary key.
+    """
+    names = {name for name in names if name}
+    if not names:
+        return {}
+    resolved = dict(model.objects.filter(tenant=tenant, name__in=names).values_list('name', 'id'))
+    missing = names - resolved.keys()
+    if missing:
+        model.objects.bulk_create([model(tenant=tenant, name=name) for name in missing], ignore_conflicts=True)
+        resolved.update(model.objects.filter(tenant=tenant, name__in=missing).values_list('name', 'id'))
+    return resolved
+
+
+def _resolve_attribute_values(*, tenant: Tenant, pairs: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    """
+    Get or create, in batch, the attribute values for (attribute name, value) pairs.
+
+    Returns:
+        Dict[Tuple[str, str], int]: Mapping of (attribute name, value) to AttributeValue id.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    attribute_ids = _resolve_named(Attribute, tenant=tenant, names={name for name, _ in pairs})
+    attribute_names = {attribute_id: name for name, attribute_id in attribute_ids.items()}
+
+    def fetch(wanted):
+        rows = AttributeValue.objects.filter(
+            tenant=tenant,
+            attribute_id__in={attribute_ids[name] for name, _ in wanted},
+            value__in={value for _, value in wanted}
+        ).values_list('attribute_id', 'value', 'id')
+        found = {(attribute_names[attribute_id], value): value_id for attribute_id, value, value_id in rows}
+        return {pair: value_id for pair, value_id in found.items() if pair in wanted}
+
+    resolved = fetch(pairs)
+    missing = pairs - resolved.keys()
+    if missing:
+        AttributeValue.objects.bulk_create(
+            [AttributeValue(tenant=tenant, attribute_id=attribute_ids[name], value=value) for name, value in missing],
+            ignore_conflicts=True
+        )
+        resolved.update(fetch(missing))
+    return resolved
+
+
+@transaction.atomic
+def _import_product_batch(*, tenant: Tenant, rows: List[Dict[str, Any]], first_row: int = 1) -> Dict[str, Any]:
+    """
+    Create or update one batch of products with a constant number of queries.
+
+    Existing products only get the fields of the columns present in their
+    row (see PRODUCT_IMPORT_COLUMNS). A SKU repeated within the batch is
+    reported as an error on the repeated rows, which are skipped. Attribute
+    values are replaced without their per-row facet signals and the tenant's
+    facet index is invalidated once for the whole batch.
+    """
+    errors = {}
+    seen_skus = set()
+    unique_rows = []
+    for number, row in enumerate(rows, first_row):
+        if not row.get('sku') or not row.get('name'):
+            raise ProductImportError("Every product needs a SKU and a name: {}".format(row))
+        if row['sku'] in seen_skus:
+            errors[number] = "Duplicate SKU {} in the same batch.".format(row['sku'])
+            continue
+        seen_skus.add(row['sku'])
+        for column in ('price', 'minimum_stock_quantity'):
+            if column in row:
+                row[column] = _to_decimal(row[column], column=column, row_number=number)
+        if isinstance(row.get('attributes'), str):
+            row['attributes'] = parse_product_attributes(row['attributes'])
+        unique_rows.append(row)
+    rows = unique_rows
+
+    category_ids = _resolve_named(ProductCategory, tenant=tenant, names={row.get('category') for row in rows})
+    brand_ids = _resolve_named(ProductBrand, tenant=tenant, names={row.get('brand') for row in rows})
+    value_ids = _resolve_attribute_values(
+        tenant=tenant,
+        pairs={pair for row in rows for pair in (row.get('attributes') or {}).items()}
+    )
+
+    skus = {row['sku'] for row in rows} | {row['parent_sku'] for row in rows if row.get('parent_sku')}
+    existing = {}
+    for product_id, tenant_id, sku in Product.objects.filter(sku__in=skus).values_list('id', 'tenant_id', 'sku'):
+        if tenant_id != tenant.id:
+            raise ProductImportError("SKU {} already belongs to another tenant.".format(sku))
+        existing[sku] = product_id
+
+    stats = {'created': 0, 'updated': 0, 'errors': errors}
+    product_ids = {}
+    for has_parent in (False, True):
+        to_create, to_update = [], defaultdict(list)
+        for row in rows:
+            if bool(row.get('parent_sku')) != has_parent:
+                continue
+            parent_id = None
+            if has_parent:
+                parent_id = product_ids.get(row['parent_sku']) or existing.get(row['parent_sku'])
+                if parent_id is None:
+                    raise ProductImportError("Parent SKU {} not found for {}.".format(row['parent_sku'], row['sku']))
+
+            product = Product(
+                id=existing.get(row['sku']),
+                tenant=tenant,
+                sku=row['sku'],
+                name=row['name'],
+                description=row.get('description') or None,
+                parent_id=parent_id,
+                is_variant=parent_id is not None,
+                category_id=category_ids.get(row.get('category')),
+                brand_id=brand_ids.get(row.get('brand')),
+                unit_of_measure=row.get('unit_of_measure') or Product.UnitOfMeasure.UNIT,
+                price=row.get('price', Decimal('0')),
+                minimum_stock_quantity=row.get('minimum_stock_quantity', Decimal('0')),
+                is_active=_to_bool(row.get('is_active', True))
+            )
+            if product.id is None:
+                to_create.append(product)
+            else:
+                fields = tuple(field for column, fields in PRODUCT_IMPORT_COLUMNS.items() if column in row for field in fields)
+                to_update[fields].append(product)
+
+        Product.objects.bulk_create(to_create)
+        for fields, products in to_update.items():
+            Product.objects.bulk_update(products, fields)
+        updated = [product for products in to_update.values() for product in products]
+        stats['created'] += len(to_create)
+        stats['updated'] += len(updated)
+        product_ids.update((product.sku, product.id) for product in to_create + updated)
+
+    with_attributes = [row for row in rows if row.get('attributes') is not None]
+    if with_attributes:
+        replaced = ProductAttributeValue.objects.filter(product_id__in=[product_ids[row['sku']] for row in with_attributes])
+        replaced._raw_delete(replaced.db)
+        ProductAttributeValue.objects.bulk_create([
+            ProductAttributeValue(product_id=product_ids[row['sku']], attribute_value_id=value_ids[pair])
+            for row in with_attributes
+            for pair in row['attributes'].items()
+        ])
+
+    refresh_product_search_documents(product_ids=product_ids.values())
+    invalidate_product_facet_index(tenant.id)
+    return stats
+
+
+def import_products(*, tenant: Tenant, rows: Iterable[Dict[str, Any]], batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Import products from a stream of rows, creating or updating them by SKU.
+
+    Rows are consumed lazily in batches. Categories, brands, attributes and
+    attribute values referenced by name are resolved, or created, once per
+    batch, and each batch is written atomically with bulk statements. Variant
+    rows reference their parent through `parent_sku`, which must be imported
+    in the same or an earlier batch, or already exist. Existing products are
+    only updated on the columns present in their row.
+
+    Args:
+        tenant (Tenant): The tenant receiving the products.
+        rows (Iterable[Dict[str, Any]]): Product rows keyed by PRODUCT_TRANSFER_FIELDS.
+            `attributes` is a {name: value} mapping or its "Name=Value|..." notation.
+        batch_size (int, optional): Number of rows written per batch. Defaults to 1000.
+
+    Returns:
+        Dict[str, Any]: Number of products 'created' and 'updated', and 'errors', a mapping of
+            row number (from 1) to the error message of the rows skipped.
+    """
+    stats = {'created': 0, 'updated': 0, 'errors': {}}
+    first_row = 1
+    for batch in _chunks(rows, batch_size):
+        batch_stats = _import_product_batch(tenant=tenant, rows=batch, first_row=first_row)
+        stats['created'] += batch_stats['created']
+        stats['updated'] += batch_stats['updated']
+        stats['errors'].update(batch_stats['errors'])
+        first_row += len(batch)
+    return stats
+
+
+def iter_product_export_rows(*, tenant: Tenant, chunk_size: int = 2000) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the tenant's live products as export rows, in constant memory.
+
+    Products are streamed from a server-side cursor and their attributes are
+    fetched with one query per chunk.
+    """
+    columns = [
+        'id', 'sku', 'name', 'description', 'parent__sku', 'category__name', 'brand__name', 'unit_of_measure',
+        'price', 'minimum_stock_quantity', 'is_active',
+    ]
+    products = Product.objects.live().filter(tenant=tenant).order_by('id').values_list(*columns)
+
+    for chunk in _chunks(products.iterator(chunk_size=chunk_size), chunk_size):
+        attributes = {}
+        attribute_rows = ProductAttributeValue.objects.filter(
+            product_id__in=[row[0] for row in chunk]
+        ).values_list('product_id', 'attribute_value__attribute__name', 'attribute_value__value')
+        for product_id, name, value in attribute_rows:
+            attributes.setdefault(product_id, {})[name] = value
+
+        for product_id, *values in chunk:
+            row = dict(zip(PRODUCT_TRANSFER_FIELDS, values))
+            row['attributes'] = attributes.get(product_id, {})
+            yield row
+
+
+def export_products(*, tenant: Tenant, stream: TextIO, file_format: str = 'csv', chunk_size: int = 2000) -> int:
+    """
+    Write the tenant's live products to a text stream as CSV or JSON Lines.
+
+    Args:
+        tenant (Tenant): The tenant whose catalog is exported.
+        stream (TextIO): Destination stream.
+        file_format (str, optional): 'csv' or 'jsonl'. Defaults to 'csv'.
+        chunk_size (int, optional): Number of products fetched per round trip. Defaults to 2000.
+
+    Returns:
+        int: The number of products written.
+    """
+    if file_format not in ('csv', 'jsonl'):
+        raise ProductImportError("Unsupported export format: {}".format(file_format))
+
+    writer = None
+    if file_format == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=PRODUCT_TRANSFER_FIELDS)
+        writer.writeheader()
+
+    written = 0
+    for row in iter_product_export_rows(tenant=tenant, chunk_size=chunk_size):
+        if writer is not None:
+            row['attributes'] = format_product_attributes(row['attributes'])
+            writer.writerow(row)
+        else:
+            stream.write(json.dumps(row, default=str, ensure_ascii=False) + '\n')
+        written += 1
+    return written
@@ -0,0 +1,63 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import (Product, ProductAttributeValue, ProductBrand,
+                     ProductCategory, ProductSearchDocument)
+from .services import (schedule_product_facets_refresh,
+                       schedule_product_search_refresh)
+
+FACET_RELEVANT_FIELDS = {'tenant', 'is_active', 'deleted_at'}
+SEARCH_RELEVANT_FIELDS = {'tenant', 'name', 'sku', 'description', 'brand', 'category', 'deleted_at'}
+
+
+@receiver(post_save, sender=ProductAttributeValue)
+@receiver(post_delete, sender=ProductAttributeValue)
+def refresh_facets_on_attribute_value_change(sender, instance, **kwargs):
+    schedule_product_facets_refresh(product_id=instance.product_id)
+
+
+@receiver(post_save, sender=Product)
+def refresh_facets_on_product_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not FACET_RELEVANT_FIELDS.intersection(update_fields):
+        return
+    schedule_product_facets_refresh(product_id=instance.id, tenant_id=instance.tenant_id)
+
+
+@receiver(post_delete, sender=Product)
+def refresh_facets_on_product_delete(sender, instance, **kwargs):
+    schedule_product_facets_refresh(product_id=instance.id, tenant_id=instance.tenant_id)
+
+
+@receiver(post_save, sender=Product)
+def refresh_search_document_on_product_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_RELEVANT_FIELDS.intersection(update_fields):
+        return
+    schedule_product_search_refresh([instance.id])
+
+
+@receiver(post_save, sender=ProductBrand)
+def refresh_search_documents_on_brand_change(sender, instance, created=False, **kwargs):
+    if not created:
+        schedule_product_search_refresh(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=ProductCategory)
+def refresh_search_documents_on_category_change(sender, instance, created=False, **kwargs):
+    if not created:
+        schedule_product_search_refresh(instance.products.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=ProductBrand)
+def refresh_search_documents_on_brand_delete(sender, instance, **kwargs):
+    schedule_product_search_refresh(
+        ProductSearchDocument.objects.filter(tenant_id=instance.tenant_id, brand=instance.name)
+        .values_list('product_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=ProductCategory)
+def refresh_search_documents_on_category_delete(sender, instance, **kwargs):
+    schedule_product_search_refresh(
+        ProductSearchDocument.objects.filter(tenant_id=instance.tenant_id, category=instance.name)
+        .values_list('product_id', flat=True)
+    )
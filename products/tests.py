@@ -0,0 +1,351 @@
+import csv
+import io
+from decimal import Decimal
+
+import pytest
+
+from products.models import (Attribute, AttributeValue, PriceUpdate, Product,
+                             ProductAttributeValue, ProductBrand,
+                             ProductCategory, ProductSearchDocument)
+from products.services import (ProductImportError, export_products,
+                               filter_products_by_search,
+                               get_product_facet_counts,
+                               get_product_facet_index, import_products,
+                               invalidate_product_facet_index,
+                               preview_repricing, reprice_products,
+                               search_products, search_products_by_facets)
+from suppliers.models import Supplier, SupplierProduct
+from tenants.models import CacheStamp, Tenant
+from tenants.stamps import bump_cache_stamp
+from users.models import User
+
+
+@pytest.fixture
+def tenant(db):
+    tenant = Tenant.objects.create(name="Tenant Test")
+    yield tenant
+    invalidate_product_facet_index(tenant.id)
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(email="user@test.com", password="123456", name="User Test")
+
+
+@pytest.fixture
+def color(db, tenant):
+    return Attribute.objects.create(tenant=tenant, name="Color")
+
+
+@pytest.fixture
+def size(db, tenant):
+    return Attribute.objects.create(tenant=tenant, name="Size")
+
+
+@pytest.fixture
+def values(db, tenant, color, size):
+    return {
+        name: AttributeValue.objects.create(tenant=tenant, attribute=attribute, value=name)
+        for attribute, name in [(color, "Red"), (color, "Blue"), (size, "M"), (size, "L")]
+    }
+
+
+def create_product(tenant, sku, *attribute_values):
+    product = Product.objects.create(tenant=tenant, name=sku, sku=sku, price=Decimal("10.00"))
+    for attribute_value in attribute_values:
+        ProductAttributeValue.objects.create(product=product, attribute_value=attribute_value)
+    return product
+
+
+def test_search_products_by_facets_intersects_attributes(tenant, color, size, values):
+    red_m = create_product(tenant, "RED-M", values["Red"], values["M"])
+    red_l = create_product(tenant, "RED-L", values["Red"], values["L"])
+    blue_m = create_product(tenant, "BLUE-M", values["Blue"], values["M"])
+
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Red"].id]}) == [red_m.id, red_l.id]
+    assert search_products_by_facets(
+        tenant=tenant,
+        facets={color.id: [values["Red"].id, values["Blue"].id], size.id: [values["M"].id]}
+    ) == [red_m.id, blue_m.id]
+    assert search_products_by_facets(tenant=tenant, facets={}) == [red_m.id, red_l.id, blue_m.id]
+
+
+def test_get_product_facet_counts_ignores_own_attribute_selection(tenant, color, size, values):
+    create_product(tenant, "RED-M", values["Red"], values["M"])
+    create_product(tenant, "RED-L", values["Red"], values["L"])
+    create_product(tenant, "BLUE-M", values["Blue"], values["M"])
+
+    counts = get_product_facet_counts(tenant=tenant, facets={color.id: [values["Red"].id]})
+
+    assert counts[color.id] == {values["Red"].id: 2, values["Blue"].id: 1}
+    assert counts[size.id] == {values["M"].id: 1, values["L"].id: 1}
+
+
+def test_facet_index_is_refreshed_on_attribute_value_changes(
+    tenant, color, values, django_capture_on_commit_callbacks
+):
+    red = create_product(tenant, "RED-M", values["Red"])
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Red"].id]}) == [red.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        blue = create_product(tenant, "BLUE-M", values["Blue"])
+        ProductAttributeValue.objects.filter(product=red).delete()
+
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Red"].id]}) == []
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Blue"].id]}) == [blue.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        blue.soft_delete()
+
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Blue"].id]}) == []
+    assert values["Red"].id not in get_product_facet_index(tenant)._value_attributes
+
+
+def test_facet_index_is_rebuilt_after_changes_made_by_another_process(
+    tenant, color, values, django_capture_on_commit_callbacks
+):
+    red = create_product(tenant, "RED-M", values["Red"])
+    index = get_product_facet_index(tenant)
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Blue"].id]}) == []
+
+    # Another process tags the product: no signal reaches this process's
+    # index, only the bumped facet stamp of the tenant.
+    with django_capture_on_commit_callbacks(execute=True):
+        ProductAttributeValue.objects.bulk_create([ProductAttributeValue(product=red, attribute_value=values["Blue"])])
+        bump_cache_stamp("product_facets:{}".format(tenant.id))
+
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Blue"].id]}) == [red.id]
+    assert get_product_facet_index(tenant) is not index
+
+
+def test_facet_stamp_is_bumped_on_commit_and_only_once_an_index_exists(
+    tenant, color, values, django_capture_on_commit_callbacks
+):
+    key = "product_facets:{}".format(tenant.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        red = create_product(tenant, "RED-M", values["Red"])
+    assert not CacheStamp.objects.filter(key=key).exists()
+
+    index = get_product_facet_index(tenant)
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        ProductAttributeValue.objects.create(product=red, attribute_value=values["M"])
+    assert CacheStamp.objects.get(key=key).stamp == 0
+
+    for callback in callbacks:
+        callback()
+    assert CacheStamp.objects.get(key=key).stamp == 1
+    assert get_product_facet_index(tenant) is index
+    assert search_products_by_facets(tenant=tenant, facets={color.id: [values["Red"].id]}) == [red.id]
+
+
+def test_search_products_matches_prefixes_and_ranks_name_first(tenant, django_capture_on_commit_callbacks):
+    brand = ProductBrand.objects.create(tenant=tenant, name="Parafusos Brasil")
+    with django_capture_on_commit_callbacks(execute=True):
+        by_description = Product.objects.create(
+            tenant=tenant, name="Bucha", sku="BU-01", description="Acompanha parafuso sextavado"
+        )
+        by_name = Product.objects.create(tenant=tenant, name="Parafuso sextavado", sku="PA-01", brand=brand)
+        by_sku = Product.objects.create(tenant=tenant, name="Arruela", sku="AR-01")
+
+    assert search_products(tenant=tenant, query="paraf sext") == [by_name.id, by_description.id]
+    assert search_products(tenant=tenant, query="AR-01") == [by_sku.id]
+    assert search_products(tenant=tenant, query="") == []
+    assert search_products(tenant=Tenant.objects.create(name="Other"), query="paraf") == []
+
+
+def test_search_documents_follow_brand_changes_and_soft_delete(tenant, django_capture_on_commit_callbacks):
+    brand = ProductBrand.objects.create(tenant=tenant, name="Acme")
+    with django_capture_on_commit_callbacks(execute=True):
+        product = Product.objects.create(tenant=tenant, name="Martelo", sku="MA-01", brand=brand)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        brand.name = "Vulcano"
+        brand.save()
+
+    assert search_products(tenant=tenant, query="vulcano") == [product.id]
+    assert search_products(tenant=tenant, query="acme") == []
+    assert list(filter_products_by_search(Product.objects.all(), "vulc")) == [product]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        product.soft_delete()
+
+    assert not ProductSearchDocument.objects.filter(product=product).exists()
+    assert search_products(tenant=tenant, query="martelo") == []
+
+
+def test_bulk_soft_delete_and_restore_refresh_search_and_facets(
+    tenant, color, values, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        red = create_product(tenant, "RED-M", values["Red"])
+        blue = create_product(tenant, "BLUE-M", values["Blue"])
+    facets = {color.id: [values["Red"].id, values["Blue"].id]}
+    assert search_products_by_facets(tenant=tenant, facets=facets) == [red.id, blue.id]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert Product.objects.filter(tenant=tenant).soft_delete() == 2
+
+    assert search_products(tenant=tenant, query="RED-M") == []
+    assert search_products_by_facets(tenant=tenant, facets=facets) == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        assert Product.objects.filter(pk=red.pk).restore() == 1
+
+    assert search_products(tenant=tenant, query="RED-M") == [red.id]
+    assert search_products_by_facets(tenant=tenant, facets=facets) == [red.id]
+
+
+def test_reprice_products_percentage_with_rounding_and_filters(tenant, user):
+    brand = ProductBrand.objects.create(tenant=tenant, name="Acme")
+    category = ProductCategory.objects.create(tenant=tenant, name="Ferramentas")
+    repriced = Product.objects.create(tenant=tenant, name="Martelo", brand=brand, category=category, price=Decimal("20.00"))
+    other_brand = Product.objects.create(tenant=tenant, name="Serrote", category=category, price=Decimal("20.00"))
+
+    preview = preview_repricing(
+        tenant=tenant,
+        method=PriceUpdate.Method.PERCENTAGE,
+        value=Decimal("8"),
+        rounding=PriceUpdate.Rounding.ENDING_90,
+        brand=brand,
+        category=category
+    )
+    assert [(product.id, product.new_price) for product in preview] == [(repriced.id, Decimal("21.90"))]
+
+    price_update = reprice_products(
+        tenant=tenant,
+        user=user,
+        method=PriceUpdate.Method.PERCENTAGE,
+        value=Decimal("8"),
+        rounding=PriceUpdate.Rounding.ENDING_90,
+        brand=brand,
+        category=category
+    )
+
+    repriced.refresh_from_db()
+    other_brand.refresh_from_db()
+    assert repriced.price == Decimal("21.90")
+    assert other_brand.price == Decimal("20.00")
+    assert price_update.product_count == 1
+    history = price_update.items.get()
+    assert (history.product, history.old_price, history.new_price) == (repriced, Decimal("20.00"), Decimal("21.90"))
+
+
+def test_reprice_products_cost_plus_uses_cheapest_supplier_cost(tenant, user):
+    product = Product.objects.create(tenant=tenant, name="Parafuso", price=Decimal("1.00"))
+    without_cost = Product.objects.create(tenant=tenant, name="Porca", price=Decimal("1.00"))
+    for name, cost in [("Fornecedor A", "4.00"), ("Fornecedor B", "3.00")]:
+        supplier = Supplier.objects.create(tenant=tenant, name=name)
+        SupplierProduct.objects.create(tenant=tenant, supplier=supplier, product=product, cost_price=Decimal(cost))
+
+    reprice_products(
+        tenant=tenant,
+        user=user,
+        method=PriceUpdate.Method.COST_PLUS_SUPPLIER,
+        value=Decimal("50"),
+        rounding=PriceUpdate.Rounding.INTEGER
+    )
+
+    product.refresh_from_db()
+    without_cost.refresh_from_db()
+    assert product.price == Decimal("5.00")
+    assert without_cost.price == Decimal("1.00")
+
+
+def test_import_products_resolves_references_and_updates_by_sku(tenant):
+    ProductCategory.objects.create(tenant=tenant, name="Camisetas")
+    rows = [
+        {"sku": "TS-M", "name": "Camiseta M", "parent_sku": "TS", "attributes": "Cor=Azul|Tamanho=M", "price": "39.90"},
+        {"sku": "TS", "name": "Camiseta", "category": "Camisetas", "brand": "Acme", "price": "39.90"},
+        {"sku": "TS-G", "name": "Camiseta G", "parent_sku": "TS", "attributes": {"Cor": "Azul", "Tamanho": "G"}},
+    ]
+
+    stats = import_products(tenant=tenant, rows=rows, batch_size=2)
+
+    assert stats == {"created": 3, "updated": 0, "errors": {}}
+    parent = Product.objects.get(sku="TS")
+    variant = Product.objects.get(sku="TS-M")
+    assert parent.category.name == "Camisetas" and parent.brand.name == "Acme"
+    assert variant.parent == parent and variant.is_variant
+    assert variant.price == Decimal("39.90")
+    assert sorted(str(value) for value in variant.attributes.all()) == ["Cor: Azul", "Tamanho: M"]
+    assert AttributeValue.objects.filter(tenant=tenant, value="Azul").count() == 1
+
+    Product.objects.filter(pk=variant.pk).update(description="Algodão", avg_cost_price=Decimal("12.00"))
+    stats = import_products(tenant=tenant, rows=[
+        {"sku": "TS-M", "name": "Camiseta Média", "attributes": "Cor=Verde", "avg_cost_price": "1.00"},
+        {"sku": "TS-M", "name": "Camiseta Repetida"},
+    ])
+
+    assert stats == {"created": 0, "updated": 1, "errors": {2: "Duplicate SKU TS-M in the same batch."}}
+    variant.refresh_from_db()
+    assert variant.name == "Camiseta Média"
+    assert [str(value) for value in variant.attributes.all()] == ["Cor: Verde"]
+    assert variant.parent == parent and variant.is_variant
+    assert variant.price == Decimal("39.90")
+    assert variant.avg_cost_price == Decimal("12.00")
+    assert variant.description == "Algodão"
+    assert variant.unit_of_measure == Product.UnitOfMeasure.UNIT and variant.is_active
+
+    import_products(tenant=tenant, rows=[{"sku": "TS", "name": "Camiseta", "category": "", "price": "45.00"}])
+    parent.refresh_from_db()
+    assert parent.category is None and parent.brand.name == "Acme"
+    assert parent.price == Decimal("45.00")
+
+
+def test_import_products_rejects_sku_of_another_tenant(tenant):
+    other = Tenant.objects.create(name="Other")
+    Product.objects.create(tenant=other, name="Produto", sku="SKU-1")
+
+    with pytest.raises(ProductImportError):
+        import_products(tenant=tenant, rows=[{"sku": "SKU-1", "name": "Produto"}])
+
+
+def test_import_products_reports_invalid_numbers_with_their_row(tenant):
+    with pytest.raises(ProductImportError, match="Row 2: invalid price '9,90'"):
+        import_products(tenant=tenant, rows=[
+            {"sku": "SKU-1", "name": "Produto", "price": "9.90"},
+            {"sku": "SKU-2", "name": "Produto", "price": "9,90"},
+        ])
+    assert not Product.objects.filter(tenant=tenant).exists()
+
+
+def test_import_products_replaces_attributes_with_constant_queries(
+    tenant, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    rows = [{"sku": "SKU-{}".format(number), "name": "Produto", "attributes": "Cor=Azul|Tamanho=M"} for number in range(50)]
+    import_products(tenant=tenant, rows=rows)
+    get_product_facet_index(tenant)
+
+    with django_assert_max_num_queries(13):
+        with django_capture_on_commit_callbacks(execute=True):
+            stats = import_products(tenant=tenant, rows=[dict(row, attributes="Cor=Verde") for row in rows])
+
+    assert stats == {"created": 0, "updated": 50, "errors": {}}
+    green = AttributeValue.objects.get(tenant=tenant, value="Verde")
+    assert len(search_products_by_facets(tenant=tenant, facets={green.attribute_id: [green.id]})) == 50
+
+
+def test_export_products_round_trips_through_import(tenant):
+    import_products(tenant=tenant, rows=[
+        {"sku": "TS", "name": "Camiseta", "brand": "Acme", "price": "39.90"},
+        {"sku": "TS-M", "name": "Camiseta M", "parent_sku": "TS", "attributes": "Cor=Azul|Tamanho=M"},
+    ])
+    Product.objects.create(tenant=tenant, name="Removido", sku="OLD").soft_delete()
+
+    csv_stream = io.StringIO()
+    assert export_products(tenant=tenant, stream=csv_stream, chunk_size=1) == 2
+    jsonl_stream = io.StringIO()
+    assert export_products(tenant=tenant, stream=jsonl_stream, file_format="jsonl") == 2
+
+    lines = csv_stream.getvalue().splitlines()
+    assert lines[0].startswith("sku,name,description,parent_sku")
+    assert "avg_cost_price" not in lines[0]
+    assert "Cor=Azul|Tamanho=M" in lines[2]
+    assert '"parent_sku": "TS"' in jsonl_stream.getvalue().splitlines()[1]
+
+    other = Tenant.objects.create(name="Other")
+    csv_stream.seek(0)
+    Product.objects.filter(tenant=tenant).delete()
+    stats = import_products(tenant=other, rows=csv.DictReader(csv_stream))
+    assert stats == {"created": 2, "updated": 0, "errors": {}}
+    assert Product.objects.get(sku="TS-M").attributes.count() == 2
@@ -7,7 +7,8 @@ class PurchaseOrderItemInline(admin.TabularInline):
     model = PurchaseOrderItem
     extra = 1
     autocomplete_fields = ['product']
-    fields = ('product', 'quantity', 'unit_price')
+    fields = ('product', 'quantity', 'unit_price', 'received_quantity')
+    readonly_fields = ('received_quantity',)
 
 
 @admin.register(PurchaseOrderStatus)
@@ -15,6 +16,7 @@ class PurchaseOrderStatusAdmin(admin.ModelAdmin):
     list_display = ('name', 'sequence_order', 'tenant')
     list_filter = ('tenant',)
     search_fields = ('name',)
+    filter_horizontal = ('next_statuses',)
 
 
 @admin.register(PurchaseOrder)
@@ -30,7 +32,7 @@ class PurchaseOrderAdmin(admin.ModelAdmin):
             'fields': ('tenant', 'supplier', 'status')
         }),
         ('Datas e Valores', {
-            'fields': ('expected_delivery_date', 'total_amount')
+            'fields': ('expected_delivery_date', 'freight_amount', 'taxes_amount', 'total_amount')
         }),
         ('Observações', {
             'fields': ('notes',)
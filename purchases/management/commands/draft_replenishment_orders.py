@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from purchases.services import (REPLENISHMENT_STRATEGIES,
+                                draft_replenishment_orders)
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Draft purchase orders for the products below their reorder point.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only replenish this tenant id.')
+        parser.add_argument('--strategy', choices=sorted(REPLENISHMENT_STRATEGIES), default='cheapest')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            purchase_orders = draft_replenishment_orders(tenant=tenant, strategy=options['strategy'])
+            self.stdout.write('{}: {} purchase orders drafted in {:.1f}s.'.format(tenant, len(purchase_orders), time.monotonic() - started))
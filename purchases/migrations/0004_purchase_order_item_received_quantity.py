@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0003_status_next_statuses'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorderitem',
+            name='received_quantity',
+            field=models.DecimalField(decimal_places=3, default=0, max_digits=10),
+        ),
+    ]
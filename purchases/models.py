@@ -1,8 +1,10 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from products.models import Product
 from suppliers.models import Supplier
+from tenants.managers import SoftDeleteQuerySet
 from tenants.models import Tenant
 
 
@@ -12,6 +14,7 @@ class PurchaseOrderStatus(models.Model):
     label = models.CharField(max_length=100)
     sequence_order = models.PositiveIntegerField(default=0)
     color_code = models.CharField(max_length=7, blank=True, null=True)
+    next_statuses = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='previous_statuses')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -25,21 +28,41 @@ class PurchaseOrderStatus(models.Model):
         return self.name
 
 
+class PurchaseOrderQuerySet(SoftDeleteQuerySet):
+
+    def soft_delete_values(self) -> dict:
+        deleted_status = PurchaseOrderStatus.objects.filter(
+            models.Q(tenant=models.OuterRef('tenant')) | models.Q(tenant__isnull=True),
+            name__iexact='DELETED'
+        ).order_by(models.F('tenant').asc(nulls_last=True)).values('id')[:1]
+
+        values = super().soft_delete_values()
+        values['status'] = Coalesce(models.Subquery(deleted_status), models.F('status'), output_field=models.BigIntegerField())
+        return values
+
+
 class PurchaseOrder(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='purchase_orders')
     supplier = models.ForeignKey(Supplier, on_delete=models.PROTECT, related_name='purchase_orders')
     status = models.ForeignKey(PurchaseOrderStatus, on_delete=models.PROTECT, related_name='purchase_orders')
     expected_delivery_date = models.DateField(blank=True, null=True)
+    freight_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    taxes_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = PurchaseOrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Purchase Order'
         verbose_name_plural = 'Purchase Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], condition=models.Q(deleted_at__isnull=True), name='purchase_order_live_idx'),
+        ]
 
     def __str__(self):
         return f'Purchase Order #{self.id} - {self.supplier.name} ({self.status.name})'
@@ -63,6 +86,7 @@ class PurchaseOrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='purchase_order_items')
     quantity = models.DecimalField(max_digits=10, decimal_places=3, default=1)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    received_quantity = models.DecimalField(max_digits=10, decimal_places=3, default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
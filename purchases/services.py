@@ -0,0 +1,330 @@
+import threading
+from datetime import timedelta
+from decimal import ROUND_DOWN, Decimal
+from typing import Dict, Iterable, List
+
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Round, RowNumber
+from django.utils import timezone
+
+from products.models import Product
+from suppliers.models import SupplierProduct
+from tenants.models import Tenant
+from tenants.transitions import StatusTransitionTable, get_transition_table
+
+from .models import PurchaseOrder, PurchaseOrderItem, PurchaseOrderStatus
+
+# Statuses set only by the services that carry their side effects.
+SERVICE_MANAGED_STATUSES = {'DELETED'}
+# Orders in these statuses will not deliver anything more.
+CLOSED_PURCHASE_ORDER_STATUSES = ('DELETED', 'CANCELED', 'CANCELLED', 'CLOSED')
+
+
+QUANTITY_FIELD = models.DecimalField(max_digits=10, decimal_places=3)
+AMOUNT_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
+LANDED_COST_METHODS = ('value', 'weight', 'quantity')
+
+# How the supplier of a replenished product is chosen among its offers.
+REPLENISHMENT_STRATEGIES = {
+    'cheapest': ('cost_price', Coalesce('supplier__lead_time_days', 0), 'pk'),
+    'fastest': (Coalesce('supplier__lead_time_days', 0), 'cost_price', 'pk'),
+}
+
+
+class PurchaseOrderError(Exception):
+    """Custom exception for purchase order-related errors."""
+    pass
+
+
+def get_purchase_order_status(*, tenant: Tenant, name: str) -> PurchaseOrderStatus:
+    """
+    Return the status with the given name, preferring the tenant's own status
+    over a global one.
+
+    Raises:
+        PurchaseOrderError: If no such status is configured.
+    """
+    status = PurchaseOrderStatus.objects.filter(
+        models.Q(tenant=tenant) | models.Q(tenant__isnull=True),
+        name__iexact=name
+    ).order_by(models.F('tenant').asc(nulls_last=True)).first()
+    if status is None:
+        raise PurchaseOrderError("Purchase order status {} is not configured.".format(name))
+    return status
+
+
+def get_purchase_order_transitions(*, tenant: Tenant) -> StatusTransitionTable:
+    """
+    Return the compiled status transitions of a tenant's purchase orders.
+    """
+    return get_transition_table(PurchaseOrderStatus, tenant.id)
+
+
+@transaction.atomic
+def transition_purchase_orders(
+    *,
+    tenant: Tenant,
+    purchase_orders: models.QuerySet,
+    status: PurchaseOrderStatus
+) -> int:
+    """
+    Move many live purchase orders to a status at once.
+
+    Transitions are validated against the tenant's compiled transition table,
+    so the batch costs one locked read and one UPDATE whatever its size.
+    Orders already in the status are left untouched; if any other order
+    cannot make the transition, none is moved.
+
+    Args:
+        tenant (Tenant): The tenant associated with the purchase orders.
+        purchase_orders (QuerySet): The purchase orders to move.
+        status (PurchaseOrderStatus): The target status.
+
+    Returns:
+        int: The number of purchase orders moved.
+    """
+    if status.name.upper() in SERVICE_MANAGED_STATUSES:
+        raise PurchaseOrderError("Purchase orders are moved to status {} by their own service.".format(status.name))
+    transitions = get_purchase_order_transitions(tenant=tenant)
+    if not transitions.is_available(status.pk):
+        raise PurchaseOrderError("Purchase order status {} is not available to this tenant.".format(status.name))
+
+    rows = list(
+        PurchaseOrder.objects.select_for_update()
+        .filter(tenant=tenant, pk__in=purchase_orders.values('pk'), deleted_at__isnull=True)
+        .exclude(status=status)
+        .order_by('pk')
+        .values_list('pk', 'status_id')
+    )
+    invalid = transitions.invalid_sources(rows, status.pk)
+    if invalid:
+        raise PurchaseOrderError("Purchase orders {} cannot move to status {}.".format(', '.join('#{}'.format(pk) for pk in invalid), status.name))
+    if not rows:
+        return 0
+
+    return PurchaseOrder.objects.filter(pk__in=[pk for pk, _ in rows]).update(status=status, updated_at=timezone.now())
+
+
+def closed_purchase_orders_filter(prefix: str = '') -> models.Q:
+    """
+    Return a filter matching the purchase orders in one of the CLOSED_PURCHASE_ORDER_STATUSES.
+
+    Args:
+        prefix (str, optional): Lookup path to the purchase order, e.g. 'purchase_order__'. Defaults to ''.
+    """
+    closed = models.Q()
+    for name in CLOSED_PURCHASE_ORDER_STATUSES:
+        closed |= models.Q(**{prefix + 'status__name__iexact': name})
+    return closed
+
+
+def get_replenishment_candidates(*, tenant: Tenant) -> models.QuerySet:
+    """
+    Return the tenant's live products below their reorder point.
+
+    A product needs replenishment when its stock plus the quantity still
+    expected from open purchase orders (live and not in one of the
+    CLOSED_PURCHASE_ORDER_STATUSES) is below its minimum stock quantity.
+    The whole selection is a single query; each product is annotated with
+    `open_quantity` and `shortage`.
+    """
+    open_quantity = PurchaseOrderItem.objects.filter(
+        product=models.OuterRef('pk'),
+        purchase_order__deleted_at__isnull=True,
+        quantity__gt=models.F('received_quantity')
+    ).exclude(closed_purchase_orders_filter('purchase_order__')).order_by().values('product').annotate(
+        total=models.Sum(models.F('quantity') - models.F('received_quantity'))
+    ).values('total')
+
+    return Product.objects.live().filter(
+        tenant=tenant,
+        is_active=True,
+        is_composite=False,
+        minimum_stock_quantity__gt=0
+    ).annotate(
+        open_quantity=Coalesce(models.Subquery(open_quantity, output_field=QUANTITY_FIELD), Decimal('0'), output_field=QUANTITY_FIELD)
+    ).annotate(
+        shortage=models.ExpressionWrapper(models.F('minimum_stock_quantity') - models.F('stock_quantity') - models.F('open_quantity'), output_field=QUANTITY_FIELD)
+    ).filter(shortage__gt=0)
+
+
+@transaction.atomic
+def draft_replenishment_orders(
+    *,
+    tenant: Tenant,
+    status: PurchaseOrderStatus = None,
+    strategy: str = 'cheapest'
+) -> List[PurchaseOrder]:
+    """
+    Draft purchase orders for every product of a tenant below its reorder point.
+
+    Each product is ordered up to its minimum stock quantity from its best
+    supplier offer, the cheapest or the fastest according to the strategy,
+    and the lines are grouped into one purchase order per supplier dated by
+    the supplier's lead time. Candidates and their best offers are selected
+    with one query (a window function ranks the offers), and the orders and
+    their items are inserted with bulk_create. Drafted orders count as open
+    quantity, so running it again does not order the same shortage twice.
+    Products without any supplier offer are left out.
+
+    Args:
+        tenant (Tenant): The tenant being replenished.
+        status (PurchaseOrderStatus, optional): Status of the drafted orders. Defaults to the DRAFT status.
+        strategy (str, optional): 'cheapest' or 'fastest'. Defaults to 'cheapest'.
+
+    Returns:
+        List[PurchaseOrder]: The drafted purchase orders.
+    """
+    if strategy not in REPLENISHMENT_STRATEGIES:
+        raise PurchaseOrderError("Unknown replenishment strategy: {}".format(strategy))
+    if status is None:
+        status = get_purchase_order_status(tenant=tenant, name='DRAFT')
+
+    candidates = get_replenishment_candidates(tenant=tenant)
+    offers = SupplierProduct.objects.filter(
+        tenant=tenant,
+        supplier__deleted_at__isnull=True,
+        supplier__is_active=True,
+        product__in=candidates.values('pk')
+    ).annotate(
+        rank=models.Window(RowNumber(), partition_by=[models.F('product_id')], order_by=list(REPLENISHMENT_STRATEGIES[strategy]))
+    ).filter(rank=1)
+
+    shortages = dict(candidates.values_list('pk', 'shortage'))
+    lines_by_supplier: Dict[int, list] = {}
+    lead_times: Dict[int, int] = {}
+    for supplier_id, product_id, cost_price, lead_time_days in offers.values_list('supplier_id', 'product_id', 'cost_price', 'supplier__lead_time_days'):
+        if product_id in shortages:
+            lines_by_supplier.setdefault(supplier_id, []).append((product_id, shortages[product_id], cost_price))
+            lead_times[supplier_id] = lead_time_days or 0
+    if not lines_by_supplier:
+        return []
+
+    today = timezone.localdate()
+    purchase_orders = PurchaseOrder.objects.bulk_create([
+        PurchaseOrder(
+            tenant=tenant,
+            supplier_id=supplier_id,
+            status=status,
+            expected_delivery_date=today + timedelta(days=lead_times[supplier_id]),
+            total_amount=sum((quantity * cost_price for _, quantity, cost_price in lines), Decimal('0')).quantize(Decimal('0.01')),
+            notes='Pedido gerado automaticamente pela reposição de estoque'
+        )
+        for supplier_id, lines in lines_by_supplier.items()
+    ])
+    PurchaseOrderItem.objects.bulk_create([
+        PurchaseOrderItem(purchase_order=purchase_order, product_id=product_id, quantity=quantity, unit_price=cost_price)
+        for purchase_order, lines in zip(purchase_orders, lines_by_supplier.values())
+        for product_id, quantity, cost_price in lines
+    ], batch_size=1000)
+
+    # Bulk inserts skip the signals that keep the supply projections fresh.
+    # Imported here: inventory.services depends on this module.
+    from inventory.services import schedule_supply_projections_invalidation
+    schedule_supply_projections_invalidation(tenant.id, [product_id for lines in lines_by_supplier.values() for product_id, _, _ in lines])
+    return purchase_orders
+
+
+def recalculate_purchase_order_totals(*, purchase_orders: Iterable) -> int:
+    """
+    Recompute the total amount of purchase orders from their items with one UPDATE.
+
+    The total is the sum of the lines (quantity times unit price, each
+    rounded to cents) plus the order's freight and taxes.
+
+    Args:
+        purchase_orders (Iterable): The purchase orders, as a queryset, instances or primary keys.
+
+    Returns:
+        int: The number of purchase orders updated.
+    """
+    if not isinstance(purchase_orders, models.QuerySet):
+        purchase_orders = PurchaseOrder.objects.filter(pk__in=[getattr(order, 'pk', order) for order in purchase_orders])
+
+    items_total = PurchaseOrderItem.objects.filter(
+        purchase_order=models.OuterRef('pk')
+    ).order_by().values('purchase_order').annotate(
+        total=models.Sum(Round(models.F('quantity') * Coalesce(models.F('unit_price'), Decimal('0.00')), 2))
+    ).values('total')
+
+    return PurchaseOrder.objects.filter(pk__in=purchase_orders.values('pk')).update(
+        total_amount=Coalesce(models.Subquery(items_total, output_field=AMOUNT_FIELD), Decimal('0.00'), output_field=AMOUNT_FIELD) + models.F('freight_amount') + models.F('taxes_amount'),
+        updated_at=timezone.now()
+    )
+
+
+_pending_totals = threading.local()
+
+
+def _recalculate_pending_purchase_order_totals() -> None:
+    pending = getattr(_pending_totals, 'ids', None)
+    if pending:
+        _pending_totals.ids = set()
+        recalculate_purchase_order_totals(purchase_orders=pending)
+
+
+def schedule_purchase_order_totals_recalculation(purchase_order_ids: Iterable[int]) -> None:
+    """
+    Recalculate the totals of purchase orders once the current transaction commits.
+
+    The orders changed within a transaction are collected and recalculated
+    together with one UPDATE, however many of their lines were saved.
+    """
+    pending = getattr(_pending_totals, 'ids', None)
+    if pending is None:
+        pending = _pending_totals.ids = set()
+    pending.update(purchase_order_ids)
+    transaction.on_commit(_recalculate_pending_purchase_order_totals)
+
+
+def allocate_landed_costs(
+    *,
+    lines: List[PurchaseOrderItem],
+    amount: Decimal,
+    method: str = 'value'
+) -> Dict[int, Decimal]:
+    """
+    Split a landed cost (freight, taxes) across purchase order lines.
+
+    Each line's share is proportional to its value (quantity times unit
+    price), its weight (quantity times the product weight) or its quantity.
+    Shares are rounded down to cents and the cents left over go to the lines
+    with the largest remainders, so they always add up to the amount. When
+    no line has any weight or value, the split falls back to quantities.
+    A single pass over the lines, with no queries beyond the products
+    already loaded on them.
+
+    Args:
+        lines (List[PurchaseOrderItem]): The lines sharing the cost, with their products.
+        amount (Decimal): The cost to allocate.
+        method (str, optional): 'value', 'weight' or 'quantity'. Defaults to 'value'.
+
+    Returns:
+        Dict[int, Decimal]: The amount allocated to each line, by line id.
+    """
+    if method not in LANDED_COST_METHODS:
+        raise PurchaseOrderError("Unknown landed cost allocation method: {}".format(method))
+    if amount < 0:
+        raise PurchaseOrderError("Landed cost cannot be negative.")
+    if not lines:
+        return {}
+
+    if method == 'value':
+        bases = [line.quantity * (line.unit_price or 0) for line in lines]
+    elif method == 'weight':
+        bases = [line.quantity * (line.product.weight or 0) for line in lines]
+    else:
+        bases = [line.quantity for line in lines]
+    total = sum(bases)
+    if not total:
+        bases = [line.quantity for line in lines]
+        total = sum(bases)
+
+    cent = Decimal('0.01')
+    shares = [amount * basis / total for basis in bases]
+    allocated = [share.quantize(cent, rounding=ROUND_DOWN) for share in shares]
+    leftover = int((amount - sum(allocated)) / cent)
+    for index in sorted(range(len(lines)), key=lambda index: shares[index] - allocated[index], reverse=True)[:leftover]:
+        allocated[index] += cent
+    return {line.id: value for line, value in zip(lines, allocated)}
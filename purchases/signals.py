@@ -0,0 +1,36 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from tenants.transitions import schedule_transition_tables_invalidation
+
+from .models import PurchaseOrder, PurchaseOrderItem, PurchaseOrderStatus
+from .services import schedule_purchase_order_totals_recalculation
+
+TOTAL_RELEVANT_ITEM_FIELDS = {'quantity', 'unit_price'}
+TOTAL_RELEVANT_ORDER_FIELDS = {'freight_amount', 'taxes_amount'}
+
+
+@receiver(post_save, sender=PurchaseOrderStatus)
+@receiver(post_delete, sender=PurchaseOrderStatus)
+def invalidate_transitions_on_status_change(sender, instance, **kwargs):
+    schedule_transition_tables_invalidation(PurchaseOrderStatus, instance.tenant_id)
+
+
+@receiver(m2m_changed, sender=PurchaseOrderStatus.next_statuses.through)
+def invalidate_transitions_on_next_statuses_change(sender, instance, **kwargs):
+    schedule_transition_tables_invalidation(PurchaseOrderStatus, instance.tenant_id)
+
+
+@receiver(post_save, sender=PurchaseOrderItem)
+@receiver(post_delete, sender=PurchaseOrderItem)
+def recalculate_total_on_item_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not TOTAL_RELEVANT_ITEM_FIELDS.intersection(update_fields):
+        return
+    schedule_purchase_order_totals_recalculation([instance.purchase_order_id])
+
+
+@receiver(post_save, sender=PurchaseOrder)
+def recalculate_total_on_order_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not TOTAL_RELEVANT_ORDER_FIELDS.intersection(update_fields):
+        return
+    schedule_purchase_order_totals_recalculation([instance.pk])
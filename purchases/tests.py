@@ -0,0 +1,112 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+
+from inventory.services import get_supply_projections
+from products.models import Product
+from purchases.models import (PurchaseOrder, PurchaseOrderItem,
+                              PurchaseOrderStatus)
+from purchases.services import (PurchaseOrderError, allocate_landed_costs,
+                                draft_replenishment_orders)
+from suppliers.models import Supplier, SupplierProduct
+from tenants.models import Tenant
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def draft_status(db, tenant):
+    return PurchaseOrderStatus.objects.create(tenant=tenant, name="DRAFT", label="Rascunho", sequence_order=1)
+
+
+@pytest.fixture
+def suppliers(db, tenant):
+    return (
+        Supplier.objects.create(tenant=tenant, name="Fornecedor Barato", lead_time_days=10),
+        Supplier.objects.create(tenant=tenant, name="Fornecedor Rápido", lead_time_days=2),
+    )
+
+
+def test_draft_replenishment_orders(
+    tenant, draft_status, suppliers, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    cheap, fast = suppliers
+    short = Product.objects.create(tenant=tenant, name="Em falta", sku="SKU001", stock_quantity=2, minimum_stock_quantity=10)
+    covered = Product.objects.create(tenant=tenant, name="Coberto", sku="SKU002", stock_quantity=2, minimum_stock_quantity=10)
+    Product.objects.create(tenant=tenant, name="Sem fornecedor", sku="SKU003", stock_quantity=0, minimum_stock_quantity=5)
+    Product.objects.create(tenant=tenant, name="Em estoque", sku="SKU004", stock_quantity=20, minimum_stock_quantity=10)
+    for product in (short, covered):
+        SupplierProduct.objects.create(tenant=tenant, supplier=cheap, product=product, cost_price=Decimal("4.00"))
+        SupplierProduct.objects.create(tenant=tenant, supplier=fast, product=product, cost_price=Decimal("5.00"))
+    open_order = PurchaseOrder.objects.create(tenant=tenant, supplier=cheap, status=draft_status)
+    PurchaseOrderItem.objects.create(purchase_order=open_order, product=covered, quantity=8, unit_price=Decimal("4.00"))
+    canceled_status = PurchaseOrderStatus.objects.create(tenant=tenant, name="CANCELED", label="Cancelado", sequence_order=9)
+    canceled_order = PurchaseOrder.objects.create(
+        tenant=tenant, supplier=cheap, status=canceled_status, expected_delivery_date=timezone.localdate() + timedelta(days=3)
+    )
+    PurchaseOrderItem.objects.create(purchase_order=canceled_order, product=short, quantity=8, unit_price=Decimal("4.00"))
+    assert get_supply_projections(tenant=tenant, product_ids=[short.id])[short.id].receipts == []
+
+    with django_assert_max_num_queries(7), django_capture_on_commit_callbacks(execute=True):
+        purchase_orders = draft_replenishment_orders(tenant=tenant)
+
+    assert len(purchase_orders) == 1
+    purchase_order = purchase_orders[0]
+    assert purchase_order.supplier == cheap
+    assert purchase_order.total_amount == Decimal("32.00")
+    item = purchase_order.items.get()
+    assert (item.product, item.quantity, item.unit_price) == (short, Decimal("8.000"), Decimal("4.00"))
+    assert get_supply_projections(tenant=tenant, product_ids=[short.id])[short.id].receipts == [
+        (purchase_order.expected_delivery_date, Decimal("8.000"))
+    ]
+
+    # The drafted order now covers the shortage.
+    assert draft_replenishment_orders(tenant=tenant, strategy="fastest") == []
+
+    short.minimum_stock_quantity = 15
+    short.save()
+    purchase_order = draft_replenishment_orders(tenant=tenant, strategy="fastest")[0]
+    assert purchase_order.supplier == fast
+    assert purchase_order.items.get().quantity == Decimal("5.000")
+
+    with pytest.raises(PurchaseOrderError, match="Unknown replenishment strategy"):
+        draft_replenishment_orders(tenant=tenant, strategy="nearest")
+
+
+def test_purchase_order_totals_and_landed_cost_allocation(
+    tenant, draft_status, suppliers, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    heavy = Product.objects.create(tenant=tenant, name="Pesado", sku="SKU001", weight=Decimal("3"))
+    light = Product.objects.create(tenant=tenant, name="Leve", sku="SKU002", weight=Decimal("1"))
+    # The order and its lines are saved in one transaction and recalculated once.
+    with django_assert_num_queries(4), django_capture_on_commit_callbacks(execute=True):
+        purchase_order = PurchaseOrder.objects.create(tenant=tenant, supplier=suppliers[0], status=draft_status, freight_amount=Decimal("10.00"))
+        first = PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=heavy, quantity=1, unit_price=Decimal("1.00"))
+        second = PurchaseOrderItem.objects.create(purchase_order=purchase_order, product=light, quantity=3, unit_price=Decimal("3.33"))
+    purchase_order.refresh_from_db()
+    assert purchase_order.total_amount == Decimal("20.99")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        purchase_order.taxes_amount = Decimal("5.00")
+        purchase_order.save(update_fields=["taxes_amount"])
+    purchase_order.refresh_from_db()
+    assert purchase_order.total_amount == Decimal("25.99")
+
+    # A total typed by hand is kept.
+    with django_capture_on_commit_callbacks(execute=True):
+        purchase_order.total_amount = Decimal("30.00")
+        purchase_order.save(update_fields=["total_amount"])
+    purchase_order.refresh_from_db()
+    assert purchase_order.total_amount == Decimal("30.00")
+
+    lines = list(purchase_order.items.select_related("product"))
+    assert allocate_landed_costs(lines=lines, amount=Decimal("10.00"), method="weight") == {first.id: Decimal("5.00"), second.id: Decimal("5.00")}
+    assert allocate_landed_costs(lines=lines, amount=Decimal("10.00"), method="quantity") == {first.id: Decimal("2.50"), second.id: Decimal("7.50")}
+    by_value = allocate_landed_costs(lines=lines, amount=Decimal("0.10"))
+    assert by_value == {first.id: Decimal("0.01"), second.id: Decimal("0.09")}
+    assert sum(by_value.values()) == Decimal("0.10")
@@ -1,6 +1,10 @@
 from django.contrib import admin
 
-from .models import SaleOrder, SaleOrderHistory, SaleOrderItem, SaleOrderStatus
+from tenants.history import render_history
+
+from .models import (SaleDailyCustomerSummary, SaleDailyProductSummary,
+                     SaleOrder, SaleOrderItem, SaleOrderStatus)
+from .services import get_sale_order_history, recalculate_sale_order_totals
 
 
 class SaleOrderItemInline(admin.TabularInline):
@@ -11,34 +15,25 @@ class SaleOrderItemInline(admin.TabularInline):
     fields = ('product', 'quantity', 'unit_price', 'discount_amount', 'taxes_amount', 'total_amount')
 
 
-class SaleOrderHistoryInline(admin.TabularInline):
-    model = SaleOrderHistory
-    extra = 0
-    readonly_fields = ('status', 'notes', 'created_at')
-    can_delete = False
-
-    def has_add_permission(self, request, obj=None):
-        return False
-
-
 @admin.register(SaleOrderStatus)
 class SaleOrderStatusAdmin(admin.ModelAdmin):
     list_display = ('name', 'label', 'sequence_order', 'tenant', 'color_code')
     list_filter = ('tenant',)
     search_fields = ('name',)
+    filter_horizontal = ('next_statuses',)
 
 
 @admin.register(SaleOrder)
 class SaleOrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer', 'status', 'total_amount', 'created_at', 'tenant')
     list_filter = ('status', 'tenant', 'created_at')
-    search_fields = ('id', 'customer__name')
+    search_fields = ('id', 'customer__name', 'external_reference')
     autocomplete_fields = ['customer', 'salesperson', 'status', 'tenant']
-    inlines = [SaleOrderItemInline, SaleOrderHistoryInline]
+    inlines = [SaleOrderItemInline]
 
     fieldsets = (
         ('Informações Principais', {
-            'fields': ('tenant', 'customer', 'salesperson', 'status')
+            'fields': ('tenant', 'customer', 'salesperson', 'status', 'external_reference')
         }),
         ('Valores Financeiros (calculados automaticamente)', {
             'classes': ('collapse',),
@@ -51,18 +46,31 @@ class SaleOrderAdmin(admin.ModelAdmin):
             'fields': ('customer_notes', 'internal_notes')
         }),
         ('Datas', {
-            'fields': ('created_at', 'updated_at', 'deleted_at')
+            'fields': ('confirmed_at', 'created_at', 'updated_at', 'deleted_at')
+        }),
+        ('Histórico', {
+            'fields': ('history_display',)
         }),
     )
 
     readonly_fields = (
         'subtotal_amount', 'discount_amount', 'shipping_amount',
-        'taxes_amount', 'total_amount', 'created_at', 'updated_at', 'deleted_at'
+        'taxes_amount', 'total_amount', 'confirmed_at', 'created_at', 'updated_at', 'deleted_at', 'history_display'
     )
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('customer', 'status', 'tenant')
 
+    @admin.display(description='Histórico')
+    def history_display(self, obj):
+        if obj.pk is None:
+            return '-'
+        return render_history(get_sale_order_history(sale_order=obj), 'status')
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        recalculate_sale_order_totals(sale_orders=SaleOrder.objects.filter(pk=form.instance.pk))
+
 
 @admin.register(SaleOrderItem)
 class SaleOrderItemAdmin(admin.ModelAdmin):
@@ -74,3 +82,32 @@ class SaleOrderItemAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('sale_order', 'product')
+
+
+class SaleDailySummaryAdmin(admin.ModelAdmin):
+    list_filter = ('tenant',)
+    date_hierarchy = 'date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SaleDailyProductSummary)
+class SaleDailyProductSummaryAdmin(SaleDailySummaryAdmin):
+    list_display = ('date', 'product', 'order_count', 'quantity', 'revenue', 'tenant')
+    search_fields = ('product__name', 'product__sku')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'tenant')
+
+
+@admin.register(SaleDailyCustomerSummary)
+class SaleDailyCustomerSummaryAdmin(SaleDailySummaryAdmin):
+    list_display = ('date', 'customer', 'order_count', 'revenue', 'tenant')
+    search_fields = ('customer__name',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('customer', 'tenant')
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sales.models import SaleOrder
+from sales.services import SaleOrderError, cancel_sale_orders
+from tenants.models import Tenant
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Cancel the sale orders left unconfirmed for more than a number of days.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, required=True, help='Cancel orders created more than this many days ago.')
+        parser.add_argument('--user', required=True, help='E-mail of the user recorded in the order history.')
+        parser.add_argument('--tenant', type=int, help='Only process this tenant id.')
+        parser.add_argument('--status', action='append', help='Only cancel orders in this status name (repeatable).')
+        parser.add_argument('--chunk-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError('User {} does not exist.'.format(options['user']))
+
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        expired = SaleOrder.objects.live().filter(
+            confirmed_at__isnull=True,
+            created_at__lt=timezone.now() - timedelta(days=options['days'])
+        )
+        if options['status']:
+            expired = expired.filter(status__name__in=options['status'])
+
+        for tenant in tenants:
+            try:
+                canceled = cancel_sale_orders(
+                    tenant=tenant,
+                    sale_orders=expired,
+                    user=user,
+                    notes='Cancelado automaticamente após {} dias'.format(options['days']),
+                    chunk_size=options['chunk_size']
+                )
+            except SaleOrderError as error:
+                self.stderr.write('{}: {}'.format(tenant, error))
+                continue
+            if canceled:
+                self.stdout.write('{}: {} orders canceled.'.format(tenant, canceled))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sales.services import compact_sale_order_history
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Move the history of closed sale orders into their archives.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only compact this tenant id.')
+        parser.add_argument('--days', type=int, default=180, help='Only compact orders untouched for this many days.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            archived = compact_sale_order_history(tenant=tenant, older_than_days=options['days'], batch_size=options['batch_size'])
+            self.stdout.write('{}: {} history rows archived in {:.1f}s.'.format(tenant, archived, time.monotonic() - started))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from sales.services import refresh_sales_summaries
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Refresh the daily sales summaries from the orders changed since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only refresh this tenant id.')
+        parser.add_argument('--full', action='store_true', help='Recompute every day instead of the changed ones.')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant'] is not None:
+            tenants = tenants.filter(pk=options['tenant'])
+
+        for tenant in tenants:
+            started = time.monotonic()
+            days = refresh_sales_summaries(tenant=tenant, full=options['full'])
+            self.stdout.write('{}: {} days refreshed in {:.1f}s.'.format(tenant, days, time.monotonic() - started))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customer_live_idx'),
+        ('sales', '0002_saleorderitem_notes'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saleorder',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['tenant', '-created_at'], name='sale_order_live_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0003_saleorder_sale_order_live_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleorder',
+            name='confirmed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
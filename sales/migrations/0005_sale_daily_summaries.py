@@ -0,0 +1,125 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customer_live_idx'),
+        ('products', '0005_product_product_live_idx'),
+        ('sales', '0004_saleorder_confirmed_at'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleDailyCustomerSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Sale Daily Customer Summary',
+                'verbose_name_plural': 'Sale Daily Customer Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleDailyProductSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=14)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Sale Daily Product Summary',
+                'verbose_name_plural': 'Sale Daily Product Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleDailySalespersonSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Sale Daily Salesperson Summary',
+                'verbose_name_plural': 'Sale Daily Salesperson Summaries',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleSummaryRefresh',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('refreshed_until', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Sale Summary Refresh',
+                'verbose_name_plural': 'Sale Summary Refreshes',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='saleorder',
+            index=models.Index(fields=['tenant', 'updated_at'], name='sale_order_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='saledailycustomersummary',
+            name='customer',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_summaries', to='customers.customer'),
+        ),
+        migrations.AddField(
+            model_name='saledailycustomersummary',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_customer_summaries', to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='saledailyproductsummary',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_summaries', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='saledailyproductsummary',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_product_summaries', to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='saledailysalespersonsummary',
+            name='salesperson',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_summaries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='saledailysalespersonsummary',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sale_daily_salesperson_summaries', to='tenants.tenant'),
+        ),
+        migrations.AddField(
+            model_name='salesummaryrefresh',
+            name='tenant',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sale_summary_refresh', to='tenants.tenant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='saledailycustomersummary',
+            unique_together={('tenant', 'date', 'customer')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='saledailyproductsummary',
+            unique_together={('tenant', 'date', 'product')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='saledailysalespersonsummary',
+            unique_together={('tenant', 'date', 'salesperson')},
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_customer_customer_live_idx'),
+        ('sales', '0005_sale_daily_summaries'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleorder',
+            name='external_reference',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='saleorder',
+            constraint=models.UniqueConstraint(condition=models.Q(('external_reference__isnull', False)), fields=('tenant', 'external_reference'), name='unique_sale_order_external_reference'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_sale_order_external_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='saleorderstatus',
+            name='next_statuses',
+            field=models.ManyToManyField(blank=True, related_name='previous_statuses', to='sales.saleorderstatus'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+import tenants.history
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_status_next_statuses'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleOrderHistoryArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entries', models.JSONField(default=list, encoder=tenants.history.HistoryEncoder)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+                ('sale_order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='history_archive', to='sales.saleorder')),
+            ],
+            options={
+                'verbose_name': 'Sale Order History Archive',
+                'verbose_name_plural': 'Sale Order History Archives',
+            },
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from customers.models import Customer
 from products.models import Product
+from tenants.history import HistoryArchive
+from tenants.managers import SoftDeleteQuerySet
 from tenants.models import Tenant
 
 
@@ -13,6 +16,7 @@ class SaleOrderStatus(models.Model):
     label = models.CharField(max_length=100)
     sequence_order = models.PositiveIntegerField(default=0)
     color_code = models.CharField(max_length=7, blank=True, null=True)
+    next_statuses = models.ManyToManyField('self', symmetrical=False, blank=True, related_name='previous_statuses')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -26,6 +30,19 @@ class SaleOrderStatus(models.Model):
         return self.name
 
 
+class SaleOrderQuerySet(SoftDeleteQuerySet):
+
+    def soft_delete_values(self) -> dict:
+        canceled_status = SaleOrderStatus.objects.filter(
+            models.Q(tenant=models.OuterRef('tenant')) | models.Q(tenant__isnull=True),
+            name__iexact='CANCELED'
+        ).order_by(models.F('tenant').asc(nulls_last=True)).values('id')[:1]
+
+        values = super().soft_delete_values()
+        values['status'] = Coalesce(models.Subquery(canceled_status), models.F('status'), output_field=models.BigIntegerField())
+        return values
+
+
 class SaleOrder(models.Model):
 
     class PaymentMethod(models.TextChoices):
@@ -51,14 +68,25 @@ class SaleOrder(models.Model):
     shipping_track = models.CharField(max_length=100, blank=True, null=True)
     customer_notes = models.TextField(blank=True, null=True)
     internal_notes = models.TextField(blank=True, null=True)
+    external_reference = models.CharField(max_length=100, blank=True, null=True)
+    confirmed_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = SaleOrderQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Sale Order'
         verbose_name_plural = 'Sale Orders'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['tenant', '-created_at'], condition=models.Q(deleted_at__isnull=True), name='sale_order_live_idx'),
+            models.Index(fields=['tenant', 'updated_at'], name='sale_order_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'external_reference'], condition=models.Q(external_reference__isnull=False), name='unique_sale_order_external_reference'),
+        ]
 
     def __str__(self):
         return f'Sale Order #{self.id} - {self.customer.name}'
@@ -113,3 +141,79 @@ class SaleOrderHistory(models.Model):
 
     def __str__(self):
         return f'History for Order #{self.sale_order.id} - {self.status.name} by {self.changed_by.name} on {self.created_at.strftime("%Y-%m-%d %H:%M:%S")}'
+
+
+class SaleOrderHistoryArchive(HistoryArchive):
+    sale_order = models.OneToOneField(SaleOrder, on_delete=models.CASCADE, related_name='history_archive')
+
+    class Meta:
+        verbose_name = 'Sale Order History Archive'
+        verbose_name_plural = 'Sale Order History Archives'
+
+    def __str__(self):
+        return f'Archived history for Order #{self.sale_order_id} ({self.entry_count} entries)'
+
+
+class SaleDailyProductSummary(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='sale_daily_product_summaries')
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sale_daily_summaries')
+    order_count = models.PositiveIntegerField(default=0)
+    quantity = models.DecimalField(max_digits=14, decimal_places=3, default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Sale Daily Product Summary'
+        verbose_name_plural = 'Sale Daily Product Summaries'
+        unique_together = ('tenant', 'date', 'product')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date} - {self.product.name}: {self.revenue}'
+
+
+class SaleDailyCustomerSummary(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='sale_daily_customer_summaries')
+    date = models.DateField()
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='sale_daily_summaries')
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Sale Daily Customer Summary'
+        verbose_name_plural = 'Sale Daily Customer Summaries'
+        unique_together = ('tenant', 'date', 'customer')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date} - {self.customer.name}: {self.revenue}'
+
+
+class SaleDailySalespersonSummary(models.Model):
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='sale_daily_salesperson_summaries')
+    date = models.DateField()
+    salesperson = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, blank=True, null=True, related_name='sale_daily_summaries')
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Sale Daily Salesperson Summary'
+        verbose_name_plural = 'Sale Daily Salesperson Summaries'
+        unique_together = ('tenant', 'date', 'salesperson')
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'{self.date} - {self.salesperson or "-"}: {self.revenue}'
+
+
+class SaleSummaryRefresh(models.Model):
+    tenant = models.OneToOneField(Tenant, on_delete=models.CASCADE, related_name='sale_summary_refresh')
+    refreshed_until = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Sale Summary Refresh'
+        verbose_name_plural = 'Sale Summary Refreshes'
+
+    def __str__(self):
+        return f'{self.tenant.name} - {self.refreshed_until}'
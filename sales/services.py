@@ -0,0 +1,999 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, List
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models.functions import (Coalesce, Greatest, Lower, Round,
+                                        TruncDate)
+from django.utils import timezone
+
+from customers.models import Customer
+from financials.models import AccountReceivable
+from financials.services import (adjust_customer_exposure,
+                                 check_customer_credit, lock_customer_credit)
+from inventory.models import StockMovement
+from inventory.services import (_create_stock_movements,
+                                schedule_supply_projections_invalidation)
+from products.models import Product
+from tenants.history import compact_history, read_history
+from tenants.models import Tenant
+from tenants.transitions import StatusTransitionTable, get_transition_table
+from users.models import User
+
+from .models import (SaleDailyCustomerSummary, SaleDailyProductSummary,
+                     SaleDailySalespersonSummary, SaleOrder, SaleOrderHistory,
+                     SaleOrderHistoryArchive, SaleOrderItem, SaleOrderStatus,
+                     SaleSummaryRefresh)
+
+TWO_PLACES = Decimal('0.01')
+
+AMOUNT_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
+# Statuses set only by the services that carry their side effects (stock postings).
+SERVICE_MANAGED_STATUSES = {'CONFIRMED', 'CANCELED'}
+
+# Orders saved by transactions still open when the previous refresh started
+# carry an updated_at older than its watermark; re-read this window to catch them.
+SUMMARY_REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+class SaleOrderError(Exception):
+    """Custom exception for sale order-related errors."""
+    pass
+
+
+def get_sale_order_status(*, tenant: Tenant, name: str) -> SaleOrderStatus:
+    """
+    Return the status with the given name, preferring the tenant's own status
+    over a global one.
+
+    Raises:
+        SaleOrderError: If no such status is configured.
+    """
+    status = SaleOrderStatus.objects.filter(
+        models.Q(tenant=tenant) | models.Q(tenant__isnull=True),
+        name__iexact=name
+    ).order_by(models.F('tenant').asc(nulls_last=True)).first()
+    if status is None:
+        raise SaleOrderError("Sale order status {} is not configured.".format(name))
+    return status
+
+
+def get_sale_order_transitions(*, tenant: Tenant) -> StatusTransitionTable:
+    """
+    Return the compiled status transitions of a tenant's sale orders.
+    """
+    return get_transition_table(SaleOrderStatus, tenant.id)
+
+
+def _check_sale_order_transition(*, tenant: Tenant, sale_order: SaleOrder, status: SaleOrderStatus) -> None:
+    transitions = get_sale_order_transitions(tenant=tenant)
+    if not transitions.is_available(status.pk):
+        raise SaleOrderError("Sale order status {} is not available to this tenant.".format(status.name))
+    if sale_order.status_id != status.pk and not transitions.can_transition(sale_order.status_id, status.pk):
+        raise SaleOrderError("Sale order #{} cannot move to status {}.".format(sale_order.id, status.name))
+
+
+def _to_amount(value: Any) -> Decimal:
+    return Decimal(str(value or 0)).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def _build_sale_order_items(
+    *,
+    tenant: Tenant,
+    sale_order: SaleOrder,
+    items_data: List[Dict[str, Any]]
+) -> List[SaleOrderItem]:
+    """
+    Build (without saving) the items of a sale order, computing each line total.
+
+    The line total is quantity x unit price, rounded to cents, minus the line
+    discount plus the line taxes. The unit price defaults to the product price.
+    """
+    items = []
+    for item_data in items_data:
+        product = item_data['product']
+        quantity = Decimal(str(item_data['quantity']))
+        if quantity <= 0:
+            raise SaleOrderError("Quantity must be greater than zero.")
+        if product.tenant_id != tenant.id:
+            raise SaleOrderError("Product {} does not belong to this tenant.".format(product.name))
+
+        unit_price = _to_amount(item_data.get('unit_price', product.price))
+        discount_amount = _to_amount(item_data.get('discount_amount'))
+        taxes_amount = _to_amount(item_data.get('taxes_amount'))
+        total_amount = _to_amount(quantity * unit_price) - discount_amount + taxes_amount
+
+        items.append(SaleOrderItem(
+            sale_order=sale_order,
+            product=product,
+            quantity=quantity,
+            unit_price=unit_price,
+            discount_amount=discount_amount,
+            taxes_amount=taxes_amount,
+            total_amount=total_amount,
+            notes=item_data.get('notes', None)
+        ))
+    return items
+
+
+def _apply_sale_order_totals(sale_order: SaleOrder, items: List[SaleOrderItem]) -> None:
+    """
+    Set the subtotal (sum of line totals) and total of a sale order from its items.
+    """
+    sale_order.subtotal_amount = sum((item.total_amount for item in items), Decimal('0.00'))
+    sale_order.total_amount = sale_order.subtotal_amount - sale_order.discount_amount + sale_order.shipping_amount + sale_order.taxes_amount
+
+
+def _update_customer_order_metrics(*, orders: Iterable[SaleOrder], canceled: bool = False) -> None:
+    """
+    Add confirmed orders to the order metrics of their customers or, when
+    canceled, take them out, with a single UPDATE for the whole batch.
+
+    Counts and revenue are adjusted incrementally; on cancellation the last
+    order date is re-read from the customer's remaining confirmed orders.
+    """
+    deltas: Dict[int, list] = {}
+    for order in orders:
+        delta = deltas.setdefault(order.customer_id, [0, Decimal('0.00'), order.confirmed_at])
+        delta[0] += 1
+        delta[1] += order.total_amount
+        delta[2] = max(delta[2], order.confirmed_at)
+    if not deltas:
+        return
+
+    sign = -1 if canceled else 1
+
+    def per_customer(index: int, output_field: models.Field) -> models.Case:
+        return models.Case(
+            *[models.When(pk=customer_id, then=models.Value(delta[index] if index == 2 else sign * delta[index])) for customer_id, delta in deltas.items()],
+            output_field=output_field
+        )
+
+    values = {
+        'order_count': models.F('order_count') + per_customer(0, models.IntegerField()),
+        'lifetime_revenue': models.F('lifetime_revenue') + per_customer(1, models.DecimalField(max_digits=14, decimal_places=2)),
+    }
+    if canceled:
+        values['last_order_at'] = models.Subquery(
+            SaleOrder.objects.live().filter(customer=models.OuterRef('pk'), confirmed_at__isnull=False)
+            .order_by('-confirmed_at').values('confirmed_at')[:1]
+        )
+    else:
+        last_order_at = per_customer(2, models.DateTimeField())
+        values['last_order_at'] = Greatest(Coalesce(models.F('last_order_at'), last_order_at), last_order_at)
+    Customer.objects.filter(pk__in=list(deltas)).update(**values)
+
+
+def _adjust_customer_revenue(deltas: Dict[int, Decimal]) -> None:
+    """
+    Add amounts to the lifetime revenue of customers with a single UPDATE.
+    """
+    deltas = {customer_id: amount for customer_id, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    Customer.objects.filter(pk__in=list(deltas)).update(
+        lifetime_revenue=models.F('lifetime_revenue') + models.Case(
+            *[models.When(pk=customer_id, then=models.Value(amount)) for customer_id, amount in deltas.items()],
+            output_field=models.DecimalField(max_digits=14, decimal_places=2)
+        )
+    )
+
+
+@transaction.atomic
+def create_sale_order(
+    *,
+    tenant: Tenant,
+    customer: Customer,
+    user: User,
+    items_data: List[Dict[str, Any]],
+    status: SaleOrderStatus = None,
+    salesperson: User = None,
+    payment_method: str = SaleOrder.PaymentMethod.CASH,
+    discount_amount: Decimal = Decimal('0.00'),
+    shipping_amount: Decimal = Decimal('0.00'),
+    taxes_amount: Decimal = Decimal('0.00'),
+    shipping_method: str = None,
+    customer_notes: str = None,
+    internal_notes: str = None
+) -> SaleOrder:
+    """
+    Create a sale order with its items, computing line and order totals.
+
+    Totals are computed in memory before anything is written, so the order,
+    all of its items and its first history entry are persisted with a
+    constant number of queries regardless of the number of lines.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale order.
+        customer (Customer): The customer placing the order.
+        user (User): The user creating the order, recorded in the order history.
+        items_data (List[Dict[str, Any]]): List of dictionaries containing item data ('product', 'quantity', 'unit_price', 'discount_amount', 'taxes_amount', 'notes').
+        status (SaleOrderStatus, optional): Initial status of the order. Defaults to None.
+        salesperson (User, optional): Salesperson responsible for the order. Defaults to None.
+        payment_method (str, optional): Payment method. Defaults to PaymentMethod.CASH.
+        discount_amount (Decimal, optional): Order-level discount. Defaults to 0.
+        shipping_amount (Decimal, optional): Shipping amount. Defaults to 0.
+        taxes_amount (Decimal, optional): Order-level taxes. Defaults to 0.
+        shipping_method (str, optional): Shipping method. Defaults to None.
+        customer_notes (str, optional): Notes visible to the customer. Defaults to None.
+        internal_notes (str, optional): Internal notes. Defaults to None.
+
+    Returns:
+        SaleOrder: The created sale order.
+    """
+    if customer.tenant_id != tenant.id:
+        raise SaleOrderError("Customer does not belong to this tenant.")
+    if not items_data:
+        raise SaleOrderError("A sale order must have at least one item.")
+
+    sale_order = SaleOrder(
+        tenant=tenant,
+        customer=customer,
+        salesperson=salesperson,
+        status=status,
+        payment_method=payment_method,
+        discount_amount=_to_amount(discount_amount),
+        shipping_amount=_to_amount(shipping_amount),
+        taxes_amount=_to_amount(taxes_amount),
+        shipping_method=shipping_method,
+        customer_notes=customer_notes,
+        internal_notes=internal_notes
+    )
+    items = _build_sale_order_items(tenant=tenant, sale_order=sale_order, items_data=items_data)
+    _apply_sale_order_totals(sale_order, items)
+    sale_order.save()
+
+    for item in items:
+        item.sale_order = sale_order
+    SaleOrderItem.objects.bulk_create(items)
+    schedule_supply_projections_invalidation(tenant.id, {item.product.id for item in items})
+    adjust_customer_exposure({customer.id: sale_order.total_amount})
+
+    if status is not None:
+        SaleOrderHistory.objects.create(sale_order=sale_order, status=status, changed_by=user)
+
+    return sale_order
+
+
+@transaction.atomic
+def update_sale_order_items(
+    *,
+    tenant: Tenant,
+    sale_order: SaleOrder,
+    items_data: List[Dict[str, Any]]
+) -> SaleOrder:
+    """
+    Replace the items of a sale order and recompute its totals.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale order.
+        sale_order (SaleOrder): The sale order being edited.
+        items_data (List[Dict[str, Any]]): The new items, in the format accepted by create_sale_order.
+
+    Returns:
+        SaleOrder: The updated sale order.
+    """
+    if sale_order.tenant_id != tenant.id:
+        raise SaleOrderError("Sale order does not belong to this tenant.")
+    if sale_order.deleted_at is not None:
+        raise SaleOrderError("Canceled sale orders cannot be edited.")
+    if sale_order.confirmed_at is not None:
+        raise SaleOrderError("Confirmed sale orders cannot be edited.")
+    if not items_data:
+        raise SaleOrderError("A sale order must have at least one item.")
+
+    previous_total = sale_order.total_amount
+    items = _build_sale_order_items(tenant=tenant, sale_order=sale_order, items_data=items_data)
+    _apply_sale_order_totals(sale_order, items)
+
+    product_ids = set(sale_order.items.values_list('product_id', flat=True))
+    sale_order.items.all().delete()
+    SaleOrderItem.objects.bulk_create(items)
+    schedule_supply_projections_invalidation(tenant.id, product_ids | {item.product.id for item in items})
+    sale_order.save(update_fields=['subtotal_amount', 'total_amount', 'updated_at'])
+    if not sale_order.accounts_receivable.exists():
+        adjust_customer_exposure({sale_order.customer_id: sale_order.total_amount - previous_total})
+    return sale_order
+
+
+@transaction.atomic
+def recalculate_sale_order_totals(*, sale_orders: models.QuerySet) -> int:
+    """
+    Recompute line and order totals in the database from the stored items.
+
+    This is the repair path for orders whose totals were edited outside the
+    service layer (e.g. through the admin); it issues a constant number of
+    statements whatever the number of orders, and carries the change of the
+    totals of uninvoiced orders over to their customers' open exposure and
+    that of confirmed orders over to their customers' lifetime revenue.
+
+    Args:
+        sale_orders (QuerySet): The sale orders to recompute.
+
+    Returns:
+        int: The number of sale orders updated.
+    """
+    line_total = Round(models.F('quantity') * models.F('unit_price'), 2) - models.F('discount_amount') + models.F('taxes_amount')
+    SaleOrderItem.objects.filter(sale_order__in=sale_orders.values('pk')).update(
+        total_amount=models.ExpressionWrapper(line_total, output_field=AMOUNT_FIELD)
+    )
+
+    items_total = SaleOrderItem.objects.filter(
+        sale_order=models.OuterRef('pk')
+    ).values('sale_order').annotate(total=models.Sum('total_amount')).values('total')
+
+    orders = SaleOrder.objects.filter(pk__in=sale_orders.values('pk'))
+    previous_totals = {
+        pk: (total, invoiced, confirmed_at is not None)
+        for pk, total, invoiced, confirmed_at in orders.live().annotate(
+            invoiced=models.Exists(AccountReceivable.objects.filter(sale_order=models.OuterRef('pk')))
+        ).values_list('pk', 'total_amount', 'invoiced', 'confirmed_at')
+    }
+
+    orders.update(subtotal_amount=Coalesce(models.Subquery(items_total, output_field=AMOUNT_FIELD), Decimal('0.00')))
+    updated = orders.update(
+        total_amount=models.F('subtotal_amount') - models.F('discount_amount') + models.F('shipping_amount') + models.F('taxes_amount')
+    )
+
+    exposure_deltas: Dict[int, Decimal] = defaultdict(Decimal)
+    revenue_deltas: Dict[int, Decimal] = defaultdict(Decimal)
+    for pk, customer_id, total in SaleOrder.objects.filter(pk__in=list(previous_totals)).values_list('pk', 'customer_id', 'total_amount'):
+        previous_total, invoiced, confirmed = previous_totals[pk]
+        if not invoiced:
+            exposure_deltas[customer_id] += total - previous_total
+        if confirmed:
+            revenue_deltas[customer_id] += total - previous_total
+    adjust_customer_exposure(exposure_deltas)
+    _adjust_customer_revenue(revenue_deltas)
+    return updated
+
+
+@transaction.atomic
+def confirm_sale_order(
+    *,
+    tenant: Tenant,
+    sale_order: SaleOrder,
+    user: User,
+    status: SaleOrderStatus = None,
+    notes: str = None
+) -> SaleOrder:
+    """
+    Confirm a sale order, taking all of its items out of stock in one batch.
+
+    The order row is locked to prevent double confirmation, the customer row
+    to check its credit limit against its maintained open exposure, and the
+    stock of every product involved is checked with a single locked read; if
+    any line is short the whole confirmation is rolled back. Each item is the
+    source document of its OUT movement.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale order.
+        sale_order (SaleOrder): The sale order to confirm.
+        user (User): The user confirming the order.
+        status (SaleOrderStatus, optional): Status to move the order to. Defaults to the CONFIRMED status.
+        notes (str, optional): Notes recorded in the order history. Defaults to None.
+
+    Returns:
+        SaleOrder: The confirmed sale order.
+    """
+    sale_order = SaleOrder.objects.select_for_update().get(pk=sale_order.pk, tenant=tenant)
+    if sale_order.deleted_at is not None:
+        raise SaleOrderError("Canceled sale orders cannot be confirmed.")
+    if sale_order.confirmed_at is not None:
+        raise SaleOrderError("Sale order #{} is already confirmed.".format(sale_order.id))
+
+    if status is None:
+        status = get_sale_order_status(tenant=tenant, name='CONFIRMED')
+    _check_sale_order_transition(tenant=tenant, sale_order=sale_order, status=status)
+
+    # Uninvoiced orders are already part of the exposure since their creation.
+    customer = lock_customer_credit(customer_id=sale_order.customer_id)
+    if not check_customer_credit(customer=customer):
+        raise SaleOrderError("Credit limit exceeded for customer {}.".format(customer.name))
+
+    items = list(sale_order.items.select_related('product'))
+    if not items:
+        raise SaleOrderError("A sale order must have at least one item.")
+
+    _create_stock_movements(
+        tenant=tenant,
+        user=user,
+        movements_data=[
+            {
+                'product': item.product,
+                'direction': StockMovement.MovementDirection.OUT,
+                'quantity': item.quantity,
+                'source_document': item,
+                'unit_price': item.unit_price,
+                'notes': f"Pedido de venda #{sale_order.id} - {item.product.name}"
+            }
+            for item in items
+        ]
+    )
+
+    sale_order.status = status
+    sale_order.confirmed_at = timezone.now()
+    sale_order.save(update_fields=['status', 'confirmed_at', 'updated_at'])
+    _update_customer_order_metrics(orders=[sale_order])
+    SaleOrderHistory.objects.create(sale_order=sale_order, status=status, changed_by=user, notes=notes)
+    return sale_order
+
+
+@transaction.atomic
+def transition_sale_orders(
+    *,
+    tenant: Tenant,
+    sale_orders: models.QuerySet,
+    status: SaleOrderStatus,
+    user: User,
+    notes: str = None
+) -> int:
+    """
+    Move many live sale orders to a status at once.
+
+    Transitions are validated against the tenant's compiled transition table,
+    so the batch costs one locked read, one UPDATE and one bulk INSERT of
+    history entries whatever its size. Orders already in the status are left
+    untouched; if any other order cannot make the transition, none is moved.
+    Confirmation and cancellation go through their own services.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale orders.
+        sale_orders (QuerySet): The sale orders to move.
+        status (SaleOrderStatus): The target status.
+        user (User): The user recorded in the order history.
+        notes (str, optional): Notes recorded in the order history. Defaults to None.
+
+    Returns:
+        int: The number of sale orders moved.
+    """
+    if status.name.upper() in SERVICE_MANAGED_STATUSES:
+        raise SaleOrderError("Sale orders are moved to status {} by their own service.".format(status.name))
+    transitions = get_sale_order_transitions(tenant=tenant)
+    if not transitions.is_available(status.pk):
+        raise SaleOrderError("Sale order status {} is not available to this tenant.".format(status.name))
+
+    rows = list(
+        SaleOrder.objects.select_for_update()
+        .filter(tenant=tenant, pk__in=sale_orders.values('pk'), deleted_at__isnull=True)
+        .exclude(status=status)
+        .order_by('pk')
+        .values_list('pk', 'status_id')
+    )
+    invalid = transitions.invalid_sources(rows, status.pk)
+    if invalid:
+        raise SaleOrderError("Sale orders {} cannot move to status {}.".format(', '.join('#{}'.format(pk) for pk in invalid), status.name))
+    if not rows:
+        return 0
+
+    order_ids = [pk for pk, _ in rows]
+    SaleOrder.objects.filter(pk__in=order_ids).update(status=status, updated_at=timezone.now())
+    SaleOrderHistory.objects.bulk_create([
+        SaleOrderHistory(sale_order_id=pk, status=status, changed_by=user, notes=notes)
+        for pk in order_ids
+    ])
+    return len(order_ids)
+
+
+def _cancel_sale_order_batch(
+    *,
+    tenant: Tenant,
+    sale_order_ids: Iterable[int],
+    user: User,
+    status: SaleOrderStatus,
+    notes: str = None
+) -> int:
+    """
+    Cancel a batch of live sale orders with a constant number of queries.
+
+    Stock taken out by the orders' items and not yet returned is put back with
+    one batched posting of IN movements, sourced from the same items.
+
+    Returns:
+        int: The number of sale orders canceled.
+    """
+    orders = list(
+        SaleOrder.objects.select_for_update()
+        .filter(tenant=tenant, pk__in=list(sale_order_ids), deleted_at__isnull=True)
+        .order_by('pk')
+    )
+    if not orders:
+        return 0
+    order_ids = [order.pk for order in orders]
+
+    items = {item.pk: item for item in SaleOrderItem.objects.filter(sale_order_id__in=order_ids).select_related('product')}
+    outstanding = StockMovement.objects.filter(
+        tenant=tenant,
+        source_content_type=ContentType.objects.get_for_model(SaleOrderItem),
+        source_object_id__in=list(items)
+    ).values('source_object_id').annotate(
+        quantity=models.Sum(models.Case(
+            models.When(direction=StockMovement.MovementDirection.OUT, then='quantity'),
+            default=-models.F('quantity')
+        ))
+    ).filter(quantity__gt=0).order_by('source_object_id')
+
+    movements_data = []
+    for row in outstanding:
+        item = items[row['source_object_id']]
+        movements_data.append({
+            'product': item.product,
+            'direction': StockMovement.MovementDirection.IN,
+            'quantity': row['quantity'],
+            'source_document': item,
+            'unit_price': item.unit_price,
+            'notes': f"Cancelamento do pedido de venda #{item.sale_order_id} - {item.product.name}"
+        })
+    if movements_data:
+        _create_stock_movements(tenant=tenant, user=user, movements_data=movements_data)
+
+    invoiced = set(SaleOrder.objects.filter(pk__in=order_ids, accounts_receivable__isnull=False).values_list('pk', flat=True))
+    SaleOrder.objects.filter(pk__in=order_ids).update(status=status, deleted_at=timezone.now(), updated_at=timezone.now())
+    exposure_deltas: Dict[int, Decimal] = {}
+    for order in orders:
+        if order.pk not in invoiced:
+            exposure_deltas[order.customer_id] = exposure_deltas.get(order.customer_id, Decimal('0.00')) - order.total_amount
+    adjust_customer_exposure(exposure_deltas)
+    _update_customer_order_metrics(orders=[order for order in orders if order.confirmed_at is not None], canceled=True)
+    schedule_supply_projections_invalidation(tenant.id, {item.product_id for item in items.values()})
+    SaleOrderHistory.objects.bulk_create([
+        SaleOrderHistory(sale_order=order, status=status, changed_by=user, notes=notes)
+        for order in orders
+    ])
+    return len(orders)
+
+
+@transaction.atomic
+def cancel_sale_order(
+    *,
+    tenant: Tenant,
+    sale_order: SaleOrder,
+    user: User,
+    status: SaleOrderStatus = None,
+    notes: str = None
+) -> SaleOrder:
+    """
+    Cancel a sale order, returning to stock everything its items took out.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale order.
+        sale_order (SaleOrder): The sale order to cancel.
+        user (User): The user canceling the order.
+        status (SaleOrderStatus, optional): Status to move the order to. Defaults to the CANCELED status.
+        notes (str, optional): Notes recorded in the order history. Defaults to None.
+
+    Returns:
+        SaleOrder: The canceled sale order.
+    """
+    if status is None:
+        status = get_sale_order_status(tenant=tenant, name='CANCELED')
+
+    canceled = _cancel_sale_order_batch(tenant=tenant, sale_order_ids=[sale_order.pk], user=user, status=status, notes=notes)
+    if not canceled:
+        raise SaleOrderError("Sale order #{} is already canceled.".format(sale_order.pk))
+
+    sale_order.refresh_from_db()
+    return sale_order
+
+
+def cancel_sale_orders(
+    *,
+    tenant: Tenant,
+    sale_orders: models.QuerySet,
+    user: User,
+    status: SaleOrderStatus = None,
+    notes: str = None,
+    chunk_size: int = 200
+) -> int:
+    """
+    Cancel many sale orders in chunks, each chunk in its own transaction.
+
+    A failure only rolls back the chunk being processed, so long-running jobs
+    such as the nightly expiry keep the progress already made.
+
+    Args:
+        tenant (Tenant): The tenant associated with the sale orders.
+        sale_orders (QuerySet): The sale orders to cancel; already canceled ones are skipped.
+        user (User): The user canceling the orders.
+        status (SaleOrderStatus, optional): Status to move the orders to. Defaults to the CANCELED status.
+        notes (str, optional): Notes recorded in the order histories. Defaults to None.
+        chunk_size (int, optional): Number of orders canceled per transaction. Defaults to 200.
+
+    Returns:
+        int: The number of sale orders canceled.
+    """
+    order_ids = list(sale_orders.filter(tenant=tenant).live().order_by('pk').values_list('pk', flat=True))
+    if order_ids and status is None:
+        status = get_sale_order_status(tenant=tenant, name='CANCELED')
+
+    canceled = 0
+    for start in range(0, len(order_ids), chunk_size):
+        with transaction.atomic():
+            canceled += _cancel_sale_order_batch(
+                tenant=tenant,
+                sale_order_ids=order_ids[start:start + chunk_size],
+                user=user,
+                status=status,
+                notes=notes
+            )
+    return canceled
+
+
+def _ingestion_key(value: Any) -> str:
+    return str(value or '').strip().lower()
+
+
+@transaction.atomic
+def ingest_sale_orders(
+    *,
+    tenant: Tenant,
+    user: User,
+    orders_data: List[Dict[str, Any]],
+    status: SaleOrderStatus = None,
+    confirm: bool = False
+) -> Dict[str, Any]:
+    """
+    Create a batch of sale orders delivered by an external channel (e.g. a marketplace feed).
+
+    Customers are resolved by document number (CPF/CNPJ) or e-mail and products
+    by SKU, each with a single query for the whole batch. Orders, items and
+    histories are inserted with bulk_create and, when confirming, all outbound
+    stock is posted in one batch. An order that fails validation (unknown
+    customer or SKU, invalid quantity, duplicated reference, insufficient
+    stock or credit) is reported and skipped without affecting the others.
+
+    Args:
+        tenant (Tenant): The tenant receiving the orders.
+        user (User): The user recorded in the order histories and stock movements.
+        orders_data (List[Dict[str, Any]]): List of dictionaries containing order data ('reference', 'customer_document', 'customer_email', 'items', 'payment_method', 'discount_amount', 'shipping_amount', 'taxes_amount', 'shipping_method', 'customer_notes'); each item has 'sku', 'quantity' and optionally 'unit_price', 'discount_amount', 'taxes_amount', 'notes'.
+        status (SaleOrderStatus, optional): Initial status of the orders. Defaults to the CONFIRMED status when confirming.
+        confirm (bool, optional): Confirm the orders, taking their items out of stock. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: 'created', the created sale orders, and 'errors', a mapping of order reference (or position in the batch) to error message.
+    """
+    if confirm and status is None:
+        status = get_sale_order_status(tenant=tenant, name='CONFIRMED')
+
+    documents = set()
+    emails = set()
+    skus = set()
+    references = set()
+    for order_data in orders_data:
+        if order_data.get('customer_document'):
+            documents.add(str(order_data['customer_document']).strip())
+        if order_data.get('customer_email'):
+            emails.add(_ingestion_key(order_data['customer_email']))
+        if order_data.get('reference'):
+            references.add(str(order_data['reference']).strip())
+        skus.update(str(item_data.get('sku', '')).strip() for item_data in order_data.get('items') or [])
+
+    customers_by_document = {}
+    customers_by_email = {}
+    customers = Customer.objects.live().annotate(email_key=Lower('email')).filter(
+        models.Q(cpf__in=documents) | models.Q(cnpj__in=documents) | models.Q(email_key__in=emails),
+        tenant=tenant
+    ).order_by('pk')
+    if confirm:
+        customers = customers.select_for_update()
+    for customer in customers:
+        for document in (customer.cpf, customer.cnpj):
+            if document:
+                customers_by_document.setdefault(document, customer)
+        if customer.email_key:
+            customers_by_email.setdefault(customer.email_key, customer)
+
+    products = Product.objects.live().filter(tenant=tenant, sku__in=skus)
+    if confirm:
+        products = products.select_for_update().order_by('pk')
+    products_by_sku = {product.sku: product for product in products}
+    available = {product.pk: product.stock_quantity for product in products_by_sku.values()}
+
+    existing_references = set(
+        SaleOrder.objects.filter(tenant=tenant, external_reference__in=references).values_list('external_reference', flat=True)
+    )
+
+    now = timezone.now()
+    pending = []
+    errors = {}
+    exposure_deltas: Dict[int, Decimal] = {}
+    for position, order_data in enumerate(orders_data):
+        reference = str(order_data.get('reference') or '').strip() or None
+        key = reference or position
+        try:
+            if reference is not None and reference in existing_references:
+                raise SaleOrderError("Sale order {} was already imported.".format(reference))
+
+            customer = customers_by_document.get(str(order_data.get('customer_document') or '').strip())
+            if customer is None:
+                customer = customers_by_email.get(_ingestion_key(order_data.get('customer_email')))
+            if customer is None:
+                raise SaleOrderError("Customer not found.")
+
+            items_data = []
+            for item_data in order_data.get('items') or []:
+                sku = str(item_data.get('sku', '')).strip()
+                if sku not in products_by_sku:
+                    raise SaleOrderError("Product with SKU {} not found.".format(sku))
+                items_data.append({**item_data, 'product': products_by_sku[sku]})
+            if not items_data:
+                raise SaleOrderError("A sale order must have at least one item.")
+
+            sale_order = SaleOrder(
+                tenant=tenant,
+                customer=customer,
+                status=status,
+                payment_method=order_data.get('payment_method', SaleOrder.PaymentMethod.CASH),
+                discount_amount=_to_amount(order_data.get('discount_amount')),
+                shipping_amount=_to_amount(order_data.get('shipping_amount')),
+                taxes_amount=_to_amount(order_data.get('taxes_amount')),
+                shipping_method=order_data.get('shipping_method', None),
+                customer_notes=order_data.get('customer_notes', None),
+                external_reference=reference,
+                confirmed_at=now if confirm else None
+            )
+            items = _build_sale_order_items(tenant=tenant, sale_order=sale_order, items_data=items_data)
+            _apply_sale_order_totals(sale_order, items)
+
+            if confirm:
+                added_exposure = exposure_deltas.get(customer.pk, Decimal('0.00')) + sale_order.total_amount
+                if not check_customer_credit(customer=customer, amount=added_exposure):
+                    raise SaleOrderError("Credit limit exceeded for customer {}.".format(customer.name))
+                required = {}
+                for item in items:
+                    required[item.product.pk] = required.get(item.product.pk, Decimal('0')) + item.quantity
+                shortages = [item.product.name for item in items if available[item.product.pk] < required[item.product.pk]]
+                if shortages:
+                    raise SaleOrderError("Insufficient stock for product {}".format(', '.join(dict.fromkeys(shortages))))
+                for product_id, quantity in required.items():
+                    available[product_id] -= quantity
+        except SaleOrderError as error:
+            errors[key] = str(error)
+            continue
+        except (KeyError, ArithmeticError) as error:
+            errors[key] = "Invalid order data: {!r}".format(error)
+            continue
+
+        exposure_deltas[customer.pk] = exposure_deltas.get(customer.pk, Decimal('0.00')) + sale_order.total_amount
+        if reference is not None:
+            existing_references.add(reference)
+        pending.append((sale_order, items))
+
+    if not pending:
+        return {'created': [], 'errors': errors}
+
+    sale_orders = SaleOrder.objects.bulk_create([sale_order for sale_order, _ in pending])
+    adjust_customer_exposure(exposure_deltas)
+    if confirm:
+        _update_customer_order_metrics(orders=sale_orders)
+    items = []
+    for sale_order, order_items in pending:
+        for item in order_items:
+            item.sale_order = sale_order
+            items.append(item)
+    SaleOrderItem.objects.bulk_create(items)
+    schedule_supply_projections_invalidation(tenant.id, {item.product.id for item in items})
+
+    if status is not None:
+        SaleOrderHistory.objects.bulk_create([
+            SaleOrderHistory(sale_order=sale_order, status=status, changed_by=user)
+            for sale_order in sale_orders
+        ])
+
+    if confirm:
+        _create_stock_movements(
+            tenant=tenant,
+            user=user,
+            movements_data=[
+                {
+                    'product': item.product,
+                    'direction': StockMovement.MovementDirection.OUT,
+                    'quantity': item.quantity,
+                    'source_document': item,
+                    'unit_price': item.unit_price,
+                    'notes': f"Pedido de venda #{item.sale_order.id} - {item.product.name}"
+                }
+                for item in items
+            ]
+        )
+
+    return {'created': sale_orders, 'errors': errors}
+
+
+@transaction.atomic
+def refresh_sales_summary_days(*, tenant: Tenant, days: Iterable[date]) -> None:
+    """
+    Recompute the daily sales summaries of a tenant for the given days.
+
+    Sales are the confirmed, non-canceled orders, dated by their confirmation
+    day. Each summary table is rebuilt for those days with one grouped
+    aggregate query, one DELETE and one bulk INSERT.
+
+    Args:
+        tenant (Tenant): The tenant whose summaries are refreshed.
+        days (Iterable[date]): The days to recompute.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+
+    orders = SaleOrder.objects.live().filter(
+        tenant=tenant,
+        confirmed_at__isnull=False,
+        confirmed_at__date__in=days
+    ).annotate(date=TruncDate('confirmed_at'))
+
+    product_rows = SaleOrderItem.objects.filter(
+        sale_order__in=orders.values('pk')
+    ).annotate(date=TruncDate('sale_order__confirmed_at')).values('date', 'product_id').annotate(
+        order_count=models.Count('sale_order', distinct=True),
+        quantity=models.Sum('quantity'),
+        revenue=models.Sum('total_amount')
+    ).order_by()
+    customer_rows = orders.values('date', 'customer_id').annotate(
+        order_count=models.Count('pk'),
+        revenue=models.Sum('total_amount')
+    ).order_by()
+    salesperson_rows = orders.values('date', 'salesperson_id').annotate(
+        order_count=models.Count('pk'),
+        revenue=models.Sum('total_amount')
+    ).order_by()
+
+    for summary_model, rows in (
+        (SaleDailyProductSummary, product_rows),
+        (SaleDailyCustomerSummary, customer_rows),
+        (SaleDailySalespersonSummary, salesperson_rows),
+    ):
+        summaries = [summary_model(tenant=tenant, **row) for row in rows]
+        summary_model.objects.filter(tenant=tenant, date__in=days).delete()
+        summary_model.objects.bulk_create(summaries, batch_size=1000)
+
+
+def refresh_sales_summaries(*, tenant: Tenant, full: bool = False, days_per_pass: int = 31) -> int:
+    """
+    Bring the daily sales summaries of a tenant up to date.
+
+    Only the days touched by orders changed since the previous run (the
+    watermark) are recomputed; `full` recomputes every day with sales.
+
+    Args:
+        tenant (Tenant): The tenant whose summaries are refreshed.
+        full (bool, optional): Ignore the watermark. Defaults to False.
+        days_per_pass (int, optional): Number of days recomputed per transaction. Defaults to 31.
+
+    Returns:
+        int: The number of days recomputed.
+    """
+    state, _ = SaleSummaryRefresh.objects.get_or_create(tenant=tenant)
+    started_at = timezone.now()
+
+    changed = SaleOrder.objects.filter(tenant=tenant, confirmed_at__isnull=False)
+    if state.refreshed_until is not None and not full:
+        changed = changed.filter(updated_at__gte=state.refreshed_until - SUMMARY_REFRESH_OVERLAP)
+    days = sorted(set(changed.annotate(date=TruncDate('confirmed_at')).values_list('date', flat=True).order_by()))
+
+    for start in range(0, len(days), days_per_pass):
+        refresh_sales_summary_days(tenant=tenant, days=days[start:start + days_per_pass])
+
+    state.refreshed_until = started_at
+    state.save(update_fields=['refreshed_until', 'updated_at'])
+    return len(days)
+
+
+def rebuild_customer_metrics(*, tenant: Tenant, batch_size: int = 1000) -> int:
+    """
+    Recompute the order metrics of every customer of a tenant from its sale orders.
+
+    Customers are walked in primary key order, one batch per transaction and
+    one UPDATE per batch, so the rebuild streams over any number of customers.
+    Only confirmed, non-canceled orders count.
+
+    Args:
+        tenant (Tenant): The tenant whose customers are rebuilt.
+        batch_size (int, optional): Number of customers updated per statement. Defaults to 1000.
+
+    Returns:
+        int: The number of customers updated.
+    """
+    orders = SaleOrder.objects.live().filter(
+        customer=models.OuterRef('pk'),
+        confirmed_at__isnull=False
+    ).order_by().values('customer')
+
+    def aggregate(expression):
+        return models.Subquery(orders.annotate(value=expression).values('value'))
+
+    values = {
+        'order_count': Coalesce(aggregate(models.Count('pk')), 0),
+        'lifetime_revenue': Coalesce(aggregate(models.Sum('total_amount')), Decimal('0.00'), output_field=models.DecimalField(max_digits=14, decimal_places=2)),
+        'last_order_at': aggregate(models.Max('confirmed_at')),
+    }
+
+    updated = 0
+    last_id = 0
+    while True:
+        customer_ids = list(
+            Customer.objects.filter(tenant=tenant, pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not customer_ids:
+            return updated
+        with transaction.atomic():
+            updated += Customer.objects.filter(pk__in=customer_ids).update(**values)
+        last_id = customer_ids[-1]
+
+
+def get_top_customers_by_revenue(*, tenant: Tenant, days: int = 90, limit: int = 50) -> List[Customer]:
+    """
+    Return the customers with the highest revenue over the last days.
+
+    The ranking is read from the daily customer summaries, so it reflects the
+    last summary refresh and never scans the orders themselves.
+
+    Args:
+        tenant (Tenant): The tenant whose customers are ranked.
+        days (int, optional): Length of the period, ending today. Defaults to 90.
+        limit (int, optional): Maximum number of customers returned. Defaults to 50.
+
+    Returns:
+        List[Customer]: The customers, best first, annotated with `period_revenue` and `period_order_count`.
+    """
+    ranking = list(
+        SaleDailyCustomerSummary.objects.filter(
+            tenant=tenant,
+            date__gt=timezone.localdate() - timedelta(days=days)
+        ).values('customer_id').annotate(
+            period_revenue=models.Sum('revenue'),
+            period_order_count=models.Sum('order_count')
+        ).order_by('-period_revenue', 'customer_id')[:limit]
+    )
+    customers = Customer.objects.live().in_bulk([row['customer_id'] for row in ranking])
+
+    ranked = []
+    for row in ranking:
+        customer = customers.get(row['customer_id'])
+        if customer is not None:
+            customer.period_revenue = row['period_revenue']
+            customer.period_order_count = row['period_order_count']
+            ranked.append(customer)
+    return ranked
+
+
+def compact_sale_order_history(*, tenant: Tenant, older_than_days: int = 180, batch_size: int = 500) -> int:
+    """
+    Move the history of closed sale orders out of the hot history table.
+
+    Closed orders are the confirmed or canceled ones left untouched for the
+    given number of days; their history rows are appended to a per-order
+    JSON archive in batches. History recorded after compaction stays hot
+    until the next run.
+
+    Args:
+        tenant (Tenant): The tenant whose orders are compacted.
+        older_than_days (int, optional): Minimum age, in days since the last update, of the orders compacted. Defaults to 180.
+        batch_size (int, optional): Number of orders compacted per transaction. Defaults to 500.
+
+    Returns:
+        int: The number of history rows archived.
+    """
+    closed = SaleOrder.objects.filter(
+        models.Q(confirmed_at__isnull=False) | models.Q(deleted_at__isnull=False),
+        tenant=tenant,
+        updated_at__lt=timezone.now() - timedelta(days=older_than_days)
+    )
+    return compact_history(
+        owners=closed,
+        history_model=SaleOrderHistory,
+        archive_model=SaleOrderHistoryArchive,
+        owner_field='sale_order',
+        batch_size=batch_size
+    )
+
+
+def get_sale_order_history(*, sale_order: SaleOrder) -> List[SaleOrderHistory]:
+    """
+    Return the full history of a sale order, newest first, whether archived or not.
+    """
+    return read_history(owner=sale_order, history_model=SaleOrderHistory, archive_model=SaleOrderHistoryArchive, owner_field='sale_order')
@@ -0,0 +1,17 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from tenants.transitions import schedule_transition_tables_invalidation
+
+from .models import SaleOrderStatus
+
+
+@receiver(post_save, sender=SaleOrderStatus)
+@receiver(post_delete, sender=SaleOrderStatus)
+def invalidate_transitions_on_status_change(sender, instance, **kwargs):
+    schedule_transition_tables_invalidation(SaleOrderStatus, instance.tenant_id)
+
+
+@receiver(m2m_changed, sender=SaleOrderStatus.next_statuses.through)
+def invalidate_transitions_on_next_statuses_change(sender, instance, **kwargs):
+    schedule_transition_tables_invalidation(SaleOrderStatus, instance.tenant_id)
@@ -0,0 +1,431 @@
+from decimal import Decimal
+
+import pytest
+
+from customers.models import Customer
+from inventory.models import StockMovement
+from inventory.services import InventoryError
+from products.models import Product
+from sales.models import (SaleDailyCustomerSummary, SaleDailyProductSummary,
+                          SaleOrder, SaleOrderHistory, SaleOrderHistoryArchive,
+                          SaleOrderStatus)
+from sales.services import (SaleOrderError, cancel_sale_order,
+                            cancel_sale_orders, compact_sale_order_history,
+                            confirm_sale_order, create_sale_order,
+                            get_sale_order_history,
+                            get_top_customers_by_revenue, ingest_sale_orders,
+                            rebuild_customer_metrics,
+                            recalculate_sale_order_totals,
+                            refresh_sales_summaries, transition_sale_orders,
+                            update_sale_order_items)
+from tenants.models import Tenant
+from users.models import User
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(email="user@test.com", password="123456", name="User Test")
+
+
+@pytest.fixture
+def customer(db, tenant):
+    return Customer.objects.create(tenant=tenant, name="Cliente Teste")
+
+
+@pytest.fixture
+def product(db, tenant):
+    return Product.objects.create(
+        tenant=tenant,
+        name="Produto Teste",
+        stock_quantity=10,
+        sku="SKU001",
+        price=Decimal("20.00")
+    )
+
+
+@pytest.fixture
+def open_status(db, tenant):
+    return SaleOrderStatus.objects.create(tenant=tenant, name="OPEN", label="Aberto", sequence_order=1)
+
+
+def test_create_sale_order_computes_line_and_order_totals(tenant, user, customer, product, open_status):
+    sale_order = create_sale_order(
+        tenant=tenant,
+        customer=customer,
+        user=user,
+        status=open_status,
+        shipping_amount=Decimal("15.00"),
+        discount_amount=Decimal("5.00"),
+        items_data=[
+            {"product": product, "quantity": Decimal("3")},
+            {"product": product, "quantity": Decimal("1.5"), "unit_price": Decimal("9.99"),
+             "discount_amount": Decimal("1.00"), "taxes_amount": Decimal("0.50")},
+        ]
+    )
+
+    lines = list(sale_order.items.values_list("unit_price", "total_amount"))
+    assert lines == [(Decimal("20.00"), Decimal("60.00")), (Decimal("9.99"), Decimal("14.49"))]
+    sale_order.refresh_from_db()
+    assert sale_order.subtotal_amount == Decimal("74.49")
+    assert sale_order.total_amount == Decimal("84.49")
+    assert SaleOrderHistory.objects.get(sale_order=sale_order).status == open_status
+
+
+def test_create_sale_order_uses_constant_number_of_queries(
+    tenant, user, customer, product, open_status, django_assert_max_num_queries
+):
+    with django_assert_max_num_queries(6):
+        sale_order = create_sale_order(
+            tenant=tenant,
+            customer=customer,
+            user=user,
+            status=open_status,
+            items_data=[{"product": product, "quantity": Decimal("1")} for _ in range(50)]
+        )
+
+    assert sale_order.items.count() == 50
+    assert sale_order.total_amount == Decimal("1000.00")
+
+
+def test_create_sale_order_rejects_invalid_quantity(tenant, user, customer, product):
+    with pytest.raises(SaleOrderError, match="Quantity must be greater than zero."):
+        create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 0}])
+
+    assert not SaleOrder.objects.exists()
+
+
+def test_update_sale_order_items_replaces_lines(tenant, user, customer, product):
+    sale_order = create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 1}])
+
+    update_sale_order_items(tenant=tenant, sale_order=sale_order, items_data=[{"product": product, "quantity": 2}])
+
+    sale_order.refresh_from_db()
+    assert sale_order.items.count() == 1
+    assert sale_order.total_amount == Decimal("40.00")
+
+
+def test_recalculate_sale_order_totals_repairs_stale_amounts(tenant, user, customer, product, confirmed_status):
+    sale_order = create_sale_order(
+        tenant=tenant,
+        customer=customer,
+        user=user,
+        shipping_amount=Decimal("10.00"),
+        items_data=[{"product": product, "quantity": 2}]
+    )
+    sale_order.items.update(quantity=Decimal("3"), total_amount=0)
+    SaleOrder.objects.filter(pk=sale_order.pk).update(subtotal_amount=0, total_amount=0)
+
+    assert recalculate_sale_order_totals(sale_orders=SaleOrder.objects.filter(tenant=tenant)) == 1
+
+    sale_order.refresh_from_db()
+    assert sale_order.items.get().total_amount == Decimal("60.00")
+    assert sale_order.subtotal_amount == Decimal("60.00")
+    assert sale_order.total_amount == Decimal("70.00")
+
+    # The lifetime revenue of the customer follows the totals of its confirmed orders.
+    confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+    sale_order.items.update(quantity=Decimal("1"))
+    recalculate_sale_order_totals(sale_orders=SaleOrder.objects.filter(pk=sale_order.pk))
+    customer.refresh_from_db()
+    assert customer.lifetime_revenue == Decimal("30.00")
+
+
+@pytest.fixture
+def confirmed_status(db, tenant):
+    return SaleOrderStatus.objects.create(tenant=tenant, name="CONFIRMED", label="Confirmado", sequence_order=2)
+
+
+def test_confirm_sale_order_posts_outbound_stock_for_all_items(
+    tenant, user, customer, product, open_status, confirmed_status
+):
+    other_product = Product.objects.create(tenant=tenant, name="Outro", sku="SKU002", stock_quantity=5)
+    sale_order = create_sale_order(
+        tenant=tenant,
+        customer=customer,
+        user=user,
+        status=open_status,
+        items_data=[
+            {"product": product, "quantity": Decimal("4")},
+            {"product": other_product, "quantity": Decimal("5")},
+            {"product": product, "quantity": Decimal("6")},
+        ]
+    )
+
+    confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    product.refresh_from_db()
+    other_product.refresh_from_db()
+    assert product.stock_quantity == Decimal("0")
+    assert other_product.stock_quantity == Decimal("0")
+
+    movements = StockMovement.objects.filter(direction=StockMovement.MovementDirection.OUT).order_by("id")
+    assert [m.source_document for m in movements] == list(sale_order.items.all())
+    assert [m.new_stock for m in movements] == [Decimal("6"), Decimal("0"), Decimal("0")]
+
+    sale_order.refresh_from_db()
+    assert sale_order.status == confirmed_status
+    assert sale_order.confirmed_at is not None
+    assert sale_order.history.filter(status=confirmed_status).exists()
+
+    with pytest.raises(SaleOrderError, match="already confirmed"):
+        confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+
+def test_confirm_sale_order_with_insufficient_stock_changes_nothing(
+    tenant, user, customer, product, confirmed_status
+):
+    sale_order = create_sale_order(
+        tenant=tenant,
+        customer=customer,
+        user=user,
+        items_data=[{"product": product, "quantity": Decimal("8")}, {"product": product, "quantity": Decimal("8")}]
+    )
+
+    with pytest.raises(InventoryError, match="Insufficient stock"):
+        confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    product.refresh_from_db()
+    sale_order.refresh_from_db()
+    assert product.stock_quantity == Decimal("10")
+    assert sale_order.confirmed_at is None
+    assert not StockMovement.objects.exists()
+
+
+@pytest.fixture
+def canceled_status(db, tenant):
+    return SaleOrderStatus.objects.create(tenant=tenant, name="CANCELED", label="Cancelado", sequence_order=9)
+
+
+def test_cancel_sale_order_reverses_outbound_stock(
+    tenant, user, customer, product, confirmed_status, canceled_status
+):
+    sale_order = create_sale_order(
+        tenant=tenant,
+        customer=customer,
+        user=user,
+        items_data=[{"product": product, "quantity": Decimal("3")}, {"product": product, "quantity": Decimal("2")}]
+    )
+    confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    cancel_sale_order(tenant=tenant, sale_order=sale_order, user=user, notes="Cliente desistiu")
+
+    product.refresh_from_db()
+    assert product.stock_quantity == Decimal("10")
+    reversals = StockMovement.objects.filter(direction=StockMovement.MovementDirection.IN).order_by("id")
+    assert [(m.source_document, m.quantity) for m in reversals] == [
+        (item, item.quantity) for item in sale_order.items.all()
+    ]
+    assert sale_order.status == canceled_status
+    assert sale_order.deleted_at is not None
+    assert sale_order.history.filter(status=canceled_status, notes="Cliente desistiu").exists()
+
+    with pytest.raises(SaleOrderError, match="already canceled"):
+        cancel_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+
+def test_cancel_sale_order_keeps_average_cost(
+    tenant, user, customer, product, confirmed_status, canceled_status
+):
+    Product.objects.filter(pk=product.pk).update(avg_cost_price=Decimal("5.00"))
+    sale_order = create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 3}])
+    confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    cancel_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    product.refresh_from_db()
+    assert product.stock_quantity == Decimal("10")
+    assert product.avg_cost_price == Decimal("5.00")
+
+
+def test_cancel_sale_orders_in_chunks_skips_unconfirmed_stock_and_canceled_orders(
+    tenant, user, customer, product, confirmed_status, canceled_status
+):
+    orders = [
+        create_sale_order(tenant=tenant, customer=customer, user=user, items_data=[{"product": product, "quantity": 1}])
+        for _ in range(5)
+    ]
+    confirm_sale_order(tenant=tenant, sale_order=orders[0], user=user)
+    cancel_sale_order(tenant=tenant, sale_order=orders[4], user=user)
+
+    canceled = cancel_sale_orders(tenant=tenant, sale_orders=SaleOrder.objects.all(), user=user, chunk_size=2)
+
+    assert canceled == 4
+    assert not SaleOrder.objects.live().exists()
+    product.refresh_from_db()
+    assert product.stock_quantity == Decimal("10")
+    assert StockMovement.objects.filter(direction=StockMovement.MovementDirection.IN).count() == 1
+
+
+def test_refresh_sales_summaries_recomputes_only_changed_days(
+    tenant, user, customer, product, confirmed_status, canceled_status
+):
+    orders = [
+        create_sale_order(
+            tenant=tenant,
+            customer=customer,
+            user=user,
+            items_data=[{"product": product, "quantity": Decimal("2"), "unit_price": Decimal("10")}]
+        )
+        for _ in range(3)
+    ]
+    for sale_order in orders[:2]:
+        confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    assert refresh_sales_summaries(tenant=tenant) == 1
+    product_summary = SaleDailyProductSummary.objects.get(tenant=tenant, product=product)
+    assert (product_summary.order_count, product_summary.quantity) == (2, Decimal("4"))
+    assert product_summary.revenue == Decimal("40")
+    assert SaleDailyCustomerSummary.objects.get(tenant=tenant, customer=customer).revenue == Decimal("40")
+
+    cancel_sale_order(tenant=tenant, sale_order=orders[0], user=user)
+    refresh_sales_summaries(tenant=tenant)
+
+    product_summary = SaleDailyProductSummary.objects.get(tenant=tenant, product=product)
+    assert (product_summary.order_count, product_summary.revenue) == (1, Decimal("20"))
+
+    cancel_sale_order(tenant=tenant, sale_order=orders[1], user=user)
+    refresh_sales_summaries(tenant=tenant)
+    assert not SaleDailyProductSummary.objects.exists()
+
+
+def test_ingest_sale_orders_isolates_failing_orders(
+    tenant, user, customer, product, confirmed_status, django_assert_max_num_queries
+):
+    customer.cpf = "123.456.789-00"
+    customer.save()
+    other_customer = Customer.objects.create(tenant=tenant, name="Maria", email="maria@example.com")
+    other_product = Product.objects.create(tenant=tenant, name="Outro", sku="SKU002", stock_quantity=100)
+    orders_data = [
+        {
+            "reference": "MKT-{}".format(number),
+            "customer_document": "123.456.789-00",
+            "shipping_amount": "5.00",
+            "items": [{"sku": "SKU002", "quantity": 1, "unit_price": "10.00"}],
+        }
+        for number in range(50)
+    ]
+    orders_data += [
+        {"reference": "MKT-A", "customer_email": "MARIA@example.com", "items": [{"sku": "SKU001", "quantity": 6}]},
+        {"reference": "MKT-B", "customer_email": "maria@example.com", "items": [{"sku": "SKU001", "quantity": 6}]},
+        {"reference": "MKT-C", "customer_email": "nobody@example.com", "items": [{"sku": "SKU001", "quantity": 1}]},
+        {"reference": "MKT-D", "customer_email": "maria@example.com", "items": [{"sku": "MISSING", "quantity": 1}]},
+        {"reference": "MKT-0", "customer_email": "maria@example.com", "items": [{"sku": "SKU002", "quantity": 1}]},
+    ]
+
+    with django_assert_max_num_queries(17):
+        result = ingest_sale_orders(tenant=tenant, user=user, orders_data=orders_data, confirm=True)
+
+    assert len(result["created"]) == 51
+    assert set(result["errors"]) == {"MKT-B", "MKT-C", "MKT-D", "MKT-0"}
+    assert "Insufficient stock" in result["errors"]["MKT-B"]
+
+    product.refresh_from_db()
+    other_product.refresh_from_db()
+    assert product.stock_quantity == Decimal("4")
+    assert other_product.stock_quantity == Decimal("50")
+
+    marketplace_order = SaleOrder.objects.get(external_reference="MKT-7")
+    assert marketplace_order.customer == customer
+    assert marketplace_order.total_amount == Decimal("15.00")
+    assert marketplace_order.confirmed_at is not None
+    assert SaleOrder.objects.get(external_reference="MKT-A").customer == other_customer
+    assert SaleOrderHistory.objects.filter(status=confirmed_status).count() == 51
+    assert StockMovement.objects.filter(direction=StockMovement.MovementDirection.OUT).count() == 51
+
+    retry = ingest_sale_orders(tenant=tenant, user=user, orders_data=orders_data[:1])
+    assert retry["created"] == [] and "already imported" in retry["errors"]["MKT-0"]
+
+
+def test_transition_sale_orders_moves_batch_with_constant_queries(
+    tenant, user, customer, product, open_status, confirmed_status, django_assert_max_num_queries
+):
+    shipped_status = SaleOrderStatus.objects.create(tenant=tenant, name="SHIPPED", label="Enviado", sequence_order=5)
+    orders = [
+        create_sale_order(tenant=tenant, customer=customer, user=user, status=confirmed_status, items_data=[{"product": product, "quantity": 1}])
+        for _ in range(20)
+    ]
+    transition_sale_orders(
+        tenant=tenant, sale_orders=SaleOrder.objects.filter(pk=orders[0].pk), status=shipped_status, user=user
+    )
+
+    with django_assert_max_num_queries(5):
+        moved = transition_sale_orders(
+            tenant=tenant, sale_orders=SaleOrder.objects.all(), status=shipped_status, user=user, notes="Expedição"
+        )
+
+    assert moved == 19
+    assert SaleOrder.objects.filter(status=shipped_status).count() == 20
+    assert SaleOrderHistory.objects.filter(status=shipped_status, notes="Expedição").count() == 19
+
+    with pytest.raises(SaleOrderError, match="cannot move to status OPEN"):
+        transition_sale_orders(tenant=tenant, sale_orders=SaleOrder.objects.all(), status=open_status, user=user)
+    with pytest.raises(SaleOrderError, match="by their own service"):
+        transition_sale_orders(tenant=tenant, sale_orders=SaleOrder.objects.all(), status=confirmed_status, user=user)
+    assert not SaleOrder.objects.exclude(status=shipped_status).exists()
+
+
+def test_customer_order_metrics_follow_confirmations_and_cancellations(
+    tenant, user, customer, product, confirmed_status, canceled_status
+):
+    other_customer = Customer.objects.create(tenant=tenant, name="Maria")
+    orders = [
+        create_sale_order(
+            tenant=tenant,
+            customer=order_customer,
+            user=user,
+            items_data=[{"product": product, "quantity": 1, "unit_price": Decimal(price)}]
+        )
+        for order_customer, price in ((customer, "10.00"), (customer, "25.00"), (other_customer, "5.00"))
+    ]
+    for sale_order in orders:
+        confirm_sale_order(tenant=tenant, sale_order=sale_order, user=user)
+
+    customer.refresh_from_db()
+    assert (customer.order_count, customer.lifetime_revenue) == (2, Decimal("35.00"))
+    assert customer.last_order_at == SaleOrder.objects.get(pk=orders[1].pk).confirmed_at
+
+    cancel_sale_order(tenant=tenant, sale_order=orders[1], user=user)
+
+    customer.refresh_from_db()
+    assert (customer.order_count, customer.lifetime_revenue) == (1, Decimal("10.00"))
+    assert customer.last_order_at == SaleOrder.objects.get(pk=orders[0].pk).confirmed_at
+
+    Customer.objects.update(order_count=0, lifetime_revenue=0, last_order_at=None)
+    assert rebuild_customer_metrics(tenant=tenant, batch_size=1) == 2
+    customer.refresh_from_db()
+    other_customer.refresh_from_db()
+    assert (customer.order_count, customer.lifetime_revenue) == (1, Decimal("10.00"))
+    assert (other_customer.order_count, other_customer.lifetime_revenue) == (1, Decimal("5.00"))
+
+    refresh_sales_summaries(tenant=tenant)
+    ranking = get_top_customers_by_revenue(tenant=tenant, days=90)
+    assert ranking == [customer, other_customer]
+    assert ranking[0].period_revenue == Decimal("10.00")
+
+
+def test_compact_sale_order_history_archives_closed_orders_and_keeps_reader_complete(
+    tenant, user, customer, product, open_status, confirmed_status
+):
+    closed_order = create_sale_order(tenant=tenant, customer=customer, user=user, status=open_status, items_data=[{"product": product, "quantity": 1}])
+    confirm_sale_order(tenant=tenant, sale_order=closed_order, user=user, notes="Pago")
+    open_order = create_sale_order(tenant=tenant, customer=customer, user=user, status=open_status, items_data=[{"product": product, "quantity": 1}])
+    history_before = [(entry.status_id, entry.notes, entry.created_at) for entry in get_sale_order_history(sale_order=closed_order)]
+
+    assert compact_sale_order_history(tenant=tenant, older_than_days=0, batch_size=1) == 2
+
+    assert not SaleOrderHistory.objects.filter(sale_order=closed_order).exists()
+    assert SaleOrderHistory.objects.filter(sale_order=open_order).count() == 1
+    assert SaleOrderHistoryArchive.objects.get(sale_order=closed_order).entry_count == 2
+    history_after = get_sale_order_history(sale_order=closed_order)
+    assert [(entry.status_id, entry.notes, entry.created_at) for entry in history_after] == history_before
+    assert history_after[0].status == confirmed_status
+
+    SaleOrderHistory.objects.create(sale_order=closed_order, status=confirmed_status, changed_by=user, notes="Reenvio")
+    assert compact_sale_order_history(tenant=tenant, older_than_days=0) == 1
+    assert SaleOrderHistoryArchive.objects.get(sale_order=closed_order).entry_count == 3
+    assert get_sale_order_history(sale_order=closed_order)[0].notes == "Reenvio"
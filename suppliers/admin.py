@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Supplier, SupplierProduct
+from .models import ProductBestOffer, Supplier, SupplierProduct
 
 
 @admin.register(Supplier)
@@ -38,3 +38,25 @@ class SupplierProductAdmin(admin.ModelAdmin):
     ordering = ('-created_at',)
     list_per_page = 20
     date_hierarchy = 'created_at'
+
+
+@admin.register(ProductBestOffer)
+class ProductBestOfferAdmin(admin.ModelAdmin):
+    list_display = (
+        'product',
+        'supplier',
+        'cost_price',
+        'lead_time_days',
+        'offer_count',
+        'tenant',
+        'updated_at',
+    )
+    search_fields = ('product__name', 'product__sku', 'supplier__name')
+    list_filter = ('tenant',)
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,47 @@
+import csv
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from suppliers.models import Supplier
+from suppliers.services import SupplierError, import_supplier_price_list
+
+
+class Command(BaseCommand):
+    help = "Import a supplier's price list from a CSV or JSON Lines file, creating or updating its offers by supplier code."
+
+    def add_arguments(self, parser):
+        parser.add_argument('supplier', type=int, help='Supplier id whose price list is imported.')
+        parser.add_argument('path', help='Path of the file to import (columns supplier_code, sku, cost_price).')
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], default=None,
+                            help='File format. Guessed from the extension when omitted.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            supplier = Supplier.objects.select_related('tenant').get(pk=options['supplier'])
+        except Supplier.DoesNotExist:
+            raise CommandError('Supplier {} does not exist.'.format(options['supplier']))
+
+        path = options['path']
+        file_format = options['file_format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+
+        started = time.monotonic()
+        with open(path, newline='', encoding='utf-8') as stream:
+            if file_format == 'csv':
+                rows = csv.DictReader(stream)
+            else:
+                rows = (json.loads(line) for line in stream if line.strip())
+            try:
+                stats = import_supplier_price_list(tenant=supplier.tenant, supplier=supplier, rows=rows, batch_size=options['batch_size'])
+            except SupplierError as error:
+                raise CommandError(str(error))
+        elapsed = time.monotonic() - started
+
+        total = stats['created'] + stats['updated']
+        self.stdout.write(self.style.SUCCESS(
+            'Imported {} offers ({} created, {} updated) in {:.1f}s ({:.0f} rows/s).'.format(
+                total, stats['created'], stats['updated'], elapsed, total / elapsed if elapsed else total
+            )
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from suppliers.services import rebuild_best_offers
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the best supplier offer of every product.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=int, help='Only rebuild the products of this tenant id.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant'] is not None:
+            try:
+                tenant = Tenant.objects.get(pk=options['tenant'])
+            except Tenant.DoesNotExist:
+                raise CommandError('Tenant {} does not exist.'.format(options['tenant']))
+
+        processed = rebuild_best_offers(tenant=tenant, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt best offers for {} products.'.format(processed)))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0001_initial'),
+        ('suppliers', '0002_supplierproduct'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', True)), fields=['tenant', 'name'], name='supplier_live_idx'),
+        ),
+    ]
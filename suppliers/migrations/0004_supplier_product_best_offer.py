@@ -0,0 +1,115 @@
+# Generated by Django 5.2.3 on 2026-10-19 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import RowNumber
+
+
+def clear_duplicate_supplier_codes(apps, schema_editor):
+    """
+    Make supplier codes unique per supplier before the constraint is added:
+    blank codes become NULL, and of the offers sharing a code the oldest
+    keeps it while the others lose it.
+    """
+    SupplierProduct = apps.get_model('suppliers', 'SupplierProduct')
+
+    SupplierProduct.objects.filter(supplier_code='').update(supplier_code=None)
+    duplicates = SupplierProduct.objects.filter(supplier_code__isnull=False).values('supplier_id', 'supplier_code').annotate(
+        count=models.Count('pk'),
+        first=models.Min('pk')
+    ).filter(count__gt=1).order_by()
+    for row in duplicates:
+        SupplierProduct.objects.filter(
+            supplier_id=row['supplier_id'],
+            supplier_code=row['supplier_code']
+        ).exclude(pk=row['first']).update(supplier_code=None)
+
+
+def backfill_best_offers(apps, schema_editor):
+    """
+    Compute the best offer of every product with offers, as
+    suppliers.services.refresh_best_offers does.
+    """
+    SupplierProduct = apps.get_model('suppliers', 'SupplierProduct')
+    ProductBestOffer = apps.get_model('suppliers', 'ProductBestOffer')
+
+    rows = SupplierProduct.objects.filter(
+        supplier__deleted_at__isnull=True,
+        supplier__is_active=True
+    ).annotate(
+        rank=models.Window(
+            RowNumber(),
+            partition_by=[models.F('product_id')],
+            order_by=[models.F('cost_price').asc(), models.F('supplier__lead_time_days').asc(nulls_last=True), models.F('pk').asc()]
+        ),
+        offer_count=models.Window(models.Count('pk'), partition_by=[models.F('product_id')])
+    ).filter(rank=1).values_list('pk', 'tenant_id', 'product_id', 'supplier_id', 'cost_price', 'supplier__lead_time_days', 'offer_count')
+
+    ProductBestOffer.objects.bulk_create([
+        ProductBestOffer(
+            tenant_id=tenant_id,
+            product_id=product_id,
+            supplier_id=supplier_id,
+            supplier_product_id=supplier_product_id,
+            cost_price=cost_price,
+            lead_time_days=lead_time_days,
+            offer_count=offer_count
+        )
+        for supplier_product_id, tenant_id, product_id, supplier_id, cost_price, lead_time_days, offer_count in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_product_product_live_idx'),
+        ('suppliers', '0003_supplier_supplier_live_idx'),
+        ('tenants', '0002_alter_tenant_cnpj'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductBestOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cost_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('lead_time_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('offer_count', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Product Best Offer',
+                'verbose_name_plural': 'Product Best Offers',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='supplierproduct',
+            index=models.Index(fields=['tenant', 'product'], name='supplier_product_product_idx'),
+        ),
+        migrations.RunPython(clear_duplicate_supplier_codes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='supplierproduct',
+            constraint=models.UniqueConstraint(fields=('supplier', 'supplier_code'), name='unique_supplier_product_code'),
+        ),
+        migrations.AddField(
+            model_name='productbestoffer',
+            name='product',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='best_offer', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='productbestoffer',
+            name='supplier',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='best_offers', to='suppliers.supplier'),
+        ),
+        migrations.AddField(
+            model_name='productbestoffer',
+            name='supplier_product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='suppliers.supplierproduct'),
+        ),
+        migrations.AddField(
+            model_name='productbestoffer',
+            name='tenant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_best_offers', to='tenants.tenant'),
+        ),
+        migrations.RunPython(backfill_best_offers, migrations.RunPython.noop),
+    ]
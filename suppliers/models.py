@@ -3,6 +3,7 @@ from django.utils import timezone
 
 from locations.models import City
 from products.models import Product
+from tenants.managers import SoftDeleteManager
 from tenants.models import Tenant
 
 
@@ -37,10 +38,15 @@ class Supplier(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     deleted_at = models.DateTimeField(blank=True, null=True)
 
+    objects = SoftDeleteManager()
+
     class Meta:
         verbose_name = 'Supplier'
         verbose_name_plural = 'Suppliers'
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name'], condition=models.Q(deleted_at__isnull=True), name='supplier_live_idx'),
+        ]
 
     def __str__(self):
         return f'{self.name} ({self.tenant.name})'
@@ -64,3 +70,36 @@ class SupplierProduct(models.Model):
     supplier_code = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['supplier', 'supplier_code'], name='unique_supplier_product_code'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'product'], name='supplier_product_product_idx'),
+        ]
+
+
+class ProductBestOffer(models.Model):
+    """
+    The best supplier offer of a product: the lowest cost price, then the
+    shortest lead time, among the offers of live, active suppliers.
+
+    Maintained by suppliers.services.refresh_best_offers whenever offers or
+    suppliers change.
+    """
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='product_best_offers')
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='best_offer')
+    supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, related_name='best_offers')
+    supplier_product = models.ForeignKey(SupplierProduct, on_delete=models.CASCADE, related_name='+')
+    cost_price = models.DecimalField(max_digits=10, decimal_places=2)
+    lead_time_days = models.PositiveIntegerField(blank=True, null=True)
+    offer_count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Product Best Offer'
+        verbose_name_plural = 'Product Best Offers'
+
+    def __str__(self):
+        return f'{self.product.name}: {self.cost_price} ({self.supplier.name})'
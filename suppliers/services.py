@@ -0,0 +1,178 @@
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+
+from django.db import models, transaction
+from django.db.models.functions import RowNumber
+
+from products.models import Product
+from tenants.models import Tenant
+
+from .models import ProductBestOffer, Supplier, SupplierProduct
+
+BEST_OFFER_ORDERING = (
+    models.F('cost_price').asc(),
+    models.F('supplier__lead_time_days').asc(nulls_last=True),
+    models.F('pk').asc(),
+)
+
+
+class SupplierError(Exception):
+    """Custom exception for supplier-related errors."""
+    pass
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def refresh_best_offers(*, product_ids: Iterable[int], batch_size: int = 1000) -> None:
+    """
+    Recompute the best supplier offer of the given products.
+
+    Each batch ranks the offers of live, active suppliers with one windowed
+    query and upserts the winners; products left without offers lose their
+    best offer.
+
+    Args:
+        product_ids (Iterable[int]): Ids of the products to refresh.
+        batch_size (int, optional): Number of products handled per statement. Defaults to 1000.
+    """
+    for chunk in _chunks(sorted(set(product_ids)), batch_size):
+        rows = SupplierProduct.objects.filter(
+            product_id__in=chunk,
+            supplier__deleted_at__isnull=True,
+            supplier__is_active=True
+        ).annotate(
+            rank=models.Window(RowNumber(), partition_by=[models.F('product_id')], order_by=list(BEST_OFFER_ORDERING)),
+            offer_count=models.Window(models.Count('pk'), partition_by=[models.F('product_id')])
+        ).filter(rank=1).values_list('pk', 'tenant_id', 'product_id', 'supplier_id', 'cost_price', 'supplier__lead_time_days', 'offer_count')
+
+        offers = [
+            ProductBestOffer(
+                tenant_id=tenant_id,
+                product_id=product_id,
+                supplier_id=supplier_id,
+                supplier_product_id=supplier_product_id,
+                cost_price=cost_price,
+                lead_time_days=lead_time_days,
+                offer_count=offer_count
+            )
+            for supplier_product_id, tenant_id, product_id, supplier_id, cost_price, lead_time_days, offer_count in rows
+        ]
+        ProductBestOffer.objects.filter(product_id__in=chunk).exclude(product_id__in=[offer.product_id for offer in offers]).delete()
+        ProductBestOffer.objects.bulk_create(
+            offers,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['tenant', 'supplier', 'supplier_product', 'cost_price', 'lead_time_days', 'offer_count', 'updated_at']
+        )
+
+
+def rebuild_best_offers(*, tenant: Tenant = None, batch_size: int = 1000) -> int:
+    """
+    Rebuild the best offer of every product with supplier offers, optionally for a single tenant.
+
+    Returns:
+        int: The number of products processed.
+    """
+    offers = SupplierProduct.objects.all()
+    stale = ProductBestOffer.objects.all()
+    if tenant is not None:
+        offers = offers.filter(tenant=tenant)
+        stale = stale.filter(tenant=tenant)
+    stale.exclude(product_id__in=offers.values('product_id')).delete()
+
+    processed = 0
+    for chunk in _chunks(offers.values_list('product_id', flat=True).distinct().order_by('product_id').iterator(chunk_size=batch_size), batch_size):
+        refresh_best_offers(product_ids=chunk, batch_size=batch_size)
+        processed += len(chunk)
+    return processed
+
+
+def schedule_best_offer_refresh(product_ids: Iterable[int]) -> None:
+    """
+    Refresh the best offers of the given products once the current transaction commits.
+    """
+    product_ids = list(product_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_best_offers(product_ids=product_ids))
+
+
+@transaction.atomic
+def _import_price_list_batch(*, tenant: Tenant, supplier: Supplier, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Upsert one batch of supplier offers with a constant number of queries.
+    """
+    offers_by_code = {}
+    for row in rows:
+        if not row.get('supplier_code') or not row.get('sku'):
+            raise SupplierError("Every price list line needs a supplier code and a SKU: {}".format(row))
+        offers_by_code[str(row['supplier_code'])] = row
+
+    product_ids = dict(Product.objects.filter(tenant=tenant, sku__in={row['sku'] for row in offers_by_code.values()}).values_list('sku', 'id'))
+    missing = {row['sku'] for row in offers_by_code.values()} - product_ids.keys()
+    if missing:
+        raise SupplierError("Products not found: {}".format(', '.join(sorted(missing))))
+
+    existing = dict(
+        SupplierProduct.objects.filter(supplier=supplier, supplier_code__in=list(offers_by_code)).values_list('supplier_code', 'product_id')
+    )
+    SupplierProduct.objects.bulk_create(
+        [
+            SupplierProduct(
+                tenant=tenant,
+                supplier=supplier,
+                supplier_code=supplier_code,
+                product_id=product_ids[row['sku']],
+                cost_price=Decimal(str(row.get('cost_price') or 0))
+            )
+            for supplier_code, row in offers_by_code.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['supplier', 'supplier_code'],
+        update_fields=['product', 'cost_price', 'updated_at']
+    )
+
+    refresh_best_offers(product_ids={*product_ids.values(), *existing.values()})
+    return {'created': len(offers_by_code) - len(existing), 'updated': len(existing)}
+
+
+def import_supplier_price_list(
+    *,
+    tenant: Tenant,
+    supplier: Supplier,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: int = 1000
+) -> Dict[str, int]:
+    """
+    Import a supplier's price list, creating or updating its offers by supplier code.
+
+    Rows are consumed lazily in batches; each batch resolves its products by
+    SKU with one query, is upserted with a single statement and refreshes the
+    best offers of the products it touches. When a code repeats within a
+    batch, its last line wins.
+
+    Args:
+        tenant (Tenant): The tenant owning the supplier and the products.
+        supplier (Supplier): The supplier whose price list is imported.
+        rows (Iterable[Dict[str, Any]]): Lines with 'supplier_code', 'sku' and 'cost_price'.
+        batch_size (int, optional): Number of lines written per batch. Defaults to 1000.
+
+    Returns:
+        Dict[str, int]: Number of offers created and updated.
+    """
+    if supplier.tenant_id != tenant.id:
+        raise SupplierError("Supplier does not belong to this tenant.")
+
+    stats = {'created': 0, 'updated': 0}
+    for batch in _chunks(rows, batch_size):
+        batch_stats = _import_price_list_batch(tenant=tenant, supplier=supplier, rows=batch)
+        stats['created'] += batch_stats['created']
+        stats['updated'] += batch_stats['updated']
+    return stats
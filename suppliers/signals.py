@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ProductBestOffer, Supplier, SupplierProduct
+from .services import schedule_best_offer_refresh
+
+BEST_OFFER_RELEVANT_FIELDS = {'lead_time_days', 'is_active', 'deleted_at'}
+
+
+@receiver(post_save, sender=SupplierProduct)
+def refresh_best_offer_on_supplier_product_change(sender, instance, created=False, **kwargs):
+    product_ids = {instance.product_id}
+    if not created:
+        # The offer may have been the best one of another product.
+        product_ids.update(ProductBestOffer.objects.filter(supplier_product=instance).values_list('product_id', flat=True))
+    schedule_best_offer_refresh(product_ids)
+
+
+@receiver(post_delete, sender=SupplierProduct)
+def refresh_best_offer_on_supplier_product_delete(sender, instance, **kwargs):
+    schedule_best_offer_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Supplier)
+def refresh_best_offers_on_supplier_change(sender, instance, created=False, update_fields=None, **kwargs):
+    if created or (update_fields is not None and not BEST_OFFER_RELEVANT_FIELDS.intersection(update_fields)):
+        return
+    schedule_best_offer_refresh(instance.products.values_list('product_id', flat=True))
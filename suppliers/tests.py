@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pytest
+
+from products.models import Product
+from suppliers.models import ProductBestOffer, Supplier, SupplierProduct
+from suppliers.services import SupplierError, import_supplier_price_list
+from tenants.models import Tenant
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def products(db, tenant):
+    return [
+        Product.objects.create(tenant=tenant, name="Produto {}".format(index), sku="SKU{:03d}".format(index))
+        for index in range(3)
+    ]
+
+
+def test_best_offer_follows_offer_and_supplier_changes(tenant, products, django_capture_on_commit_callbacks):
+    product = products[0]
+    slow = Supplier.objects.create(tenant=tenant, name="Lento", lead_time_days=10)
+    fast = Supplier.objects.create(tenant=tenant, name="Rápido", lead_time_days=2)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        slow_offer = SupplierProduct.objects.create(tenant=tenant, supplier=slow, product=product, cost_price=Decimal("5.00"))
+        SupplierProduct.objects.create(tenant=tenant, supplier=fast, product=product, cost_price=Decimal("5.00"))
+    best = ProductBestOffer.objects.get(product=product)
+    assert (best.supplier, best.lead_time_days, best.offer_count) == (fast, 2, 2)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        slow_offer.cost_price = Decimal("4.50")
+        slow_offer.save()
+    assert ProductBestOffer.objects.get(product=product).supplier == slow
+
+    with django_capture_on_commit_callbacks(execute=True):
+        slow.soft_delete()
+    best = ProductBestOffer.objects.get(product=product)
+    assert (best.supplier, best.cost_price, best.offer_count) == (fast, Decimal("5.00"), 1)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        fast.products.all().delete()
+    assert not ProductBestOffer.objects.filter(product=product).exists()
+
+
+def test_import_supplier_price_list_upserts_by_supplier_code(tenant, products, django_assert_max_num_queries):
+    supplier = Supplier.objects.create(tenant=tenant, name="Fornecedor")
+    import_supplier_price_list(tenant=tenant, supplier=supplier, rows=[
+        {"supplier_code": "A1", "sku": "SKU000", "cost_price": "3.00"},
+    ])
+
+    rows = [
+        {"supplier_code": "A1", "sku": "SKU000", "cost_price": "2.50"},
+        {"supplier_code": "B2", "sku": "SKU001", "cost_price": "7.00"},
+        {"supplier_code": "C3", "sku": "SKU002", "cost_price": "1.25"},
+    ]
+    with django_assert_max_num_queries(8):
+        stats = import_supplier_price_list(tenant=tenant, supplier=supplier, rows=rows, batch_size=10)
+
+    assert stats == {"created": 2, "updated": 1}
+    assert SupplierProduct.objects.filter(supplier=supplier).count() == 3
+    assert dict(ProductBestOffer.objects.values_list("product__sku", "cost_price")) == {
+        "SKU000": Decimal("2.50"), "SKU001": Decimal("7.00"), "SKU002": Decimal("1.25"),
+    }
+
+    with pytest.raises(SupplierError, match="Products not found: SKU999"):
+        import_supplier_price_list(tenant=tenant, supplier=supplier, rows=[{"supplier_code": "D4", "sku": "SKU999"}])
@@ -0,0 +1,180 @@
+from datetime import datetime
+from typing import Iterable, List, Type
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
+
+
+class HistoryEncoder(DjangoJSONEncoder):
+    """
+    JSON encoder keeping full datetime precision, which DjangoJSONEncoder
+    truncates to milliseconds, so archived entries keep their exact order.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class HistoryArchive(models.Model):
+    """
+    Cold storage for the history rows of one closed document.
+
+    Concrete archives add a one-to-one link to the document; `entries` holds
+    the archived rows as a JSON list, oldest first, keyed by field attname.
+    """
+    entries = models.JSONField(default=list, encoder=HistoryEncoder)
+    entry_count = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+def _archived_fields(history_model: Type[models.Model], owner_field: str) -> List[models.Field]:
+    return [
+        field for field in history_model._meta.concrete_fields
+        if not field.primary_key and field.name != owner_field
+    ]
+
+
+@transaction.atomic
+def archive_history(
+    *,
+    owner_ids: Iterable[int],
+    history_model: Type[models.Model],
+    archive_model: Type[HistoryArchive],
+    owner_field: str
+) -> int:
+    """
+    Move the history rows of a batch of documents into their archives.
+
+    The batch costs one read of the hot rows, one read of the existing
+    archives, one bulk INSERT, one bulk UPDATE and one DELETE.
+
+    Args:
+        owner_ids (Iterable[int]): Primary keys of the documents to compact.
+        history_model (Model): The hot history model.
+        archive_model (HistoryArchive): The archive model, linked to the document by `owner_field`.
+        owner_field (str): Name of the foreign key to the document, on both models.
+
+    Returns:
+        int: The number of history rows archived.
+    """
+    owner_ids = list(owner_ids)
+    owner_attname = history_model._meta.get_field(owner_field).attname
+    attnames = [field.attname for field in _archived_fields(history_model, owner_field)]
+
+    rows = history_model.objects.filter(**{owner_attname + '__in': owner_ids}).order_by('created_at', 'pk').values('pk', owner_attname, *attnames)
+    entries_by_owner = {}
+    archived_ids = []
+    for row in rows:
+        archived_ids.append(row.pop('pk'))
+        entries_by_owner.setdefault(row.pop(owner_attname), []).append(row)
+    if not archived_ids:
+        return 0
+
+    archives = {
+        getattr(archive, owner_attname): archive
+        for archive in archive_model.objects.select_for_update().filter(**{owner_attname + '__in': list(entries_by_owner)})
+    }
+    new_archives = []
+    for owner_id, entries in entries_by_owner.items():
+        archive = archives.get(owner_id)
+        if archive is None:
+            new_archives.append(archive_model(**{owner_attname: owner_id, 'entries': entries, 'entry_count': len(entries)}))
+        else:
+            archive.entries = archive.entries + entries
+            archive.entry_count = len(archive.entries)
+            archive.archived_at = timezone.now()
+
+    archive_model.objects.bulk_create(new_archives)
+    archive_model.objects.bulk_update(archives.values(), ['entries', 'entry_count', 'archived_at'])
+    history_model.objects.filter(pk__in=archived_ids).delete()
+    return len(archived_ids)
+
+
+def compact_history(
+    *,
+    owners: models.QuerySet,
+    history_model: Type[models.Model],
+    archive_model: Type[HistoryArchive],
+    owner_field: str,
+    batch_size: int = 500
+) -> int:
+    """
+    Archive the history of every document of a queryset, one batch per transaction.
+
+    Documents are walked in primary key order so the job can be interrupted
+    and resumed; documents without hot history rows are skipped.
+
+    Returns:
+        int: The number of history rows archived.
+    """
+    owners = owners.filter(**{'{}__isnull'.format(history_model._meta.get_field(owner_field).related_query_name()): False}).distinct()
+    archived = 0
+    last_id = 0
+    while True:
+        owner_ids = list(owners.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not owner_ids:
+            return archived
+        archived += archive_history(owner_ids=owner_ids, history_model=history_model, archive_model=archive_model, owner_field=owner_field)
+        last_id = owner_ids[-1]
+
+
+def read_history(
+    *,
+    owner: models.Model,
+    history_model: Type[models.Model],
+    archive_model: Type[HistoryArchive],
+    owner_field: str
+) -> List[models.Model]:
+    """
+    Return the full history of a document, archived and hot rows alike.
+
+    Archived entries come back as unsaved history instances, so callers (the
+    admin among them) handle both kinds the same way. Newest first, like the
+    history models' default ordering.
+    """
+    fields = _archived_fields(history_model, owner_field)
+    owner_attname = history_model._meta.get_field(owner_field).attname
+
+    entries = []
+    archive = archive_model.objects.filter(**{owner_attname: owner.pk}).first()
+    if archive is not None:
+        for entry in archive.entries:
+            values = {field.attname: field.to_python(entry.get(field.attname)) for field in fields}
+            entries.append(history_model(**{owner_field: owner}, **values))
+    entries.extend(history_model.objects.filter(**{owner_attname: owner.pk}))
+    entries.sort(key=lambda entry: entry.created_at, reverse=True)
+    return entries
+
+
+def render_history(entries: List[models.Model], related_field: str) -> str:
+    """
+    Render history entries, archived or hot, as an HTML table for the admin.
+
+    The related objects of all entries (e.g. the status and the user) are
+    fetched with one query per kind.
+    """
+    if not entries:
+        return '-'
+    history_model = type(entries[0])
+    related_model = history_model._meta.get_field(related_field).related_model
+    user_model = history_model._meta.get_field('changed_by').related_model
+    related = related_model.objects.in_bulk({getattr(entry, related_field + '_id') for entry in entries})
+    users = user_model.objects.in_bulk({entry.changed_by_id for entry in entries})
+
+    rows = format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>', (
+        (
+            entry.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            related.get(getattr(entry, related_field + '_id'), '-'),
+            users.get(entry.changed_by_id, '-'),
+            entry.notes or '',
+        )
+        for entry in entries
+    ))
+    return format_html('<table><tbody>{}</tbody></table>', rows)
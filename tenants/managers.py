@@ -0,0 +1,61 @@
+from django.db import models
+from django.utils import timezone
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """
+    QuerySet for models flagged as deleted through a `deleted_at` timestamp.
+    """
+
+    def live(self):
+        return self.filter(deleted_at__isnull=True)
+
+    def deleted(self):
+        return self.filter(deleted_at__isnull=False)
+
+    def _has_field(self, name: str) -> bool:
+        return any(field.name == name for field in self.model._meta.concrete_fields)
+
+    def soft_delete_values(self) -> dict:
+        """
+        Return the field values written when rows are soft deleted.
+        """
+        values = {'deleted_at': timezone.now()}
+        if self._has_field('is_active'):
+            values['is_active'] = False
+        if self._has_field('updated_at'):
+            values['updated_at'] = values['deleted_at']
+        return values
+
+    def restore_values(self) -> dict:
+        """
+        Return the field values written when rows are restored.
+        """
+        values = {'deleted_at': None}
+        if self._has_field('is_active'):
+            values['is_active'] = True
+        if self._has_field('updated_at'):
+            values['updated_at'] = timezone.now()
+        return values
+
+    def soft_delete(self) -> int:
+        """
+        Soft delete every live row of the queryset with a single UPDATE.
+
+        Returns:
+            int: The number of rows soft deleted.
+        """
+        return self.live().update(**self.soft_delete_values())
+
+    def restore(self) -> int:
+        """
+        Restore every soft-deleted row of the queryset with a single UPDATE.
+
+        Returns:
+            int: The number of rows restored.
+        """
+        return self.deleted().update(**self.restore_values())
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    pass
@@ -93,3 +93,22 @@ class TenantUser(models.Model):
 
     def __str__(self):
         return f"{self.user.email} @ {self.tenant.name} ({self.role.name})"
+
+
+class CacheStamp(models.Model):
+    """
+    Stamp of data cached in process memory, such as the compiled status
+    transitions. It changes with every change of the data, so each process
+    compares it with the stamp its copy was built at and rebuilds stale
+    copies, whichever process made the change.
+    """
+    key = models.CharField(max_length=100, unique=True)
+    stamp = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Cache Stamp'
+        verbose_name_plural = 'Cache Stamps'
+
+    def __str__(self):
+        return f'{self.key}: {self.stamp}'
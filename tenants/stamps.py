@@ -0,0 +1,34 @@
+from typing import Dict, Iterable
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import CacheStamp
+
+
+def get_cache_stamps(keys: Iterable[str]) -> Dict[str, int]:
+    """
+    Return the current stamp of each key with one query.
+
+    Keys read for the first time are created at 0, so that the bumps made
+    from then on (see bump_cache_stamp) reach the copies built at that stamp.
+    """
+    keys = list(keys)
+    stamps = dict(CacheStamp.objects.filter(key__in=keys).values_list('key', 'stamp'))
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        CacheStamp.objects.bulk_create([CacheStamp(key=key) for key in missing], ignore_conflicts=True)
+    return {key: stamps.get(key, 0) for key in keys}
+
+
+def bump_cache_stamp(key: str) -> None:
+    """
+    Advance the stamp of a key once the current transaction commits.
+
+    The stamp is moved with a single UPDATE, without locks, after the change
+    it marks is visible to the other processes. A key no process has read yet
+    has no row, so there is no copy to invalidate and nothing is written.
+    """
+    transaction.on_commit(
+        lambda: CacheStamp.objects.filter(key=key).update(stamp=models.F('stamp') + 1, updated_at=timezone.now())
+    )
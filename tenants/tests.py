@@ -0,0 +1,115 @@
+from decimal import Decimal
+
+import pytest
+
+from customers.models import Customer
+from products.models import Product
+from sales.models import SaleOrder, SaleOrderStatus
+from tenants import transitions
+from tenants.models import Tenant
+from tenants.stamps import bump_cache_stamp
+from tenants.transitions import get_transition_table
+
+
+@pytest.fixture
+def tenant(db):
+    return Tenant.objects.create(name="Tenant Test")
+
+
+@pytest.fixture
+def customer(db, tenant):
+    return Customer.objects.create(tenant=tenant, name="Cliente Teste")
+
+
+def test_soft_delete_queryset_updates_in_bulk_and_splits_live_and_deleted(tenant):
+    products = [
+        Product.objects.create(tenant=tenant, name=f"Produto {index}", price=Decimal("10.00"))
+        for index in range(3)
+    ]
+
+    assert Product.objects.filter(id__in=[products[0].id, products[1].id]).soft_delete() == 2
+    assert list(Product.objects.live()) == [products[2]]
+    assert set(Product.objects.deleted()) == {products[0], products[1]}
+    assert Product.objects.filter(is_active=False).count() == 2
+
+    assert Product.objects.filter(id=products[2].id).soft_delete() == 1
+    assert Product.objects.filter(id=products[0].id).restore() == 1
+    assert list(Product.objects.live()) == [products[0]]
+    assert Product.objects.get(id=products[0].id).is_active
+
+
+def test_soft_delete_does_not_overwrite_existing_tombstones(tenant, customer):
+    customer.soft_delete()
+    deleted_at = Customer.objects.get(id=customer.id).deleted_at
+
+    assert Customer.objects.all().soft_delete() == 0
+    assert Customer.objects.get(id=customer.id).deleted_at == deleted_at
+
+
+def test_sale_order_bulk_soft_delete_sets_tenant_canceled_status(tenant, customer):
+    SaleOrderStatus.objects.create(tenant=None, name="CANCELED", label="Cancelado (global)")
+    canceled = SaleOrderStatus.objects.create(tenant=tenant, name="CANCELED", label="Cancelado")
+    open_status = SaleOrderStatus.objects.create(tenant=tenant, name="OPEN", label="Aberto")
+    orders = [SaleOrder.objects.create(tenant=tenant, customer=customer, status=open_status) for _ in range(2)]
+
+    assert SaleOrder.objects.filter(tenant=tenant).soft_delete() == 2
+
+    for order in orders:
+        order.refresh_from_db()
+        assert order.deleted_at is not None
+        assert order.status == canceled
+
+
+def test_transition_table_defaults_to_forward_moves_and_honours_explicit_edges(
+    tenant, django_assert_num_queries
+):
+    global_open = SaleOrderStatus.objects.create(name="OPEN", label="Aberto", sequence_order=1)
+    picking = SaleOrderStatus.objects.create(tenant=tenant, name="PICKING", label="Separando", sequence_order=3)
+    shipped = SaleOrderStatus.objects.create(tenant=tenant, name="SHIPPED", label="Enviado", sequence_order=5)
+    tenant_open = SaleOrderStatus.objects.create(tenant=tenant, name="open", label="Aberto", sequence_order=1)
+    other_tenant_status = SaleOrderStatus.objects.create(
+        tenant=Tenant.objects.create(name="Outro"), name="SHIPPED", label="Enviado", sequence_order=5
+    )
+
+    # The first lookup creates the stamps of the tenant and the global statuses.
+    with django_assert_num_queries(4):
+        table = get_transition_table(SaleOrderStatus, tenant.id)
+    with django_assert_num_queries(0):
+        assert table.can_transition(tenant_open.pk, shipped.pk)
+        assert table.can_transition(picking.pk, shipped.pk)
+        assert not table.can_transition(shipped.pk, picking.pk)
+        assert not table.can_transition(picking.pk, global_open.pk)
+        assert table.can_transition(None, picking.pk)
+        assert not table.is_available(other_tenant_status.pk)
+    with django_assert_num_queries(0):
+        assert get_transition_table(SaleOrderStatus, tenant.id) is table
+
+    shipped.next_statuses.add(picking)
+
+    table = get_transition_table(SaleOrderStatus, tenant.id)
+    assert table.can_transition(shipped.pk, picking.pk)
+    assert not table.can_transition(shipped.pk, tenant_open.pk)
+
+
+def test_transition_table_is_recompiled_when_another_process_changes_statuses(
+    tenant, monkeypatch, django_capture_on_commit_callbacks, django_assert_num_queries
+):
+    draft = SaleOrderStatus.objects.create(tenant=tenant, name="DRAFT", label="Rascunho", sequence_order=1)
+    done = SaleOrderStatus.objects.create(tenant=tenant, name="DONE", label="Concluído", sequence_order=2)
+    table = get_transition_table(SaleOrderStatus, tenant.id)
+    assert table.can_transition(draft.pk, done.pk)
+
+    # Another process edits the statuses: no signal reaches this process's
+    # tables, only the bumped stamp of the global statuses.
+    with django_capture_on_commit_callbacks(execute=True):
+        SaleOrderStatus.objects.filter(pk=done.pk).update(sequence_order=0)
+        bump_cache_stamp("transitions:sales.SaleOrderStatus:global")
+
+    # Until the stamps are checked again, the compiled table is used as is.
+    assert get_transition_table(SaleOrderStatus, tenant.id) is table
+
+    monkeypatch.setattr(transitions, "STAMP_CHECK_INTERVAL", 0)
+    table = get_transition_table(SaleOrderStatus, tenant.id)
+    assert not table.can_transition(draft.pk, done.pk)
+    with django_assert_num_queries(1):
+        assert get_transition_table(SaleOrderStatus, tenant.id) is table
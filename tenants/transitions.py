@@ -0,0 +1,139 @@
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple, Type
+
+from django.db import models, transaction
+
+from .stamps import bump_cache_stamp, get_cache_stamps
+
+
+class StatusTransitionTable:
+    """
+    Compiled status transitions of a tenant for one status model.
+
+    A status with explicit `next_statuses` may only move to those; a status
+    without them may move forward to any status with a higher sequence order.
+    Orders without a status may move to any status. Checks against a table
+    are plain dictionary reads and never touch the database.
+    """
+
+    def __init__(self, names: Dict[int, str], allowed: Dict[int, FrozenSet[int]]):
+        self.names = names
+        self.allowed = allowed
+
+    @classmethod
+    def compile(cls, status_model: Type[models.Model], tenant_id: int) -> 'StatusTransitionTable':
+        """
+        Build the table of a tenant from its own and the global statuses with two queries.
+        """
+        statuses = list(
+            status_model.objects.filter(models.Q(tenant_id=tenant_id) | models.Q(tenant__isnull=True))
+            .values_list('id', 'tenant_id', 'name', 'sequence_order')
+        )
+
+        # A tenant status overrides the global status with the same name.
+        tenant_names = {name.upper() for _, owner, name, _ in statuses if owner is not None}
+        visible = [
+            (status_id, sequence_order) for status_id, owner, name, sequence_order in statuses
+            if owner is not None or name.upper() not in tenant_names
+        ]
+        visible_ids = {status_id for status_id, _ in visible}
+
+        through = status_model.next_statuses.through
+        source_field = 'from_{}_id'.format(status_model._meta.model_name)
+        target_field = 'to_{}_id'.format(status_model._meta.model_name)
+        explicit: Dict[int, set] = {}
+        for source_id, target_id in through.objects.filter(**{source_field + '__in': [row[0] for row in statuses]}).values_list(source_field, target_field):
+            if target_id in visible_ids:
+                explicit.setdefault(source_id, set()).add(target_id)
+
+        sequences = {status_id: sequence_order for status_id, _, _, sequence_order in statuses}
+        allowed = {}
+        for status_id, _, _, _ in statuses:
+            if status_id in explicit:
+                allowed[status_id] = frozenset(explicit[status_id])
+            else:
+                allowed[status_id] = frozenset(
+                    target_id for target_id, sequence_order in visible if sequence_order > sequences[status_id]
+                )
+        allowed[None] = frozenset(visible_ids)
+
+        return cls({status_id: name for status_id, _, name, _ in statuses}, allowed)
+
+    def is_available(self, status_id: int) -> bool:
+        return status_id in self.names
+
+    def can_transition(self, from_status_id: Optional[int], to_status_id: int) -> bool:
+        return to_status_id in self.allowed.get(from_status_id, frozenset())
+
+    def invalid_sources(self, rows: Iterable[Tuple[int, Optional[int]]], to_status_id: int) -> list:
+        """
+        Return the keys of the (key, status id) rows that cannot move to the given status.
+        """
+        return [key for key, status_id in rows if status_id != to_status_id and not self.can_transition(status_id, to_status_id)]
+
+
+# Seconds a compiled table is used before its stamps are checked again.
+STAMP_CHECK_INTERVAL = 5
+
+_tables: Dict[Tuple[str, int], Tuple[Tuple[int, int], float, StatusTransitionTable]] = {}
+_tables_lock = threading.Lock()
+
+
+def _stamp_key(status_model: Type[models.Model], tenant_id: Optional[int]) -> str:
+    return 'transitions:{}:{}'.format(status_model._meta.label, 'global' if tenant_id is None else tenant_id)
+
+
+def get_transition_table(status_model: Type[models.Model], tenant_id: int) -> StatusTransitionTable:
+    """
+    Return the transition table of a tenant for a status model, compiling it on first use.
+
+    Tables are kept in process memory along with the stamps of the tenant's
+    and the global statuses they were compiled at (see tenants.stamps).
+    Changes saved by this process drop its tables at once; the stamps, which
+    catch changes saved by other processes, are read at most once every
+    STAMP_CHECK_INTERVAL seconds, so most lookups run no query.
+    """
+    key = (status_model._meta.label, tenant_id)
+    now = time.monotonic()
+    cached = _tables.get(key)
+    if cached is not None and now - cached[1] < STAMP_CHECK_INTERVAL:
+        return cached[2]
+
+    stamps = get_cache_stamps([_stamp_key(status_model, tenant_id), _stamp_key(status_model, None)])
+    stamp = tuple(stamps.values())
+    with _tables_lock:
+        cached = _tables.get(key)
+        if cached is not None and cached[0] == stamp:
+            table = cached[2]
+        else:
+            table = StatusTransitionTable.compile(status_model, tenant_id)
+        _tables[key] = (stamp, now, table)
+    return table
+
+
+def _drop_transition_tables(status_model: Type[models.Model], tenant_id: Optional[int] = None) -> None:
+    label = status_model._meta.label
+    with _tables_lock:
+        for key in [key for key in _tables if key[0] == label and (tenant_id is None or key[1] == tenant_id)]:
+            del _tables[key]
+
+
+def invalidate_transition_tables(status_model: Type[models.Model], tenant_id: Optional[int] = None) -> None:
+    """
+    Invalidate the compiled tables of a status model, for one tenant or, for global statuses, for all of them.
+
+    The tables of this process are dropped and the stamp is bumped once the
+    current transaction commits, so the other processes recompile theirs on
+    their next stamp check.
+    """
+    bump_cache_stamp(_stamp_key(status_model, tenant_id))
+    _drop_transition_tables(status_model, tenant_id)
+
+
+def schedule_transition_tables_invalidation(status_model: Type[models.Model], tenant_id: Optional[int] = None) -> None:
+    """
+    Invalidate the compiled tables now and drop this process's copies again once the current transaction commits.
+    """
+    invalidate_transition_tables(status_model, tenant_id)
+    transaction.on_commit(lambda: _drop_transition_tables(status_model, tenant_id))
@@ -3,8 +3,10 @@ from django.contrib.auth.models import (AbstractBaseUser, BaseUserManager,
 from django.db import models
 from django.utils import timezone
 
+from tenants.managers import SoftDeleteQuerySet
 
-class UserManager(BaseUserManager):
+
+class UserManager(BaseUserManager.from_queryset(SoftDeleteQuerySet)):
 
     def create_user(self, email, password, **extra_fields):
         if not email:
@@ -48,6 +50,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], condition=models.Q(deleted_at__isnull=True), name='user_live_idx'),
+        ]
 
     def __str__(self):
         return self.email